@@ -1,57 +1,309 @@
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 
-from tool_functions.combinations      import create_combination_column
+_run_started = time.perf_counter()
+
 from tool_functions.summary           import generate_molecule_overview
-from tool_functions.PacksAndProducts  import generate_combination_first_clean_summary
+from tool_functions.PacksAndProducts  import generate_combination_first_clean_summary, build_pack_hierarchy
 from tool_functions.MohapLandscape    import format_registered_products_by_company
 from tool_functions.MoleculePlot      import plot_combination_market_breakdown_plotly
 from tool_functions.MoleculeATC4      import plotly_combinations_within_atc4_go
 #from tool_functions.OrangeBook import generate_uptake_patent_view
 from tool_functions.SummaryGen import generate_exec_summary_data
 from tool_functions.MarketShare import plot_manufacturer_market_share
-from tool_functions.Erosion import plot_market_erosion
+from tool_functions.Erosion import plot_market_erosion, build_uptake_library
 from tool_functions.OrangeBook import display_patent_summary
-from tool_functions.Reg import get_regulatory_summary
+from tool_functions.Reg import get_regulatory_summary, build_expiry_map
+from tool_functions.Compare import plot_comparison
+from tool_functions.Forecast import batch_forecast, get_forecast
+from tool_functions.AtcTree import build_atc_tree, get_class_metrics, plot_atc_tree
+from tool_functions.Analogs import build_analog_index, find_analogs
+from tool_functions.EntrySim import simulate_entry_revenue, summarize_revenue, plot_revenue_fan, simulate_entry_batch
+from tool_functions.Normalize import normalize_mohap
+from tool_functions.PriceHistory import PRICE_HISTORY_DIR, MANIFEST_FILE, changes_between, load_price_history as read_price_history
+from tool_functions.DiskCache import DiskCache
+from tool_functions.Portfolio import build_portfolio_index, get_portfolio, plot_portfolio, LOSING_SHARE_PTS
+from tool_functions.Warmup import WarmupScheduler, warmup_candidates, record_usage
+from tool_functions.Crosswalk import build_crosswalk, products_for, join_mohap
+from tool_functions.MarketPivot import build_market_pivot, market_split_table
+from tool_functions.PriceVolumeMix import build_pvm, get_pvm, plot_pvm_bridge, PVM_COLS
+from tool_functions.EntryEvents import build_entry_events, filter_events, EVENT_TYPES, ORIGINATOR_DROP_PTS
+from tool_functions.Startup import STARTUP
+
+from tool_functions.DataLoad import (
+    load_master_data as _load_master_data,
+    load_mohap_data as _load_mohap_data,
+    load_orange_book as _load_orange_book,
+    dataset_version,
+    MASTER_DATA_PATH,
+    MOHAP_PATH,
+    OB_PRODUCTS_PATH,
+    OB_PATENTS_PATH,
+)
+
+# --- On-disk cache of derived tables, shared across restarts (keyed by source + code version) ---
+@st.cache_resource
+def get_disk_cache():
+    return DiskCache()
 
-# --- Cleaning function ---
-import re
-def clean_combo(x):
-    if pd.isna(x):
-        return ""
-    return re.sub(r"\s+", " ", str(x).strip().upper())
 
 # --- Load Master Data ---
 @st.cache_data
 def load_master_data():
-    df = pd.read_csv("Master Data.csv")
-    df = create_combination_column(df)
-    df.columns = df.columns.str.replace("\n", " ", regex=False).str.strip()
-
-    for c in df.columns:
-        if "Value" in c or "Units" in c:
-            df[c] = pd.to_numeric(
-                df[c].astype(str).str.replace(",", "").str.strip(),
-                errors="coerce"
-            )
-
-    # 👉 Clean Molecule Combination column here
-    df["Molecule Combination"] = df["Molecule Combination"].apply(clean_combo)
-    
-    return df
+    return get_disk_cache().get_or_compute(("master_data", dataset_version(MASTER_DATA_PATH)), _load_master_data)
 # --- Load MOHAP Data ---
 @st.cache_data
 def load_mohap_data():
-    mohap_df = pd.read_csv("PriceListMOHAP.csv")
-    mohap_df.columns = mohap_df.columns.str.replace("\n", " ", regex=False).str.strip()
+    return _load_mohap_data()
+# --- Load Orange Book (products, patents) ---
+@st.cache_data
+def load_orange_book():
+    return _load_orange_book()
+
+
+# --- Product / pack drill-down (built once, read-only) ---
+@st.cache_resource
+def load_pack_hierarchy():
+    return build_pack_hierarchy(load_master_data())
+
+
+# --- Uptake curves for every (combination, manufacturer) pair (built once, read-only) ---
+@st.cache_resource
+def load_uptake_library():
+    return get_disk_cache().get_or_compute(
+        ("uptake_library_erosion", dataset_version(MASTER_DATA_PATH)),
+        lambda: build_uptake_library(load_master_data())
+    )
+
+
+# --- Feature vectors for the analog finder (built once, read-only) ---
+@st.cache_resource
+def load_analog_index():
+    return build_analog_index(load_master_data())
+
+
+# --- ATC1 → ATC4 → combination rollup (built once, read-only) ---
+@st.cache_resource
+def load_atc_tree():
+    return get_disk_cache().get_or_compute(
+        ("atc_tree", dataset_version(MASTER_DATA_PATH)),
+        lambda: build_atc_tree(load_master_data())
+    )
+
+
+# --- Manufacturer → combinations / products / packs inverted index ---
+@st.cache_resource
+def load_portfolio_index():
+    return get_disk_cache().get_or_compute(
+        ("portfolio_index", dataset_version(MASTER_DATA_PATH)),
+        lambda: build_portfolio_index(load_master_data())
+    )
+
+
+# --- Private / LPO / Total side by side per combination, manufacturer, product, strength ---
+@st.cache_resource
+def load_market_pivot():
+    return get_disk_cache().get_or_compute(
+        ("market_pivot_rows", dataset_version(MASTER_DATA_PATH)),
+        lambda: build_market_pivot(load_master_data())
+    )
+
+
+# --- Sparse manufacturer × combination matrix for competitor-overlap rankings ---
+@st.cache_resource
+def load_overlap_matrix():
+    # scipy is only imported once the Portfolio tab is opened
+    from tool_functions.CompetitorOverlap import build_overlap_matrix
+    return get_disk_cache().get_or_compute(
+        ("overlap_matrix", dataset_version(MASTER_DATA_PATH)),
+        lambda: build_overlap_matrix(load_master_data())
+    )
+
+
+# --- Year-over-year value change split into volume / price / mix for every combination and ATC node ---
+@st.cache_resource
+def load_pvm():
+    return get_disk_cache().get_or_compute(
+        ("price_volume_mix_unpriced", dataset_version(MASTER_DATA_PATH)),
+        lambda: build_pvm(load_master_data())
+    )
+
+
+# --- Latest Orange Book patent expiry per ingredient ---
+@st.cache_resource
+def load_expiry_map():
+    return get_disk_cache().get_or_compute(
+        ("ob_expiry_map", dataset_version(OB_PRODUCTS_PATH, OB_PATENTS_PATH)),
+        lambda: build_expiry_map(*load_orange_book())
+    )
+
+
+# --- Trend forecasts for every combination / ATC4 / ATC3 (one per dataset version) ---
+@st.cache_data
+def load_forecasts(version):
+    return batch_forecast(load_master_data())
+
+
+# --- SQL engine over Parquet snapshots of the cleaned tables (one per dataset version) ---
+@st.cache_resource
+def load_query_engine(version):
+    # duckdb / pyarrow are only imported once the Ad-hoc Query tab is opened
+    from tool_functions.QueryEngine import build_query_engine
+    ob_products, ob_patents = load_orange_book()
+    return build_query_engine({
+        "master": load_master_data(),
+        "mohap": normalize_mohap(load_mohap_data()),
+        "ob_products": ob_products,
+        "ob_patents": ob_patents,
+    }, version)
+
+
+# --- MOHAP price history (read-only; releases are recorded with `python -m tool_functions.PriceHistory`) ---
+@st.cache_resource
+def load_price_history(version):
+    return read_price_history()
+
+
+# --- Master Data product → MOHAP trade name crosswalk (only changed blocks are rescored) ---
+@st.cache_resource
+def load_product_crosswalk(version):
+    crosswalk, _ = build_crosswalk(load_master_data(), load_mohap_data())
+    return crosswalk
+
+
+# --- Launch / entry / originator-share events for every pair (only new or changed years are rescanned) ---
+@st.cache_resource
+def load_market_events(version):
+    events, _ = build_entry_events(load_master_data())
+    return events
+
+
+# --- Per-molecule views: disk-cached, shared by the tabs and the warm-up worker ---
+def exec_summary_view(cache, data_df, tree, pivot, molecule, pvm=None):
+    # without `pvm` (script runs only: load_pvm is an st.cache_resource) the price-volume-mix
+    # table is loaded when a summary is not on disk yet
+    return cache.get_or_compute(
+        ("exec_summary", dataset_version(MASTER_DATA_PATH), molecule),
+        lambda: generate_exec_summary_data(
+            data_df, molecule, atc_tree=tree, market_pivot=pivot, pvm=pvm if pvm is not None else load_pvm()
+        )
+    )
+
+
+def breakdown_view(cache, data_df, pivot, molecule, use_market_filter, market_type, use_value, group_by_column):
+    return cache.get_or_compute(
+        ("molecule_breakdown", dataset_version(MASTER_DATA_PATH), molecule, use_market_filter, market_type, use_value, group_by_column),
+        lambda: plot_combination_market_breakdown_plotly(
+            data_df,
+            selected_molecule=molecule,
+            use_market_filter=use_market_filter,
+            market_type=market_type,
+            use_value=use_value,
+            group_by_column=group_by_column,
+            market_pivot=pivot
+        )
+    )
+
+
+def atc4_view(cache, data_df, atc4, use_value):
+    return cache.get_or_compute(
+        ("atc4_breakdown", dataset_version(MASTER_DATA_PATH), atc4, use_value),
+        lambda: plotly_combinations_within_atc4_go(data_df, atc4_name=atc4, UseValue=use_value)
+    )
+
+
+def erosion_view(cache, data_df, library, molecule):
+    return cache.get_or_compute(
+        ("erosion", dataset_version(MASTER_DATA_PATH), molecule),
+        lambda: plot_market_erosion(data_df, molecule, library=library)
+    )
 
 
-    return mohap_df
+def regulatory_view(cache, mohap, ob_products, ob_patents, expiry_map, molecule):
+    return cache.get_or_compute(
+        ("regulatory", dataset_version(MOHAP_PATH, OB_PRODUCTS_PATH, OB_PATENTS_PATH), molecule),
+        lambda: get_regulatory_summary(molecule, mohap, ob_products, ob_patents, expiry_map=expiry_map)
+    )
 
 
-# --- Load data ---
-df = load_master_data()
-mohap_df = load_mohap_data()
+# --- Background warm-up of the most used / largest molecules (once per dataset version) ---
+@st.cache_resource
+def start_warmup(version, max_workers=2):
+    # Everything the jobs need is built here, on the script thread: the workers have no
+    # ScriptRunContext, so they only get plain objects and never call the st.cache_* loaders.
+    # Private copies: the worker must not share frames the reruns mutate
+    data_df = load_master_data()
+    mohap = load_mohap_data()
+    ob_products, ob_patents = load_orange_book()
+    cache, library, tree, expiry_map = get_disk_cache(), load_uptake_library(), load_atc_tree(), load_expiry_map()
+    pivot, pvm = load_market_pivot(), load_pvm()
+    atc4_of = data_df.groupby("Molecule Combination")["ATC4"].first()
+
+    scheduler = WarmupScheduler(max_workers=max_workers)
+    for m in warmup_candidates(data_df):
+        scheduler.submit(f"{m}: exec summary", lambda m=m: exec_summary_view(cache, data_df, tree, pivot, m, pvm=pvm))
+        scheduler.submit(f"{m}: regulatory", lambda m=m: regulatory_view(cache, mohap, ob_products, ob_patents, expiry_map, m))
+        # default widget values of the Graph + Table and ATC4 tabs
+        scheduler.submit(f"{m}: breakdown", lambda m=m: breakdown_view(cache, data_df, pivot, m, True, "PRIVATE MARKET", False, "Manufacturer"))
+        if pd.notna(atc4_of.get(m)):
+            scheduler.submit(f"{m}: atc4", lambda m=m: atc4_view(cache, data_df, atc4_of[m], False))
+        scheduler.submit(f"{m}: erosion", lambda m=m: erosion_view(cache, data_df, library, m))
+    return scheduler.start()
+
+
+# --- Load data (what the header and the default tab need; every other tab loads its own when opened) ---
+with STARTUP.stage("master data"):
+    df = load_master_data()
+with STARTUP.stage("MOHAP price list"):
+    mohap_df = load_mohap_data()
+with STARTUP.stage("ATC tree"):
+    atc_tree = load_atc_tree()
+with STARTUP.stage("market pivot"):
+    market_pivot = load_market_pivot()
+disk_cache = get_disk_cache()
+
+# --- Only the open tab runs, so widgets in the other tabs would be reset when they are not drawn.
+# Keyed widgets below are re-assigned on every run to keep their values; defaults are seeded here
+# (the widgets themselves take no default, so Session State stays the single source). Keys seeded
+# with None depend on the data and are seeded by their tab the first time it opens.
+PERSISTED_WIDGETS = {
+    "plot_market": "PRIVATE MARKET",
+    "plot_metric": "Units",
+    "group_by": "Manufacturer",
+    "share_toggle": False,
+    "entry_capture": 8.0,
+    "sim_capture": (4.0, 12.0),
+    "sim_erosion": (10.0, 40.0),
+    "sim_growth_sd": 5.0,
+    "sim_delay": (0, 2),
+    "mohap_ingredient": None,
+    "ob_ingredient": None,
+    "compare_combos": None,
+    "compare_metric": "Units",
+    "analog_k": 10,
+    "analog_scope": "Any class",
+    "atc_chart": "Treemap",
+    "atc_root_level": "All",
+    "atc_depth": 3,
+    "sql_example": "(blank)",
+    "sql_text": "",
+    "portfolio_manu": None,
+    "portfolio_metric": "Value",
+    "overlap_atc": "All",
+    "event_types": EVENT_TYPES,
+    "event_years": None,
+    "event_atc3": "All",
+    "event_search": "",
+    "event_min_drop": ORIGINATOR_DROP_PTS,
+}
+for key, default in PERSISTED_WIDGETS.items():
+    if key in st.session_state:
+        st.session_state[key] = st.session_state[key]
+    elif default is not None:
+        st.session_state[key] = default
 
 # --- UI ---
 st.title("💊 UAE Molecule Intelligence Platform")
@@ -61,293 +313,692 @@ selected_combo = st.selectbox(
     "🔎 Search and Select Molecule Combination:",
     sorted(df["Molecule Combination"].dropna().unique())
 )
-# Tabs
-tab1a, tab1b, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+if st.session_state.get("last_molecule") != selected_combo:
+    record_usage(selected_combo)
+    st.session_state["last_molecule"] = selected_combo
+
+with STARTUP.stage("exec summary"):
+    summary = exec_summary_view(disk_cache, df, atc_tree, market_pivot, selected_combo)
+
+# Tabs (lazy: switching tabs reruns the script and only the open tab's body executes)
+tab1a, tab1b, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9, tab10, tab11, tab12 = st.tabs([
     "📊 Exec Summary",
     "📈 Graph + Table",
     "🔍 ATC4 Breakdown",
     "📋 Summary + Packs",
     "🏛️ MOHAP Insights",
     "📅 Patent Expiry Finder",
-    "📉 Erosion & Uptake"
-])
+    "📉 Erosion & Uptake",
+    "🆚 Compare",
+    "🧭 Analogs",
+    "🌳 ATC Explorer",
+    "🧮 Ad-hoc Query",
+    "🏭 Portfolio",
+    "🚨 Market Events"
+], key="main_tab", on_change="rerun")
 # === Tab 1: Molecule-Level Market Breakdown ===
 # === Tab 1A: Executive Summary ===
 with tab1a:
-    st.subheader("🧬 Executive Summary")
-
-    summary = generate_exec_summary_data(df, selected_combo)
-
-    # Block 1: Sales & Growth
-    st.markdown("### 💰 Sales & Growth")
-    col1, col2, col3 = st.columns(3)
-    col1.metric("2024 Sales (AED)", f"{summary['total_sales']:,.0f}")
-    col2.metric("2024 Units", f"{summary['total_units']:,.0f}")
-    col3.metric("Unique Manufacturers", summary['unique_manufacturers'])
+    if tab1a.open:
+        st.subheader("🧬 Executive Summary")
+
+        # Block 1: Sales & Growth
+        st.markdown("### 💰 Sales & Growth")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("2024 Sales (AED)", f"{summary['total_sales']:,.0f}")
+        col2.metric("2024 Units", f"{summary['total_units']:,.0f}")
+        col3.metric("Unique Manufacturers", summary['unique_manufacturers'])
+        STARTUP.mark_first_render(_run_started)
     
-    col4, col5 = st.columns(2)
-    col4.metric("CAGR (Units)", f"{summary['unit_cagr']:.1f}%")
-    col5.metric("CAGR (Value)", f"{summary['value_cagr']:.1f}%")
+        col4, col5 = st.columns(2)
+        col4.metric("CAGR (Units)", f"{summary['unit_cagr']:.1f}%")
+        col5.metric("CAGR (Value)", f"{summary['value_cagr']:.1f}%")
+
+        # 👉 Where the value growth came from: volume, price or mix (precomputed for every node)
+        if summary["value_bridge"]:
+            with st.expander("💹 Value Growth Split 2021 → 2024 (Volume / Price / Mix)"):
+                st.plotly_chart(plot_pvm_bridge(summary["value_bridge"], title=f"{selected_combo}: Value Bridge 2021 → 2024"), use_container_width=True)
+                bridge_table = pd.DataFrame({
+                    label: bridge for label, bridge in [
+                        ("Combination", summary["value_bridge"]),
+                        (f"ATC4 {summary['atc4']}", summary["atc4_bridge"]),
+                        (f"ATC3 {summary['atc3']}", summary["atc3_bridge"]),
+                    ] if bridge
+                }).T
+                st.dataframe(bridge_table.map(lambda v: f"{v:,.0f}"), use_container_width=True)
+                st.dataframe(get_pvm(load_pvm(), "Molecule Combination", selected_combo)[PVM_COLS].round(0), use_container_width=True)
+                st.caption("💹 Pack-level split of each year's LC value change, summed over 2022–2024. Volume = change in units at last year's average price; Mix = shift toward pricier / cheaper packs, manufacturers and channels; Price = price changes on the packs sold. Units without a value are priced at Retail Price.")
     
-    # 👉 New: Predicted Revenue
-    st.markdown("#### 📈 Predict Your Entry Revenue")
-    entry_pct = st.number_input("🔢 Expected Market Capture (%)", min_value=0.0, max_value=100.0, value=8.0, step=0.5)
-    adjusted_cif_price = (summary["total_sales"] / 1.4) * 0.4
-    predicted_revenue = adjusted_cif_price * (entry_pct / 100)
+        # 👉 New: Predicted Revenue (fragment: capture / scenario inputs rerun only this block)
+        @st.fragment
+        def entry_revenue_block(total_sales, value_cagr):
+            st.markdown("#### 📈 Predict Your Entry Revenue")
+            entry_pct = st.number_input("🔢 Expected Market Capture (%)", min_value=0.0, max_value=100.0, step=0.5, key="entry_capture")
+            adjusted_cif_price = (total_sales / 1.4) * 0.4
+            predicted_revenue = adjusted_cif_price * (entry_pct / 100)
     
-    st.metric("💡 Predicted Revenue (AED)", f"{predicted_revenue:,.0f}")
+            st.metric("💡 Predicted Revenue (AED)", f"{predicted_revenue:,.0f}")
+
+            with st.expander("🎲 Scenario Simulation (Monte Carlo)"):
+                sim_capture = st.slider("Market Capture range (%)", 0.0, 50.0, step=0.5, key="sim_capture")
+                sim_erosion = st.slider("Price Discount vs. Market (%)", 0.0, 80.0, step=1.0, key="sim_erosion")
+                sim_growth_sd = st.slider("Market Growth Uncertainty (± pts / year)", 0.0, 20.0, step=0.5, key="sim_growth_sd")
+                sim_delay = st.slider("Launch Delay (years after 2025)", 0, 4, key="sim_delay")
+
+                sim_years, sim_revenue = simulate_entry_revenue(
+                    total_sales,
+                    value_cagr,
+                    capture=(sim_capture[0], (sim_capture[0] + sim_capture[1]) / 2, sim_capture[1] + 1e-9),
+                    price_erosion=(sim_erosion[0], (sim_erosion[0] + sim_erosion[1]) / 2, sim_erosion[1] + 1e-9),
+                    growth_sd=sim_growth_sd,
+                    launch_delay=sim_delay,
+                    seed=0
+                )
+                st.plotly_chart(plot_revenue_fan(sim_years, sim_revenue[0]), use_container_width=True)
+                sim_table = summarize_revenue(sim_years, sim_revenue[0])
+                st.dataframe(
+                    sim_table.set_index("Year").map(lambda v: f"{v:,.0f}"),
+                    use_container_width=True
+                )
+                st.caption("🎲 5,000 draws: triangular capture and price discount, normal market growth around the value CAGR, uniform launch year, 2-year linear uptake. CIF = public × 0.4 / 1.4.")
+
+        entry_revenue_block(summary["total_sales"], summary["value_cagr"])
     
-    st.divider()
+        st.divider()
 
-   # Block 2: Market Leaders
-    st.markdown("### 🥇 Market Leaders")
-    col6, col7 = st.columns(2)
-    col6.metric("Top Manufacturer", summary['top_2024_manufacturer'])
-    col7.metric("Market Share", f"{summary['top_2024_share']:.1f}%")
+       # Block 2: Market Leaders
+        st.markdown("### 🥇 Market Leaders")
+        col6, col7 = st.columns(2)
+        col6.metric("Top Manufacturer", summary['top_2024_manufacturer'])
+        col7.metric("Market Share", f"{summary['top_2024_share']:.1f}%")
     
-    st.markdown(f"**Originator Value Share Change:** {summary['originator_share_change']}")
-    st.markdown(f"**Top 3 Manufacturers:**")
-    for manu, share in summary["top3_manufacturers"].items():
-        st.markdown(f"- `{manu}` → {share:.1f}%")
+        st.markdown(f"**Originator Value Share Change:** {summary['originator_share_change']}")
+        st.markdown(f"**Top 3 Manufacturers:**")
+        for manu, share in summary["top3_manufacturers"].items():
+            st.markdown(f"- `{manu}` → {share:.1f}%")
     
-    st.markdown(f"**# Manufacturers >3% Share**: `{summary['manufacturers_above_3_pct']}`")
+        st.markdown(f"**# Manufacturers >3% Share**: `{summary['manufacturers_above_3_pct']}`")
     
-    # 👉 New: Top product and launch year
-    st.markdown(f"**Top Product (from {summary['top_2024_manufacturer']}):** `{summary['top_product']}`")
-    if summary['top_product_launch_year']:
-        st.markdown(f"**Launch Year:** `{summary['top_product_launch_year']}`")
+        # 👉 New: Top product and launch year
+        st.markdown(f"**Top Product (from {summary['top_2024_manufacturer']}):** `{summary['top_product']}`")
+        if summary['top_product_launch_year']:
+            st.markdown(f"**Launch Year:** `{summary['top_product_launch_year']}`")
     
-    st.divider()
-
-    # Block 3: Market Split
-    st.markdown("### 🏪 Market Split")
-    col8, col9 = st.columns(2)
-    col8.metric("Private Market", f"{summary['private_pct']:.1f}%")
-    col9.metric("LPO Market", f"{summary['lpo_pct']:.1f}%")
-
-    col10, col11 = st.columns(2)
-    col10.metric("Private CAGR (Units)", f"{summary['private_cagr']:.1f}%")
-    col11.metric("LPO CAGR (Units)", f"{summary['lpo_cagr']:.1f}%")
-
-    st.divider()
-
-    # Block 4: ATC Classification
-    st.markdown("### 🧬 ATC Classification")
-    st.markdown(f"""
-    - **ATC1**: {summary['atc1']}  
-    - **ATC2**: {summary['atc2']}  
-    - **ATC3**: {summary['atc3']}  
-    - **ATC4**: {summary['atc4']}
-    """)
-
-    st.divider()
-
-    # Block 5: 📈 5-Year Forecast
-    st.markdown("### 📈 Market Forecast (2025–2029)")
-
-    forecast_table = pd.DataFrame({
-        "Year": list(summary["forecast_units"].keys()),
-        "Forecasted Units": list(summary["forecast_units"].values()),
-        "Forecasted Value (AED)": list(summary["forecast_value"].values())
-    })
-
-    st.dataframe(forecast_table, use_container_width=True)
-
-    st.caption("🔮 Based on historical CAGR from 2021–2024. These values are simple forecasts and assume trend continuation.")
-
-    st.divider()
-
-    # Block 6: 🧬 Class Overview
-    st.markdown("### 🧬 Class Overview (2024)")
-
-    class_table = pd.DataFrame([
-        {
-            "Level": "ATC4",
-            "2024 Value (AED)": f"{summary['atc4_metrics']['value_2024']:,.0f}",
-            "CAGR (Value)": f"{summary['atc4_metrics']['value_cagr']:.1f}%",
-            "CAGR (Units)": f"{summary['atc4_metrics']['unit_cagr']:.1f}%"
-        },
-        {
-            "Level": "ATC3",
-            "2024 Value (AED)": f"{summary['atc3_metrics']['value_2024']:,.0f}",
-            "CAGR (Value)": f"{summary['atc3_metrics']['value_cagr']:.1f}%",
-            "CAGR (Units)": f"{summary['atc3_metrics']['unit_cagr']:.1f}%"
-        }
-    ])
-    st.dataframe(class_table, use_container_width=True)
+        st.divider()
+
+        # Block 3: Market Split
+        st.markdown("### 🏪 Market Split")
+        col8, col9 = st.columns(2)
+        col8.metric("Private Market", f"{summary['private_pct']:.1f}%")
+        col9.metric("LPO Market", f"{summary['lpo_pct']:.1f}%")
+
+        col10, col11 = st.columns(2)
+        col10.metric("Private CAGR (Units)", f"{summary['private_cagr']:.1f}%")
+        col11.metric("LPO CAGR (Units)", f"{summary['lpo_cagr']:.1f}%")
+
+        st.divider()
+
+        # Block 4: ATC Classification
+        st.markdown("### 🧬 ATC Classification")
+        st.markdown(f"""
+        - **ATC1**: {summary['atc1']}  
+        - **ATC2**: {summary['atc2']}  
+        - **ATC3**: {summary['atc3']}  
+        - **ATC4**: {summary['atc4']}
+        """)
+
+        st.divider()
+
+        # Block 5: 📈 5-Year Forecast
+        st.markdown("### 📈 Market Forecast (2025–2029)")
+        st.markdown("#### 🔮 CAGR Extrapolation")
+
+        forecast_table = pd.DataFrame({
+            "Year": list(summary["forecast_units"].keys()),
+            "Forecasted Units": list(summary["forecast_units"].values()),
+            "Forecasted Value (AED)": list(summary["forecast_value"].values())
+        })
+
+        st.dataframe(forecast_table, use_container_width=True)
+
+        st.caption("🔮 The 2021–2024 CAGR carried forward unchanged: a simple extrapolation, separate from the trend model below.")
+
+        with STARTUP.stage("forecasts"):
+            forecasts = load_forecasts(dataset_version())
+        trend_table = get_forecast(forecasts, selected_combo)
+        if trend_table is not None:
+            st.markdown("#### 📐 Trend Model Forecast (80% interval)")
+            trend_display = pd.DataFrame({"Year": trend_table["Year"]})
+            for metric, label in [("Units", "Units"), ("Value", "Value (AED)")]:
+                trend_display[f"Forecasted {label}"] = trend_table[f"{metric} Forecast"].map("{:,.0f}".format)
+                trend_display[f"{label} Range"] = (
+                    trend_table[f"{metric} Lower"].map("{:,.0f}".format) + " – " +
+                    trend_table[f"{metric} Upper"].map("{:,.0f}".format)
+                ).where(trend_table[f"{metric} Lower"].notna(), "n/a (under 3 years of sales)")
+            st.dataframe(trend_display, use_container_width=True)
+            st.caption("📐 Log-linear trend fitted over 2020–2024 with a damped slope; ranges are 80% prediction intervals.")
+
+        st.divider()
+
+        # Block 6: 🧬 Class Overview
+        st.markdown("### 🧬 Class Overview (2024)")
+
+        class_table = pd.DataFrame([
+            {
+                "Level": "ATC4",
+                "2024 Value (AED)": f"{summary['atc4_metrics']['value_2024']:,.0f}",
+                "CAGR (Value)": f"{summary['atc4_metrics']['value_cagr']:.1f}%",
+                "CAGR (Units)": f"{summary['atc4_metrics']['unit_cagr']:.1f}%"
+            },
+            {
+                "Level": "ATC3",
+                "2024 Value (AED)": f"{summary['atc3_metrics']['value_2024']:,.0f}",
+                "CAGR (Value)": f"{summary['atc3_metrics']['value_cagr']:.1f}%",
+                "CAGR (Units)": f"{summary['atc3_metrics']['unit_cagr']:.1f}%"
+            }
+        ] + [
+            {
+                "Level": level,
+                "2024 Value (AED)": f"{m['value_2024']:,.0f}",
+                "CAGR (Value)": f"{m['value_cagr']:.1f}%",
+                "CAGR (Units)": f"{m['unit_cagr']:.1f}%"
+            }
+            for level in ["ATC2", "ATC1"]
+            for m in [get_class_metrics(atc_tree, level, summary[level.lower()])]
+            if m is not None
+        ])
+        st.dataframe(class_table, use_container_width=True)
     
-        # Block 4: Regulatory Snapshot
-    st.markdown("### 📜 Regulatory Snapshot")
+            # Block 4: Regulatory Snapshot
+        st.markdown("### 📜 Regulatory Snapshot")
 
-        # --- Load Data ---
-    ob_products = pd.read_csv("OBproducts.csv")
-    ob_patents  = pd.read_csv("OBpatents.csv")
-
-        # --- Clean Orange Book product data ---
-    ob_products.columns = ob_products.columns.str.strip()
-    ob_products["Ingredient"] = ob_products["Ingredient"].astype(str).str.upper().str.strip()
-    ob_products["Ingredient_List"] = ob_products["Ingredient"].str.split(";")
-    ob_products["Ingredient_Formatted"] = ob_products["Ingredient_List"].apply(lambda x: " +".join(x))
-    ob_products["Ingredient_Formatted_Clean"] = ob_products["Ingredient_Formatted"].str.strip().str.upper()
+            # --- Load Data ---
+        ob_products, ob_patents = load_orange_book()
 
-    reg_data = get_regulatory_summary(selected_combo, mohap_df, ob_products, ob_patents)
+        reg_data = regulatory_view(disk_cache, mohap_df, ob_products, ob_patents, load_expiry_map(), selected_combo)
 
-    colA, colB = st.columns(2)
-    colA.metric("MOHAP Registered Manufacturers", reg_data["mohap_manufacturers"])
-    colB.metric("Orange Book Latest Expiry", str(reg_data["orange_book_expiry"]))
+        colA, colB = st.columns(2)
+        colA.metric("MOHAP Registered Manufacturers", reg_data["mohap_manufacturers"])
+        colB.metric("Orange Book Latest Expiry", str(reg_data["orange_book_expiry"]))
 
-    st.markdown(f"**Search logic**: includes any ingredient that contains the term `{selected_combo.upper()}`.")
-    st.divider()
+        st.markdown(f"**Search logic**: includes any ingredient that contains the term `{selected_combo.upper()}`.")
+        st.divider()
 with tab1b:
-    st.subheader("🧪 Molecule-Level Market Breakdown")
+    if tab1b.open:
+        st.subheader("🧪 Molecule-Level Market Breakdown")
+
+        plot_market = st.radio(
+            "Market Type:",
+            ["PRIVATE MARKET", "LPO", "TOTAL (PRIVATE + LPO)"],
+            horizontal=True,
+            key="plot_market"
+        )
+        plot_metric = st.radio(
+            "Metric:",
+            ["Units", "Value"],
+            horizontal=True,
+            key="plot_metric"
+        )
+        group_by_column = st.radio(
+            "Group By:",
+            ["Manufacturer", "Product", "Strength"],
+            horizontal=True,
+            key="group_by"
+        )
+
+        use_value         = (plot_metric == "Value")
+        use_market_filter = (plot_market != "TOTAL (PRIVATE + LPO)")
+        market_type_pass  = plot_market
+
+        fig_mol, mol_summary = breakdown_view(
+            disk_cache, df, market_pivot, selected_combo, use_market_filter, market_type_pass, use_value, group_by_column
+        )
+        if fig_mol:
+            st.plotly_chart(fig_mol, use_container_width=True)
+            st.subheader("🔢 2024 Manufacturer Summary")
+            st.dataframe(mol_summary)
+        else:
+            st.warning("⚠️ No molecule-level data to show for that selection.")
 
-    plot_market = st.radio(
-        "Market Type:",
-        ["PRIVATE MARKET", "LPO", "TOTAL (PRIVATE + LPO)"],
-        horizontal=True
-    )
-    plot_metric = st.radio(
-        "Metric:",
-        ["Units", "Value"],
-        horizontal=True
-    )
-    group_by_column = st.radio(
-        "Group By:",
-        ["Manufacturer", "Product", "Strength"],
-        horizontal=True
-    )
+        with st.expander("🏪 Private vs LPO vs Total (2024)"):
+            split = market_split_table(market_pivot, selected_combo, group_by_column, use_value)
+            if split.empty:
+                st.info("ℹ️ No 2024 sales for this combination.")
+            else:
+                st.dataframe(split.round(1), use_container_width=True)
 
-    use_value         = (plot_metric == "Value")
-    use_market_filter = (plot_market != "TOTAL (PRIVATE + LPO)")
-    market_type_pass  = plot_market
-
-    fig_mol, mol_summary = plot_combination_market_breakdown_plotly(
-        df,
-        selected_molecule=selected_combo,
-        use_market_filter=use_market_filter,
-        market_type=market_type_pass,
-        use_value=use_value,
-        group_by_column=group_by_column
-    )
-    if fig_mol:
-        st.plotly_chart(fig_mol, use_container_width=True)
-        st.subheader("🔢 2024 Manufacturer Summary")
-        st.dataframe(mol_summary)
-    else:
-        st.warning("⚠️ No molecule-level data to show for that selection.")
+        # Fragment: flipping the toggle reruns only the share chart
+        @st.fragment
+        def share_chart_block(data_df, pivot, molecule, share_market_type):
+            show_share_plot = st.toggle("📈 Show Market Share Line Chart", key="share_toggle")
 
+            if show_share_plot:
+                fig_share = plot_manufacturer_market_share(data_df, selected_molecule=molecule, market_type=share_market_type, market_pivot=pivot)
 
-    show_share_plot = st.toggle("📈 Show Market Share Line Chart")
-    
-    if show_share_plot:
-        share_market_type = "TOTAL" if not use_market_filter else market_type_pass
-        fig_share = plot_manufacturer_market_share(df, selected_molecule=selected_combo, market_type=share_market_type)
-    
-        if fig_share:
-            st.plotly_chart(fig_share, use_container_width=True)
-        else:
-            st.warning("⚠️ Not enough data to show market share trends.")
+                if fig_share:
+                    st.plotly_chart(fig_share, use_container_width=True)
+                else:
+                    st.warning("⚠️ Not enough data to show market share trends.")
+
+        share_chart_block(df, market_pivot, selected_combo, "TOTAL" if not use_market_filter else market_type_pass)
 
 # === Tab 2: ATC4 Breakdown ===
 with tab2:
-    st.subheader("🔍 ATC4 Market Breakdown")
-
-    atc4_name = df.loc[
-        df["Molecule Combination"] == selected_combo,
-        "ATC4"
-    ].dropna().unique()[0]
-
-    fig_atc4, atc4_summary = plotly_combinations_within_atc4_go(
-        df,
-        atc4_name=atc4_name,
-        UseValue=use_value
-    )
-    if fig_atc4:
-        st.plotly_chart(fig_atc4, use_container_width=True)
-        st.subheader("🔢 2024 ATC4 Summary")
-        st.dataframe(atc4_summary)
-    else:
-        st.warning("⚠️ No ATC4 data to show for that molecule.")
+    if tab2.open:
+        st.subheader("🔍 ATC4 Market Breakdown")
+        use_value = st.session_state["plot_metric"] == "Value"  # Metric radio of the Graph + Table tab
+
+        atc4_name = df.loc[
+            df["Molecule Combination"] == selected_combo,
+            "ATC4"
+        ].dropna().unique()[0]
+
+        fig_atc4, atc4_summary = atc4_view(disk_cache, df, atc4_name, use_value)
+        if fig_atc4:
+            st.plotly_chart(fig_atc4, use_container_width=True)
+            st.subheader("🔢 2024 ATC4 Summary")
+            st.dataframe(atc4_summary)
+        else:
+            st.warning("⚠️ No ATC4 data to show for that molecule.")
 
 # === Tab 3: Summary + Packs ===
 with tab3:
-    st.subheader("📋 Molecule Summary and Pack Overview")
+    if tab3.open:
+        st.subheader("📋 Molecule Summary and Pack Overview")
 
-    summary_df = generate_molecule_overview(df, selected_combo)
-    if summary_df is not None:
-        st.table(summary_df)
-    else:
-        st.warning(f"❌ No summary data for '{selected_combo}'")
-
-    st.markdown("---")
-    packs_md = generate_combination_first_clean_summary(df, selected_combo)
-    st.markdown(packs_md)
+        summary_df = generate_molecule_overview(df, selected_combo, atc_tree=atc_tree, market_pivot=market_pivot)
+        if summary_df is not None:
+            st.table(summary_df)
+        else:
+            st.warning(f"❌ No summary data for '{selected_combo}'")
+
+        st.markdown("---")
+        with STARTUP.stage("pack hierarchy"):
+            pack_hierarchy = load_pack_hierarchy()
+        packs_md = generate_combination_first_clean_summary(df, selected_combo, hierarchy=pack_hierarchy)
+        st.markdown(packs_md)
+
+        st.markdown("---")
+        st.markdown("🔗 **Matched MOHAP Registrations:**")
+        with STARTUP.stage("product crosswalk"):
+            product_crosswalk = load_product_crosswalk(dataset_version(MASTER_DATA_PATH, MOHAP_PATH))
+        matches = products_for(product_crosswalk, selected_combo)
+        matches = matches[matches["Confidence"] != "NONE"]
+        if matches.empty:
+            st.info("ℹ️ No MOHAP trade names matched to this combination's products.")
+        else:
+            unit_prices = join_mohap(matches, mohap_df, min_confidence="LOW").groupby(
+                ["Product", "Manufacturer"]
+            )["Public Price per Unit (AED)"].median().rename("Median AED / Unit")
+            st.dataframe(
+                matches.merge(unit_prices, on=["Product", "Manufacturer"], how="left")[[
+                    "Product", "Manufacturer", "Trade Names", "Company", "Score", "Confidence", "Median AED / Unit"
+                ]].round(2),
+                use_container_width=True, hide_index=True
+            )
+            st.caption("🔗 Products are matched on name, ingredients and company within blocks of MOHAP products sharing an ingredient. Score is 0–1; LOW matches deserve a manual check.")
 
 # === Tab 4: MOHAP Insights ===
 with tab4:
-    st.subheader("🏛️ MOHAP Registered Product Landscape")
-
-    mohap_ingredient = st.selectbox(
-        "🔎 Search by Ingredient (MOHAP):",
-        sorted(mohap_df["Ingredient"].dropna().unique())
-    )
+    if tab4.open:
+        st.subheader("🏛️ MOHAP Registered Product Landscape")
+        with STARTUP.stage("price history"):
+            price_history = load_price_history(dataset_version(os.path.join(PRICE_HISTORY_DIR, MANIFEST_FILE)))
+
+        # Fragment: picking an ingredient reruns only this tab's block
+        @st.fragment
+        def mohap_block(mohap_df):
+            mohap_ingredient = st.selectbox(
+                "🔎 Search by Ingredient (MOHAP):",
+                sorted(mohap_df["Ingredient"].dropna().unique()),
+                key="mohap_ingredient"
+            )
 
-    mohap_markdown = format_registered_products_by_company(mohap_ingredient, mohap_df)
-    st.markdown(mohap_markdown)
-    # Sanitize Ingredient column
-    mohap_df["Ingredient_clean"] = mohap_df["Ingredient"].astype(str).str.upper().str.strip()
+            mohap_markdown = format_registered_products_by_company(mohap_ingredient, mohap_df, price_history=price_history)
+            st.markdown(mohap_markdown)
+
+            with st.expander("🕓 Price List Releases"):
+                releases = price_history["versions"]
+                if releases.empty:
+                    st.caption("🕓 No releases recorded yet. Record the current list with `python -m tool_functions.PriceHistory [--date YYYY-MM-DD]`.")
+                st.dataframe(releases.drop(columns=["Fingerprint"]), use_container_width=True, hide_index=True)
+                if len(releases) > 1:
+                    labels = {f"v{r.Version} ({r.Date:%Y-%m-%d})": r.Version for r in releases.itertuples()}
+                    colFrom, colTo = st.columns(2)
+                    from_label = colFrom.selectbox("From release:", list(labels), index=len(labels) - 2)
+                    to_label = colTo.selectbox("To release:", list(labels), index=len(labels) - 1)
+                    st.dataframe(changes_between(price_history, labels[from_label], labels[to_label]), use_container_width=True)
+            # Sanitize Ingredient column
+            mohap_df["Ingredient_clean"] = mohap_df["Ingredient"].astype(str).str.upper().str.strip()
     
-    # Show unique values that include DAPAGLIFLOZIN
-    matches = mohap_df[mohap_df["Ingredient_clean"].str.contains("DAPAGLIFLOZIN", na=False)]
+            # Show unique values that include DAPAGLIFLOZIN
+            matches = mohap_df[mohap_df["Ingredient_clean"].str.contains("DAPAGLIFLOZIN", na=False)]
     
-    st.write("DAPAGLIFLOZIN Matches", matches[["Ingredient", "Ingredient_clean"]].drop_duplicates())
+            st.write("DAPAGLIFLOZIN Matches", matches[["Ingredient", "Ingredient_clean"]].drop_duplicates())
+
+        mohap_block(mohap_df)
 
 with tab5:
-    st.subheader("📅 Orange Book Patent Expiry Lookup")
-
-    # --- Load Data ---
-    ob_products = pd.read_csv("OBproducts.csv")
-    ob_patents  = pd.read_csv("OBpatents.csv")
-
-    # --- Clean Orange Book product data ---
-    ob_products.columns = ob_products.columns.str.strip()
-    ob_products["Ingredient"] = ob_products["Ingredient"].astype(str).str.upper().str.strip()
-    ob_products["Ingredient_List"] = ob_products["Ingredient"].str.split(";")
-    ob_products["Ingredient_Formatted"] = ob_products["Ingredient_List"].apply(lambda x: " +".join(x))
-    ob_products["Ingredient_Formatted_Clean"] = ob_products["Ingredient_Formatted"].str.strip().str.upper()
-
-    # --- Dropdown selection ---
-    selected_ingredient = st.selectbox(
-        "🔎 Select Ingredient Combination:",
-        sorted(ob_products["Ingredient_Formatted_Clean"].dropna().unique())
-    )
+    if tab5.open:
+        st.subheader("📅 Orange Book Patent Expiry Lookup")
+
+        # --- Load Data ---
+        ob_products, ob_patents = load_orange_book()
 
-    # --- Display patent summary in exec style ---
-    display_patent_summary(ob_products, ob_patents, selected_ingredient)
+        # --- Dropdown selection ---
+        selected_ingredient = st.selectbox(
+            "🔎 Select Ingredient Combination:",
+            sorted(ob_products["Ingredient_Formatted_Clean"].dropna().unique()),
+            key="ob_ingredient"
+        )
+
+        # --- Display patent summary in exec style ---
+        display_patent_summary(ob_products, ob_patents, selected_ingredient)
 
 with tab6:
-    st.subheader("📉 Originator Erosion & Uptake Curve")
-
-    with st.spinner("Analyzing erosion and plotting uptake..."):
-        try:
-            fig, erosion_summary = plot_market_erosion(df.copy(), selected_combo)
-
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
-
-            if erosion_summary:
-                st.markdown(f"""
-### 📉 **Originator Erosion for `{selected_combo.upper()}`**
-- **2021 Market Share:** {erosion_summary['originator_2021']:.2%}  
-- **2024 Market Share:** {erosion_summary['originator_2024']:.2%}  
-- **Drop:** {erosion_summary['drop']:.2f}%
-
----
-
-### 📊 **ATC4 Erosion Benchmark – `{erosion_summary['atc4_code']}`**
-- **Average Erosion Across ATC4:** {erosion_summary['average_atc4_erosion']:.2f}%  
-- **Avg Originator Share in 2021:** {erosion_summary['avg_originator_2021']:.2%}  
-- **Avg Originator Share in 2024:** {erosion_summary['avg_originator_2024']:.2%}
-                """)
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
+    if tab6.open:
+        st.subheader("📉 Originator Erosion & Uptake Curve")
+
+        with st.spinner("Analyzing erosion and plotting uptake..."):
+            with STARTUP.stage("uptake library"):
+                uptake_library = load_uptake_library()
+            try:
+                fig, erosion_summary = erosion_view(disk_cache, df, uptake_library, selected_combo)
+
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
+
+                if erosion_summary:
+                    st.markdown(f"""
+    ### 📉 **Originator Erosion for `{selected_combo.upper()}`**
+    - **2021 Market Share:** {erosion_summary['originator_2021']:.2%}  
+    - **2024 Market Share:** {erosion_summary['originator_2024']:.2%}  
+    - **Drop:** {erosion_summary['drop']:.2f}%
+
+    ---
+
+    ### 📊 **ATC4 Erosion Benchmark – `{erosion_summary['atc4_code']}`**
+    - **Average Erosion Across ATC4:** {erosion_summary['average_atc4_erosion']:.2f}%  
+    - **Avg Originator Share in 2021:** {erosion_summary['avg_originator_2021']:.2%}  
+    - **Avg Originator Share in 2024:** {erosion_summary['avg_originator_2024']:.2%}
+                    """)
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
+
+        with STARTUP.stage("market events"):
+            market_events = load_market_events(dataset_version(MASTER_DATA_PATH))
+        combo_events = market_events[market_events["Molecule Combination"] == selected_combo]
+        if not combo_events.empty:
+            st.markdown("#### 🚨 Entry Events")
+            st.dataframe(combo_events.drop(columns=["Molecule Combination", "ATC4", "ATC3"]).round(1), use_container_width=True, hide_index=True)
+
+# === Tab 7: Multi-Molecule Comparison ===
+with tab7:
+    if tab7.open:
+        st.subheader("🆚 Compare Molecule Combinations")
+
+        if st.session_state.get("compare_combos") is None:
+            st.session_state["compare_combos"] = [selected_combo]
+        compare_combos = st.multiselect(
+            "🔎 Select combinations to compare:",
+            sorted(df["Molecule Combination"].dropna().unique()),
+            max_selections=10,
+            key="compare_combos"
+        )
+        compare_value = st.radio("Metric:", ["Units", "Value"], horizontal=True, key="compare_metric") == "Value"
+
+        if compare_combos:
+            cmp_metrics, fig_trend, fig_split, fig_cmp_share = plot_comparison(df, compare_combos, use_value=compare_value)
+
+            if cmp_metrics is None:
+                st.warning("⚠️ No data for the selected combinations.")
+            else:
+                st.dataframe(cmp_metrics.round(1).T.astype(str), use_container_width=True)
+
+                colL, colR = st.columns(2)
+                colL.plotly_chart(fig_trend, use_container_width=True)
+                colR.plotly_chart(fig_split, use_container_width=True)
+                st.plotly_chart(fig_cmp_share, use_container_width=True)
+
+                st.markdown("#### 🎲 Simulated Entry Revenue (default scenario)")
+                st.dataframe(
+                    simulate_entry_batch(cmp_metrics, seed=0).map(lambda v: f"{v:,.0f}"),
+                    use_container_width=True
+                )
+                st.caption("🎲 Cumulative CIF revenue, 4–12% capture, 10–40% price discount, launch 2025–2027.")
+        else:
+            st.info("Pick at least one combination.")
+
+# === Tab 8: Analog Molecules ===
+with tab8:
+    if tab8.open:
+        st.subheader(f"🧭 Analog Molecules for `{selected_combo}`")
+
+        colK, colScope = st.columns(2)
+        analog_k = colK.slider("Number of analogs", 3, 25, key="analog_k")
+        analog_scope = colScope.radio("Restrict to same:", ["Any class", "ATC2", "ATC3"], horizontal=True, key="analog_scope")
+
+        with STARTUP.stage("analog index"):
+            analog_index = load_analog_index()
+
+        analogs = find_analogs(
+            analog_index,
+            selected_combo,
+            k=analog_k,
+            same_atc_level=None if analog_scope == "Any class" else analog_scope
+        )
+        if analogs is None or analogs.empty:
+            st.warning("⚠️ No analogs found for that selection.")
+        else:
+            target = analog_index["features"].loc[[selected_combo]].assign(Distance=0.0)
+            analog_table = pd.concat([target, analogs])[[
+                "Distance", "2024 Value (AED)", "Value CAGR (%)", "Manufacturers", "Top Share (%)",
+                "HHI", "Private Share (%)", "LPO Share (%)", "Years Since Launch", "ATC3", "ATC4"
+            ]]
+            st.dataframe(analog_table.round(2), use_container_width=True)
+            st.caption("🧭 First row is the selected combination. Distance is computed on standardized size, CAGR, manufacturer count, top share, HHI, private/LPO mix, years since first launch and ATC class.")
+
+# === Tab 9: ATC Explorer ===
+with tab9:
+    if tab9.open:
+        st.subheader("🌳 ATC Market Explorer")
+
+        colChart, colRoot, colDepth = st.columns(3)
+        atc_chart = colChart.radio("Chart:", ["Treemap", "Sunburst"], horizontal=True, key="atc_chart")
+        atc_root_level = colRoot.selectbox("Start from:", ["All", "ATC1", "ATC2", "ATC3", "ATC4"], key="atc_root_level")
+        atc_depth = colDepth.slider("Levels shown", 2, 5, key="atc_depth")
+
+        atc_root = None
+        if atc_root_level != "All":
+            atc_root = summary[atc_root_level.lower()] if summary else None
+            st.caption(f"Zoomed to the {atc_root_level} of `{selected_combo}`: `{atc_root}`")
+
+        st.plotly_chart(
+            plot_atc_tree(atc_tree, chart=atc_chart.lower(), root=atc_root, root_level=atc_root_level, max_depth=atc_depth),
+            use_container_width=True
+        )
+
+        st.markdown("#### 🧬 Class Context for the Selected Combination")
+        path_rows = []
+        for level in ["ATC1", "ATC2", "ATC3", "ATC4"]:
+            m = get_class_metrics(atc_tree, level, summary[level.lower()]) if summary else None
+            if m is None:
+                continue
+            path_rows.append({
+                "Level": level,
+                "Code": summary[level.lower()],
+                "2024 Value (AED)": f"{m['value_2024']:,.0f}",
+                "Value CAGR (%)": f"{m['value_cagr']:.1f}",
+                "Units CAGR (%)": f"{m['unit_cagr']:.1f}",
+                "HHI": f"{m['hhi']:,.0f}",
+                "Top Manufacturer": m["top_manufacturer"],
+                "Top Share (%)": f"{m['top_share']:.1f}",
+                "Combinations": m["combinations"],
+            })
+        if path_rows:
+            st.dataframe(pd.DataFrame(path_rows), use_container_width=True)
+
+# === Tab 10: Ad-hoc SQL ===
+with tab10:
+    if tab10.open:
+        st.subheader("🧮 Ad-hoc Query")
+        st.caption("Tables: `master` (Master Data), `mohap` (MOHAP price list), `ob_products`, `ob_patents` (Orange Book). Quote column names with spaces, e.g. `\"2024 LC Value\"`.")
+
+        from tool_functions.QueryEngine import run_query, table_schemas, EXAMPLE_QUERIES
+        with STARTUP.stage("query engine"):
+            query_engine = load_query_engine(dataset_version())
+
+        example = st.selectbox("Start from an example:", ["(blank)"] + list(EXAMPLE_QUERIES), key="sql_example")
+        example_sql = ""
+        if example != "(blank)":
+            sel_rows = df[df["Molecule Combination"] == selected_combo]
+            atc3_mode = sel_rows["ATC3"].mode()
+            manu_mode = sel_rows["Manufacturer"].mode()
+            example_sql = EXAMPLE_QUERIES[example].format(
+                atc3=str(atc3_mode.iloc[0]).replace("'", "''") if len(atc3_mode) else "",
+                manufacturer=str(manu_mode.iloc[0]).replace("'", "''") if len(manu_mode) else ""
+            )
+        # Picking another example replaces the SQL; otherwise the edited text is kept across tabs
+        if st.session_state.get("sql_example_applied") != example:
+            st.session_state["sql_text"] = example_sql
+            st.session_state["sql_example_applied"] = example
+        sql = st.text_area("SQL", height=200, key="sql_text")
+
+        with st.expander("📚 Table columns"):
+            st.dataframe(table_schemas(query_engine), use_container_width=True, hide_index=True)
+
+        if st.button("▶️ Run query") and sql.strip():
+            try:
+                result, truncated = run_query(query_engine, sql)
+            except Exception as e:
+                st.error(f"❌ {e}")
+            else:
+                st.dataframe(result, use_container_width=True)
+                st.caption(f"{len(result):,} rows" + (" (first rows only — add a LIMIT or aggregate further)" if truncated else ""))
+                st.download_button("⬇️ Download CSV", result.to_csv(index=False), file_name="query_result.csv")
+
+# === Tab 11: Manufacturer Portfolio ===
+with tab11:
+    if tab11.open:
+        st.subheader("🏭 Manufacturer Portfolio")
+        with STARTUP.stage("portfolio index"):
+            portfolio_index = load_portfolio_index()
+
+        manu_options = portfolio_index["manufacturers"].index.tolist()
+        default_manu = summary["top_2024_manufacturer"] if summary else None
+        if st.session_state.get("portfolio_manu") not in manu_options:
+            st.session_state["portfolio_manu"] = default_manu if default_manu in manu_options else manu_options[0]
+        colManu, colMetric = st.columns([3, 1])
+        portfolio_manu = colManu.selectbox("🔎 Select Manufacturer:", manu_options, key="portfolio_manu")
+        portfolio_value = colMetric.radio("Metric:", ["Value", "Units"], horizontal=True, key="portfolio_metric") == "Value"
+
+        portfolio = get_portfolio(portfolio_index, portfolio_manu)
+        p_summary = portfolio["summary"]
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("2024 Sales (AED)", f"{p_summary['2024 LC Value']:,.0f}", f"{p_summary['Value CAGR (%)']:.1f}% CAGR")
+        col2.metric("Market Rank (2024 Value)", f"#{int(p_summary['Rank 2024'])} of {len(manu_options)}")
+        col3.metric("Combinations / Products / Packs", f"{int(p_summary['Combinations'])} / {int(p_summary['Products'])} / {int(p_summary['Packs'])}")
+        col4.metric("Leads / Losing Share", f"{int(p_summary['Leads'])} / {int(p_summary['Losing Share'])}")
+
+        trend_fig, share_fig = plot_portfolio(portfolio_index, portfolio_manu, use_value=portfolio_value)
+        colTrend, colShare = st.columns(2)
+        colTrend.plotly_chart(trend_fig, use_container_width=True)
+        colShare.plotly_chart(share_fig, use_container_width=True)
+
+        st.markdown("#### 🧬 Positions by Combination")
+        st.dataframe(
+            portfolio["combinations"][[
+                "2024 LC Value", "2024 Units", "Value CAGR (%)", "Share 2021 (%)", "Share 2024 (%)",
+                "Share Change (pts)", "Rank 2024", "Competitors", "LPO Share of Units (%)"
+            ]].round(1),
+            use_container_width=True
+        )
+        losing = portfolio["combinations"][portfolio["combinations"]["Share Change (pts)"] < LOSING_SHARE_PTS]
+        if not losing.empty:
+            st.markdown("**📉 Losing share in:** " + ", ".join(
+                f"`{c}` ({row['Share Change (pts)']:+.1f} pts)" for c, row in losing.head(10).iterrows()
+            ))
+
+        with st.expander("📦 Products and Packs"):
+            st.dataframe(portfolio["products"].round(0), use_container_width=True)
+            st.dataframe(portfolio["packs"].round(0), use_container_width=True)
+
+        # --- Competitor overlap (sparse products over the manufacturer × combination matrix) ---
+        from tool_functions.CompetitorOverlap import competitor_overlap, overlap_pairs, atc_codes
+        st.markdown("#### 🤝 Competitor Overlap (2024)")
+        with STARTUP.stage("overlap matrix"):
+            overlap_matrix = load_overlap_matrix()
+        overlap_atc = st.selectbox("Restrict to ATC class:", ["All"] + atc_codes(overlap_matrix), key="overlap_atc")
+        overlap_scope = None if overlap_atc == "All" else overlap_atc
+
+        rivals = competitor_overlap(overlap_matrix, portfolio_manu, atc=overlap_scope, use_value=portfolio_value)
+        if rivals is None or rivals.empty:
+            st.info("No competitors share a combination with this manufacturer in that scope.")
+        else:
+            st.dataframe(rivals.round(2), use_container_width=True)
+            st.caption(
+                "🤝 Similarity = cosine of the two portfolios' " + ("value" if portfolio_value else "units") +
+                " vectors; Our Exposure = share of this manufacturer's 2024 " + ("value" if portfolio_value else "units") +
+                " in combinations the rival also sells."
+            )
+
+        with st.expander("🔗 Most Overlapping Manufacturer Pairs" + ("" if overlap_scope is None else f" in {overlap_scope}")):
+            st.dataframe(overlap_pairs(overlap_matrix, atc=overlap_scope, use_value=portfolio_value).round(2), use_container_width=True, hide_index=True)
+
+# === Tab 12: Market-wide Entry Events ===
+with tab12:
+    if tab12.open:
+        st.subheader("🚨 Market Events")
+        with STARTUP.stage("market events"):
+            market_events = load_market_events(dataset_version(MASTER_DATA_PATH))
+
+        if market_events.empty:
+            st.info("No entry events in the data window.")
+        else:
+            year_lo, year_hi = int(market_events["Year"].min()), int(market_events["Year"].max())
+            if st.session_state.get("event_years") is None:
+                st.session_state["event_years"] = (year_lo, year_hi)
+
+            colTypes, colYears = st.columns([3, 2])
+            event_types = colTypes.multiselect("Event types:", EVENT_TYPES, key="event_types")
+            if year_lo < year_hi:
+                event_years = colYears.slider("Years:", year_lo, year_hi, key="event_years")
+            else:
+                event_years = (year_lo, year_hi)
+            colAtc, colSearch, colDrop = st.columns(3)
+            event_atc3 = colAtc.selectbox("ATC3:", ["All"] + sorted(market_events["ATC3"].dropna().unique()), key="event_atc3")
+            event_search = colSearch.text_input("🔎 Combination or manufacturer contains:", key="event_search")
+            event_min_drop = colDrop.slider("Min originator share drop (pts):", ORIGINATOR_DROP_PTS, 50.0, step=2.5, key="event_min_drop")
+
+            shown = filter_events(
+                market_events,
+                event_types=event_types,
+                years=event_years,
+                atc3=None if event_atc3 == "All" else event_atc3,
+                search=event_search.strip(),
+                min_drop=event_min_drop,
+            )
+            counts = shown.groupby("Event").size().reindex(EVENT_TYPES, fill_value=0)
+            for col, (event, count) in zip(st.columns(len(EVENT_TYPES)), counts.items()):
+                col.metric(event, f"{count:,}")
+
+            st.dataframe(shown.round(1), use_container_width=True, hide_index=True)
+            st.download_button("⬇️ Download CSV", shown.to_csv(index=False), file_name="market_events.csv")
+            st.caption(
+                f"🚨 Originator = largest seller in the combination's first year of sales; a drop is a fall of at least "
+                f"{ORIGINATOR_DROP_PTS:.0f} pts of unit share in one year. Competitor counts are manufacturers with sales."
+            )
+
+# --- Background warm-up: started from a session's second run on, so the first run only loads
+# what its open tab needs (start_warmup also loads the Orange Book, uptake library, expiry map
+# and price-volume-mix table) ---
+if st.session_state.get("first_run_done"):
+    warmup_status = start_warmup(dataset_version()).status()
+    if warmup_status["running"]:
+        st.sidebar.caption(f"🔥 Warming up popular molecules: {warmup_status['done']}/{warmup_status['total']}")
+st.session_state["first_run_done"] = True
+
+with st.sidebar.expander("⏱️ Startup timings"):
+    st.dataframe(STARTUP.as_frame().round(3), use_container_width=True, hide_index=True)
+    st.caption("First time each stage ran in this server process; later runs read the caches.")
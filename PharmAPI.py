@@ -0,0 +1,307 @@
+"""
+Local JSON API over the PharmaDive analytics functions.
+
+Run:  python PharmAPI.py --port 8502
+
+GET  /health
+GET  /molecules
+GET  /exec-summary?molecule=...
+GET  /atc4?molecule=...&use_value=1&figure=0      (or atc4=... instead of molecule)
+GET  /erosion?molecule=...&figure=0
+GET  /regulatory?molecule=...
+POST /batch/<endpoint>   body: {"molecules": [...], <other params>}
+
+Every response is cached in memory, keyed by endpoint, parameters and dataset version.
+The Datasets / handle_request pair works without a socket, so it can be exercised offline
+with in-memory frames.
+"""
+import argparse
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from tool_functions.DataLoad import (
+    dataset_version,
+    load_master_data,
+    load_mohap_data,
+    load_orange_book,
+)
+from tool_functions.SummaryGen import generate_exec_summary_data
+from tool_functions.MoleculeATC4 import plotly_combinations_within_atc4_go
+from tool_functions.Erosion import build_uptake_library, plot_market_erosion
+from tool_functions.Reg import get_regulatory_summary
+
+MAX_BATCH = 200
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Datasets ---
+class Datasets:
+    def __init__(self, df, mohap_df=None, ob_products=None, ob_patents=None, version=None):
+        self.df = df
+        self.mohap_df = mohap_df
+        self.ob_products = ob_products
+        self.ob_patents = ob_patents
+        self.version = version or "in-memory"
+        self._uptake_library = None
+
+    @property
+    def uptake_library(self):
+        # built on the first erosion request, shared by every later one
+        if self._uptake_library is None:
+            self._uptake_library = build_uptake_library(self.df)
+        return self._uptake_library
+
+    @classmethod
+    def from_files(cls):
+        try:
+            ob_products, ob_patents = load_orange_book()
+        except FileNotFoundError:
+            ob_products, ob_patents = None, None
+        return cls(
+            load_master_data(),
+            load_mohap_data(),
+            ob_products,
+            ob_patents,
+            version=dataset_version(),
+        )
+
+
+# --- Response cache ---
+class ResponseCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, fn):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        # compute outside the lock so slow molecules don't block other requests
+        value = fn()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+
+# --- JSON helpers ---
+def to_jsonable(obj):
+    if isinstance(obj, dict):
+        return {str(k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, pd.DataFrame):
+        return to_jsonable(obj.to_dict(orient="records"))
+    if isinstance(obj, pd.Series):
+        return to_jsonable(obj.to_dict())
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, float) and np.isnan(obj):
+        return None
+    if isinstance(obj, np.ndarray):
+        return to_jsonable(obj.tolist())
+    if isinstance(obj, (date, datetime, pd.Timestamp)):
+        return obj.isoformat()
+    if hasattr(obj, "to_plotly_json"):
+        return json.loads(obj.to_json())
+    return obj
+
+
+def _flag(params, name, default=False):
+    raw = params.get(name)
+    if raw is None:
+        return default
+    return str(raw).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _molecule(params):
+    molecule = str(params.get("molecule") or "").strip().upper()
+    if not molecule:
+        raise ApiError("missing 'molecule' parameter")
+    return molecule
+
+
+# --- Endpoints ---
+def exec_summary_endpoint(data, params):
+    molecule = _molecule(params)
+    summary = generate_exec_summary_data(data.df, molecule)
+    if summary is None:
+        raise ApiError(f"no data for molecule '{molecule}'", status=404)
+    return summary
+
+
+def atc4_endpoint(data, params):
+    atc4_name = params.get("atc4")
+    if not atc4_name:
+        molecule = _molecule(params)
+        codes = data.df.loc[data.df["Molecule Combination"] == molecule, "ATC4"].dropna().unique()
+        if len(codes) == 0:
+            raise ApiError(f"no ATC4 found for molecule '{molecule}'", status=404)
+        atc4_name = codes[0]
+
+    fig, summary_df = plotly_combinations_within_atc4_go(
+        data.df, atc4_name=atc4_name, UseValue=_flag(params, "use_value", True)
+    )
+    if fig is None:
+        raise ApiError(f"no data for ATC4 '{atc4_name}'", status=404)
+
+    result = {"atc4": atc4_name, "summary": summary_df}
+    if _flag(params, "figure"):
+        result["figure"] = fig
+    return result
+
+
+def erosion_endpoint(data, params):
+    molecule = _molecule(params)
+    fig, erosion_stats = plot_market_erosion(data.df, molecule, library=data.uptake_library)
+    if erosion_stats is None:
+        raise ApiError(f"no data for molecule '{molecule}'", status=404)
+
+    result = {"molecule": molecule, "erosion": erosion_stats}
+    if _flag(params, "figure"):
+        result["figure"] = fig
+    return result
+
+
+def regulatory_endpoint(data, params):
+    molecule = _molecule(params)
+    if data.mohap_df is None or data.ob_products is None or data.ob_patents is None:
+        raise ApiError("MOHAP / Orange Book data not loaded", status=503)
+    reg = get_regulatory_summary(molecule, data.mohap_df, data.ob_products, data.ob_patents)
+    return {"molecule": molecule, **reg}
+
+
+def molecules_endpoint(data, params):
+    return sorted(data.df["Molecule Combination"].dropna().unique())
+
+
+ENDPOINTS = {
+    "exec-summary": exec_summary_endpoint,
+    "atc4": atc4_endpoint,
+    "erosion": erosion_endpoint,
+    "regulatory": regulatory_endpoint,
+    "molecules": molecules_endpoint,
+}
+
+
+def handle_request(data, cache, endpoint, params):
+    if endpoint not in ENDPOINTS:
+        raise ApiError(f"unknown endpoint '{endpoint}'", status=404)
+
+    key = (endpoint, tuple(sorted((k, str(v)) for k, v in params.items())), data.version)
+    return cache.get_or_compute(key, lambda: to_jsonable(ENDPOINTS[endpoint](data, params)))
+
+
+def handle_batch(data, cache, endpoint, body):
+    molecules = body.get("molecules")
+    if not isinstance(molecules, list) or not molecules:
+        raise ApiError("body must contain a non-empty 'molecules' list")
+    if len(molecules) > MAX_BATCH:
+        raise ApiError(f"at most {MAX_BATCH} molecules per batch")
+
+    shared = {k: v for k, v in body.items() if k != "molecules"}
+    results = {}
+    for molecule in molecules:
+        try:
+            results[molecule] = handle_request(data, cache, endpoint, {**shared, "molecule": molecule})
+        except ApiError as e:
+            results[molecule] = {"error": str(e)}
+    return results
+
+
+# --- HTTP layer ---
+def make_handler(data, cache):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _run(self, fn):
+            try:
+                self._send(200, fn())
+            except ApiError as e:
+                self._send(e.status, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            endpoint = url.path.strip("/")
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if endpoint == "health":
+                self._send(200, {
+                    "status": "ok",
+                    "dataset_version": data.version,
+                    "cache_hits": cache.hits,
+                    "cache_misses": cache.misses,
+                })
+                return
+            self._run(lambda: handle_request(data, cache, endpoint, params))
+
+        def do_POST(self):
+            path = urlparse(self.path).path.strip("/")
+            if not path.startswith("batch/"):
+                self._send(404, {"error": f"unknown endpoint '{path}'"})
+                return
+
+            def run_batch():
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    raise ApiError("body is not valid JSON")
+                return handle_batch(data, cache, path[len("batch/"):], body)
+
+            self._run(run_batch)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def create_server(data, host="127.0.0.1", port=8502, cache=None):
+    cache = cache or ResponseCache()
+    server = ThreadingHTTPServer((host, port), make_handler(data, cache))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PharmaDive JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    server = create_server(Datasets.from_files(), args.host, args.port)
+    print(f"Serving PharmaDive API on http://{args.host}:{args.port}")
+    server.serve_forever()
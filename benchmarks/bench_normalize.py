@@ -0,0 +1,135 @@
+"""
+Load-time benchmark: row-wise string normalization (the previous .apply / lambda
+implementations) vs. the vectorized, distinct-value pipeline in tool_functions.Normalize.
+
+Run from the repo root:  python benchmarks/bench_normalize.py [n_master_rows]
+Uses "Master Data.csv" when present, otherwise a synthetic frame built from the MOHAP price list.
+"""
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_functions.Normalize import (
+    clean_combo_series,
+    clean_ingredient_series,
+    combination_map,
+    combination_type,
+    normalize_mohap,
+    upper_strip,
+)
+
+
+# --- Previous row-wise implementations ---
+def legacy_clean_combo(x):
+    if pd.isna(x):
+        return ""
+    return re.sub(r"\s+", " ", str(x).strip().upper())
+
+
+def legacy_clean_ingredient_string(text):
+    text = re.sub(r"\(.*?\)", "", str(text))
+    text = text.replace(",", "").strip().upper()
+    return text
+
+
+def legacy_master(df):
+    df = df.copy()
+    df["Molecule"] = df["Molecule"].astype(str).str.strip().str.upper()
+    df["Product"] = df["Product"].astype(str).str.strip().str.upper()
+    product_molecule_map = (
+        df.groupby("Product")["Molecule"]
+        .unique()
+        .apply(lambda mols: " + ".join(sorted(set(mols))))
+        .to_dict()
+    )
+    df["Molecule Combination"] = df["Product"].map(product_molecule_map)
+    df["Molecule Combination Type"] = df["Molecule Combination"].apply(
+        lambda x: "MONO" if " + " not in x else "COMBINATION"
+    )
+    df["Molecule Combination"] = df["Molecule Combination"].apply(legacy_clean_combo)
+    return df
+
+
+def legacy_mohap(mohap_df):
+    mohap_df = mohap_df.copy()
+    mohap_df["Ingredient"] = mohap_df["Ingredient"].astype(str)
+    mohap_df["Ingredient_clean"] = mohap_df["Ingredient"].apply(legacy_clean_ingredient_string)
+    mohap_df["Trade Name"] = mohap_df["Trade Name"].astype(str).str.strip()
+    mohap_df["Form"] = mohap_df["Form"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    mohap_df["Strength"] = mohap_df["Strength"].astype(str).str.strip()
+    mohap_df["Company"] = mohap_df["Company"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    mohap_df["Agent"] = mohap_df["Agent"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    return mohap_df
+
+
+# --- Vectorized pipeline ---
+def vectorized_master(df):
+    df = df.copy()
+    df["Molecule"] = upper_strip(df["Molecule"])
+    df["Product"] = upper_strip(df["Product"])
+    df["Molecule Combination"] = df["Product"].map(combination_map(df["Product"], df["Molecule"]))
+    df["Molecule Combination Type"] = combination_type(df["Molecule Combination"])
+    df["Molecule Combination"] = clean_combo_series(df["Molecule Combination"])
+    return df
+
+
+def vectorized_mohap(mohap_df):
+    return normalize_mohap(mohap_df.copy())
+
+
+def synthetic_master(mohap_df, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    products = mohap_df["Trade Name"].dropna().astype(str).unique()
+    ingredients = mohap_df["Ingredient"].dropna().astype(str).unique()
+    product_idx = rng.integers(0, len(products), n_rows)
+    return pd.DataFrame({
+        "Product": [f" {p.lower()} " for p in products[product_idx]],
+        "Molecule": ingredients[(product_idx + rng.integers(0, 2, n_rows)) % len(ingredients)],
+    })
+
+
+def timeit(fn, arg, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(arg)
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    mohap_df = pd.read_csv("PriceListMOHAP.csv")
+    mohap_df.columns = mohap_df.columns.str.replace("\n", " ", regex=False).str.strip()
+
+    if os.path.exists("Master Data.csv"):
+        master = pd.read_csv("Master Data.csv")
+        master.columns = master.columns.str.replace("\n", " ", regex=False).str.strip()
+        label = f"Master Data.csv ({len(master):,} rows)"
+    else:
+        master = synthetic_master(mohap_df, n_rows)
+        label = f"synthetic Master Data ({len(master):,} rows)"
+
+    print(f"{'stage':<40}{'row-wise (s)':>14}{'vectorized (s)':>16}{'speed-up':>10}")
+    for name, legacy, fast, data in [
+        (label, legacy_master, vectorized_master, master),
+        (f"MOHAP price list ({len(mohap_df):,} rows)", legacy_mohap, vectorized_mohap, mohap_df),
+    ]:
+        t_old, out_old = timeit(legacy, data)
+        t_new, out_new = timeit(fast, data)
+        pd.testing.assert_frame_equal(
+            out_old.astype(object).reset_index(drop=True),
+            out_new.astype(object).reset_index(drop=True),
+        )
+        print(f"{name:<40}{t_old:>14.3f}{t_new:>16.3f}{t_old / t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
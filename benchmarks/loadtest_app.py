@@ -0,0 +1,298 @@
+"""
+Concurrent-session load test for PharmAI.py, driven headlessly through Streamlit's
+app-testing API (streamlit.testing.v1.AppTest) on synthetic data.
+
+Each simulated analyst is one AppTest session in its own process (AppTest swaps Streamlit's
+Runtime singleton on every run, so sessions can't share one process). Sessions share the
+disk cache like the users of one replica do, but not the in-memory st.cache_data /
+st.cache_resource. A session opens the app and then performs random actions:
+switching molecule, flipping the Graph + Table radios, toggling the share chart, picking
+a MOHAP ingredient or Orange Book ingredient, changing the analog scope / ATC chart.
+Tabs are lazy (only the open tab runs), so an action on another tab first opens it;
+the tab switch is a rerun of its own and is timed like any other.
+
+It first reports the cold start (first render of the first session, empty disk cache),
+then rerun latency percentiles and memory per session for every concurrency level. Errors
+count app exceptions plus anything that escaped a script thread; a level with any error is
+marked FAIL and the run exits non-zero.
+
+Run from the repo root:
+    python benchmarks/loadtest_app.py [--levels 1,2,4,8] [--actions 15] [--products 300]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(REPO, "PharmAI.py")
+sys.path.insert(0, REPO)
+
+MOLECULES = {
+    "METFORMIN": ("A", "A10", "A10B", "A10BA"),
+    "SITAGLIPTIN": ("A", "A10", "A10B", "A10BH"),
+    "DAPAGLIFLOZIN": ("A", "A10", "A10B", "A10BK"),
+    "EMPAGLIFLOZIN": ("A", "A10", "A10B", "A10BK"),
+    "AMLODIPINE": ("C", "C08", "C08C", "C08CA"),
+    "VALSARTAN": ("C", "C09", "C09C", "C09CA"),
+    "LOSARTAN": ("C", "C09", "C09C", "C09CA"),
+    "ATORVASTATIN": ("C", "C10", "C10A", "C10AA"),
+    "ROSUVASTATIN": ("C", "C10", "C10A", "C10AA"),
+    "EZETIMIBE": ("C", "C10", "C10A", "C10AX"),
+    "OMEPRAZOLE": ("A", "A02", "A02B", "A02BC"),
+    "ESOMEPRAZOLE": ("A", "A02", "A02B", "A02BC"),
+}
+
+
+# --- Synthetic data ---
+def write_synthetic_data(folder, n_products=300, n_manufacturers=25, seed=0):
+    """
+    Writes a synthetic "Master Data.csv" and OBproducts.csv into `folder`, in the raw
+    export format (comma-formatted numbers, a row per molecule of a combination).
+    The MOHAP price list and OBpatents.csv are copied from the repo.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(MOLECULES)
+    rows = []
+    for p in range(n_products):
+        mols = list(rng.choice(names, 1 if rng.random() < 0.75 else 2, replace=False))
+        atc = MOLECULES[mols[0]]
+        manufacturer = f"MANU {rng.integers(n_manufacturers)}"
+        launch = int(rng.integers(2005, 2024))
+        for pack in range(int(rng.integers(1, 4))):
+            price = float(rng.integers(10, 300))
+            for market in ["PRIVATE MARKET", "LPO"]:
+                base = rng.integers(0, 5000)
+                for m in mols:
+                    row = {
+                        "Molecule": m, "Product": f"PROD{p}", "Manufacturer": manufacturer, "Market": market,
+                        "ATC1": atc[0], "ATC2": atc[1], "ATC3": atc[2], "ATC4": atc[3],
+                        "Pack": f"TABS {10 * (pack + 1)} {int(rng.choice([5, 10, 20, 500]))}MG",
+                        "Strength": f"{int(rng.choice([5, 10, 20]))}MG", "Retail Price": price, "NFC3": "ABA",
+                        "Launch Year": launch,
+                    }
+                    for y in range(2020, 2025):
+                        units = 0 if y < launch else int(base * (1 + 0.1 * (y - 2020)) * rng.uniform(0.7, 1.3))
+                        row[f"{y} Units"] = f"{units:,}"
+                        row[f"{y} LC Value"] = f"{units * price:,.0f}"
+                    rows.append(row)
+    pd.DataFrame(rows).to_csv(os.path.join(folder, "Master Data.csv"), index=False)
+
+    pd.DataFrame({
+        "Ingredient": ["METFORMIN HYDROCHLORIDE;SITAGLIPTIN PHOSPHATE", "DAPAGLIFLOZIN", "EMPAGLIFLOZIN",
+                       "ROSUVASTATIN CALCIUM", "AMLODIPINE BESYLATE;VALSARTAN"],
+        "Appl_Type": ["N"] * 5,
+        "Appl_No": ["021995", "202293", "204629", "021366", "021990"],
+        "Product_No": ["001"] * 5,
+        "DF;Route": ["TABLET;ORAL"] * 5,
+        "Applicant": ["MERCK", "ASTRAZENECA", "BI", "ASTRAZENECA", "NOVARTIS"],
+        "Trade_Name": ["JANUMET", "FARXIGA", "JARDIANCE", "CRESTOR", "EXFORGE"],
+    }).to_csv(os.path.join(folder, "OBproducts.csv"), index=False)
+
+    for name in ["PriceListMOHAP.csv", "OBpatents.csv"]:
+        shutil.copy(os.path.join(REPO, name), os.path.join(folder, name))
+
+
+# --- Memory ---
+def rss_mb():
+    """Resident set size of this process (Linux /proc; falls back to peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- One simulated analyst ---
+def _by_label(widgets, prefix):
+    for w in widgets:
+        if w.label.startswith(prefix):
+            return w
+    return None
+
+
+GRAPH_TAB = "📈 Graph + Table"
+ACTION_TABS = {
+    "molecule": None, "market": GRAPH_TAB, "metric": GRAPH_TAB, "group_by": GRAPH_TAB, "share_toggle": GRAPH_TAB,
+    "mohap": "🏛️ MOHAP Insights", "orange_book": "📅 Patent Expiry Finder",
+    "analog_scope": "🧭 Analogs", "atc_chart": "🌳 ATC Explorer",
+}
+
+
+def _tab_for(at, rng):
+    """Picks a random action; returns (action, tab to open first or None)."""
+    action = rng.choice(["molecule"] + list(ACTION_TABS))
+    tab = ACTION_TABS[action]
+    current = at.session_state["main_tab"] if "main_tab" in at.session_state else None
+    return action, (tab if tab is not None and tab != current else None)
+
+
+def _random_action(at, rng, action):
+    """Performs one interaction (widgets are looked up fresh each time)."""
+    if action == "molecule":
+        at.selectbox[0].set_value(rng.choice(at.selectbox[0].options))
+    elif action == "market":
+        _by_label(at.radio, "Market Type").set_value(rng.choice(["PRIVATE MARKET", "LPO", "TOTAL (PRIVATE + LPO)"]))
+    elif action == "metric":
+        _by_label(at.radio, "Metric").set_value(rng.choice(["Units", "Value"]))
+    elif action == "group_by":
+        _by_label(at.radio, "Group By").set_value(rng.choice(["Manufacturer", "Product", "Strength"]))
+    elif action == "share_toggle":
+        toggle = at.toggle[0]
+        toggle.set_value(not toggle.value)
+    elif action == "mohap":
+        box = _by_label(at.selectbox, "🔎 Search by Ingredient")
+        box.set_value(rng.choice(box.options[:500]))
+    elif action == "orange_book":
+        box = _by_label(at.selectbox, "🔎 Select Ingredient Combination")
+        box.set_value(rng.choice(box.options))
+    elif action == "analog_scope":
+        _by_label(at.radio, "Restrict to same").set_value(rng.choice(["Any class", "ATC2", "ATC3"]))
+    else:
+        _by_label(at.radio, "Chart").set_value(rng.choice(["Treemap", "Sunburst"]))
+    return action
+
+
+def _peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_session(session_id, n_actions, seed, timeout=300):
+    """
+    One analyst. Exceptions that escape the app's script thread (they never reach
+    at.exception) are caught by a threading.excepthook and counted as errors too.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    latencies, errors = [], 0
+    escaped = []
+    threading.excepthook = lambda args: escaped.append(f"{args.exc_type.__name__}: {args.exc_value}")
+
+    def rerun(at):
+        nonlocal errors
+        t = time.perf_counter()
+        try:
+            at.run()
+        except Exception as e:
+            escaped.append(f"{type(e).__name__}: {e}")
+        latencies.append(time.perf_counter() - t)
+        errors += len(at.exception)
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    rerun(at)
+    first_render = latencies.pop()
+
+    for _ in range(n_actions):
+        action, tab = _tab_for(at, rng)
+        if tab is not None:
+            at.session_state["main_tab"] = tab
+            rerun(at)
+        try:
+            _random_action(at, rng, action)
+        except Exception:
+            errors += 1
+            continue
+        rerun(at)
+
+    return {
+        "first_render": first_render,
+        "latencies": latencies,
+        "errors": errors + len(escaped),
+        "escaped": escaped,
+        "rss": rss_mb(),
+        "peak_rss": _peak_rss_mb(),
+    }
+
+
+def _session_process(folder, session_id, n_actions, seed):
+    os.chdir(folder)
+    return run_session(session_id, n_actions, seed)
+
+
+def run_sessions(folder, session_ids, n_actions, seed):
+    """
+    Runs the sessions at once, one spawned process each. The parent never runs AppTest
+    itself: Streamlit swaps sys.modules["__main__"] while a script runs, which breaks pickling.
+    """
+    session_ids = list(session_ids)
+    n = len(session_ids)
+    with ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(_session_process, [folder] * n, session_ids, [n_actions] * n, [seed] * n))
+
+
+def run_level(folder, concurrency, n_actions, seed):
+    """
+    `concurrency` sessions at once, each in its own process: AppTest swaps Streamlit's
+    Runtime singleton on every run, so sessions sharing one process break each other's
+    script threads. Processes share the disk cache but not st.cache_data / st.cache_resource,
+    so every session's first render loads the data (from the warm disk cache).
+    """
+    t = time.perf_counter()
+    results = run_sessions(folder, range(concurrency), n_actions, seed)
+    wall = time.perf_counter() - t
+
+    latencies = np.array([x for r in results for x in r["latencies"]]) * 1000
+    first = np.array([r["first_render"] for r in results]) * 1000
+    for r in results:
+        for e in r["escaped"]:
+            print(f"  [{concurrency} sessions] escaped: {e}")
+    errors = sum(r["errors"] for r in results)
+
+    return {
+        "sessions": concurrency,
+        "reruns": len(latencies),
+        "p50 ms": np.percentile(latencies, 50) if len(latencies) else np.nan,
+        "p95 ms": np.percentile(latencies, 95) if len(latencies) else np.nan,
+        "p99 ms": np.percentile(latencies, 99) if len(latencies) else np.nan,
+        "first render p50 ms": np.percentile(first, 50),
+        "reruns/s": len(latencies) / wall,
+        "peak RSS MB/session": max(r["peak_rss"] for r in results),
+        "RSS MB/session": np.mean([r["rss"] for r in results]),
+        "errors": errors,
+        "status": "FAIL" if errors else "ok",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="1,2,4,8", help="comma-separated concurrent session counts")
+    parser.add_argument("--actions", type=int, default=15, help="interactions per session")
+    parser.add_argument("--products", type=int, default=300, help="synthetic products in Master Data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic data folder")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="pharmai_load_")
+    write_synthetic_data(folder, n_products=args.products, seed=args.seed)
+    os.chdir(folder)  # the app reads its CSVs and writes its caches relative to the cwd
+    print(f"synthetic data in {folder}")
+
+    # the first session loads the data and fills the process-wide caches: that is the cold start
+    cold = run_sessions(folder, [-1], 0, args.seed)[0]
+    print(f"cold start: first render of the first session {cold['first_render']:.2f} s (empty disk cache)")
+
+    rows = [run_level(folder, int(c), args.actions, args.seed) for c in args.levels.split(",")]
+    table = pd.DataFrame(rows).set_index("sessions")
+    print(table.round(1).to_string())
+
+    if not args.keep:
+        os.chdir(REPO)
+        shutil.rmtree(folder, ignore_errors=True)
+    if (table["status"] == "FAIL").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Cold-start benchmark for PharmAI.py: import-time breakdown and time to first render.
+
+Every scenario runs in a fresh interpreter, so nothing is shared through sys.modules or
+Streamlit's in-memory caches:
+  cold disk   empty .cache/ (first boot after a deploy or a data refresh)
+  warm disk   .cache/ filled by the previous run (a restart of the same release)
+For each, it reports the time to import Streamlit, the first script run (AppTest) and
+the app's own time to first render, plus the per-stage timings recorded by
+tool_functions.Startup for the cold run.
+
+Run from the repo root:
+    python benchmarks/startup_app.py [--products 300] [--runs 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest_app import write_synthetic_data
+from tool_functions.Startup import import_breakdown
+
+# Runs inside the fresh interpreter; prints one JSON line
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+sys.path.insert(0, {repo!r})
+at = AppTest.from_file({app!r}, default_timeout=600).run()
+t2 = time.perf_counter()
+from tool_functions.Startup import STARTUP
+stages = STARTUP.as_frame()
+print(json.dumps({{
+    "import s": t1 - t0,
+    "first run s": t2 - t1,
+    "first render s": STARTUP.first_render,
+    "errors": len(at.exception),
+    "stages": dict(zip(stages["Stage"], stages["Seconds"])),
+}}))
+"""
+
+
+def run_child(folder):
+    code = CHILD.format(repo=REPO, app=os.path.join(REPO, "PharmAI.py"))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=folder, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(proc.stderr[-2000:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=300, help="synthetic products in Master Data")
+    parser.add_argument("--runs", type=int, default=3, help="repetitions per scenario (median reported)")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    print("Slowest imports (fresh interpreter, -X importtime):")
+    print(import_breakdown(top_n=args.top).to_string(index=False))
+
+    folder = tempfile.mkdtemp(prefix="pharmai_startup_")
+    write_synthetic_data(folder, n_products=args.products)
+    rows, cold_stages = [], []
+    try:
+        for _ in range(args.runs):
+            for name in ["cold disk", "warm disk"]:
+                if name == "cold disk":
+                    for sub in [".cache", ".snapshots", "price_history"]:
+                        shutil.rmtree(os.path.join(folder, sub), ignore_errors=True)
+                result = run_child(folder)
+                if name == "cold disk":
+                    cold_stages.append(result["stages"])
+                rows.append({"scenario": name, **{k: v for k, v in result.items() if k != "stages"}})
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print("\nCold start (median of runs):")
+    print(pd.DataFrame(rows).groupby("scenario", sort=False).median().round(3).to_string())
+    print("\nStartup stages, cold disk (median seconds):")
+    print(pd.DataFrame(cold_stages).median().round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
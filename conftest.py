@@ -0,0 +1 @@
+# Makes the repo root importable (tool_functions, PharmAPI) when running pytest from anywhere.
@@ -0,0 +1,189 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from PharmAPI import MAX_BATCH, ApiError, Datasets, ResponseCache, create_server, handle_batch, handle_request
+from tool_functions.Normalize import clean_combo_series
+from tool_functions.PackParse import add_master_unit_prices
+from tool_functions.combinations import create_combination_column
+
+ATC = {
+    "METFORMIN": ("A", "A10", "A10B", "A10BA BIGUANIDES"),
+    "SITAGLIPTIN": ("A", "A10", "A10B", "A10BH DPP-IV INHIBITORS"),
+    "ROSUVASTATIN": ("C", "C10", "C10A", "C10AA STATINS"),
+}
+
+
+def _master_frame():
+    """A few products in the shape load_master_data returns (one row per molecule of a combination)."""
+    products = [
+        ("GLUCOPHAGE", ["METFORMIN"], "MERCK", 2008),
+        ("METFORMIN GEN", ["METFORMIN"], "JULPHAR", 2021),
+        ("JANUMET", ["METFORMIN", "SITAGLIPTIN"], "MSD", 2010),
+        ("SITAGLIPTIN GEN", ["METFORMIN", "SITAGLIPTIN"], "NEOPHARMA", 2023),
+        ("CRESTOR", ["ROSUVASTATIN"], "ASTRAZENECA", 2005),
+    ]
+    rows = []
+    for i, (product, molecules, manufacturer, launch) in enumerate(products):
+        for market in ["PRIVATE MARKET", "LPO"]:
+            for m in molecules:
+                atc = ATC[molecules[-1]]
+                row = {
+                    "Molecule": m, "Product": product, "Manufacturer": manufacturer, "Market": market,
+                    "ATC1": atc[0], "ATC2": atc[1], "ATC3": atc[2], "ATC4": atc[3],
+                    "Pack": "TABS 30 500MG", "Strength": "500MG", "Retail Price": 50.0 + i, "NFC3": "ABA",
+                    "Launch Year": launch,
+                }
+                for y in range(2020, 2025):
+                    units = 0 if y < launch else 1000 * (i + 1) + 100 * (y - 2020)
+                    row[f"{y} Units"] = float(units)
+                    row[f"{y} LC Value"] = float(units * row["Retail Price"])
+                rows.append(row)
+
+    df = create_combination_column(pd.DataFrame(rows))
+    df["Molecule Combination"] = clean_combo_series(df["Molecule Combination"])
+    return add_master_unit_prices(df)
+
+
+@pytest.fixture
+def data():
+    mohap_df = pd.DataFrame({
+        "Ingredient": ["METFORMIN HYDROCHLORIDE", "METFORMIN HYDROCHLORIDE", "ROSUVASTATIN CALCIUM"],
+        "Company": ["MERCK", "JULPHAR", "ASTRAZENECA"],
+    })
+    ob_products = pd.DataFrame({
+        "Ingredient": ["ROSUVASTATIN CALCIUM"],
+        "Appl_Type": ["N"],
+        "Appl_No": ["021366"],
+        "Product_No": ["001"],
+    })
+    ob_patents = pd.DataFrame({
+        "Appl_No": ["021366"],
+        "Product_No": ["001"],
+        "Patent_Expire_Date_Text": ["Jan 08, 2030"],
+    })
+    return Datasets(_master_frame(), mohap_df, ob_products, ob_patents, version="v1")
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache()
+
+
+def _error(fn):
+    with pytest.raises(ApiError) as e:
+        fn()
+    return e.value
+
+
+# --- Endpoints ---
+def test_molecules(data, cache):
+    molecules = handle_request(data, cache, "molecules", {})
+    assert "METFORMIN" in molecules
+    assert "ROSUVASTATIN" in molecules
+    assert molecules == sorted(molecules)
+
+
+def test_exec_summary(data, cache):
+    summary = handle_request(data, cache, "exec-summary", {"molecule": "metformin"})
+    assert isinstance(summary, dict)
+    json.dumps(summary)
+
+
+def test_atc4(data, cache):
+    result = handle_request(data, cache, "atc4", {"molecule": "ROSUVASTATIN"})
+    assert result["atc4"] == "C10AA STATINS"
+    assert "figure" not in result
+    assert handle_request(data, cache, "atc4", {"atc4": "C10AA STATINS", "figure": "1"})["figure"]
+
+
+def test_erosion(data, cache):
+    result = handle_request(data, cache, "erosion", {"molecule": "METFORMIN", "figure": "yes"})
+    assert result["molecule"] == "METFORMIN"
+    assert result["erosion"]
+    assert "figure" in result
+
+
+def test_regulatory(data, cache):
+    result = handle_request(data, cache, "regulatory", {"molecule": "ROSUVASTATIN"})
+    assert result["mohap_manufacturers"] == 1
+    assert result["orange_book_expiry"] == "2030-01-08"
+    json.dumps(result)
+
+
+# --- Errors ---
+def test_missing_molecule_is_400(data, cache):
+    assert _error(lambda: handle_request(data, cache, "exec-summary", {})).status == 400
+
+
+@pytest.mark.parametrize("endpoint, params", [
+    ("no-such-endpoint", {}),
+    ("exec-summary", {"molecule": "UNOBTAINIUM"}),
+    ("atc4", {"molecule": "UNOBTAINIUM"}),
+    ("atc4", {"atc4": "Z99ZZ NOTHING"}),
+    ("erosion", {"molecule": "UNOBTAINIUM"}),
+])
+def test_unknown_is_404(data, cache, endpoint, params):
+    assert _error(lambda: handle_request(data, cache, endpoint, params)).status == 404
+
+
+def test_regulatory_without_sources_is_503(cache):
+    data = Datasets(_master_frame())
+    assert _error(lambda: handle_request(data, cache, "regulatory", {"molecule": "METFORMIN"})).status == 503
+
+
+# --- Batch ---
+def test_batch_partial_failure(data, cache):
+    results = handle_batch(data, cache, "erosion", {"molecules": ["METFORMIN", "UNOBTAINIUM"]})
+    assert results["METFORMIN"]["molecule"] == "METFORMIN"
+    assert "error" in results["UNOBTAINIUM"]
+
+
+@pytest.mark.parametrize("body", [{}, {"molecules": []}, {"molecules": "METFORMIN"}, {"molecules": ["X"] * (MAX_BATCH + 1)}])
+def test_batch_bad_body_is_400(data, cache, body):
+    assert _error(lambda: handle_batch(data, cache, "erosion", body)).status == 400
+
+
+# --- Cache ---
+def test_cache_hit_and_version_invalidation(data, cache):
+    first = handle_request(data, cache, "erosion", {"molecule": "METFORMIN"})
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert handle_request(data, cache, "erosion", {"molecule": "METFORMIN"}) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    data.version = "v2"
+    handle_request(data, cache, "erosion", {"molecule": "METFORMIN"})
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_oldest(data):
+    cache = ResponseCache(max_entries=1)
+    handle_request(data, cache, "molecules", {})
+    handle_request(data, cache, "erosion", {"molecule": "METFORMIN"})
+    handle_request(data, cache, "molecules", {})
+    assert cache.misses == 3
+
+
+# --- HTTP layer ---
+def test_http_server(data):
+    server = create_server(data, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/health") as r:
+            assert json.load(r)["dataset_version"] == "v1"
+
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{base}/erosion?molecule=UNOBTAINIUM")
+        assert e.value.code == 404
+
+        body = json.dumps({"molecules": ["METFORMIN", "UNOBTAINIUM"]}).encode()
+        with urllib.request.urlopen(urllib.request.Request(f"{base}/batch/erosion", data=body)) as r:
+            assert set(json.load(r)) == {"METFORMIN", "UNOBTAINIUM"}
+    finally:
+        server.shutdown()
+        server.server_close()
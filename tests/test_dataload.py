@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from tool_functions.DataLoad import load_master_data, stream_master_data
+
+HEADER = "Molecule,Product,Manufacturer,Market,Pack,Retail Price,2024 Units,2024 LC Value\n"
+ROWS = [
+    "METFORMIN,JANUMET,MSD,LPO,TABS 28 50MG/500MG,90,\"1,000\",\"90,000\"\n",
+    "SITAGLIPTIN,JANUMET,MSD,LPO,TABS 28 50MG/500MG,90,\"1,000\",\"90,000\"\n",
+    "METFORMIN,GLUCOPHAGE,MERCK,LPO,TABS 30 500MG,20,500,\"10,000\"\n",
+    "METFORMIN,GLUCOPHAGE,MERCK,LPO,TABS 30 500MG,20,250,\"5,000\"\n",
+]
+
+
+def _write(tmp_path, rows):
+    path = tmp_path / "Master Data.csv"
+    path.write_text(HEADER + "".join(rows))
+    return str(path)
+
+
+def test_streamed_matches_in_memory(tmp_path):
+    path = _write(tmp_path, ROWS)
+    key = ["Molecule", "Product", "Pack"]
+    full = load_master_data(path).groupby(key)[["2024 Units", "2024 LC Value"]].sum()
+    streamed = stream_master_data(path, chunksize=2)
+    assert list(streamed.columns) == list(load_master_data(path).columns)
+    pd.testing.assert_frame_equal(streamed.groupby(key)[["2024 Units", "2024 LC Value"]].sum(), full)
+    assert set(streamed["Molecule Combination"]) == {"METFORMIN + SITAGLIPTIN", "METFORMIN"}
+
+
+def test_header_only_file_is_empty_frame(tmp_path):
+    path = _write(tmp_path, [])
+    streamed = stream_master_data(path, chunksize=2)
+    assert streamed.empty
+    assert list(streamed.columns) == list(load_master_data(path).columns)
+    assert "Price per mg" in streamed.columns
+
+
+def test_zero_byte_file_raises(tmp_path):
+    path = tmp_path / "Master Data.csv"
+    path.write_text("")
+    with pytest.raises(pd.errors.EmptyDataError):
+        stream_master_data(str(path), chunksize=2)
+
+
+def test_monthly_rows_and_mixed_key_dtypes_collapse(tmp_path):
+    # Month is not a dimension; Retail Price reads as "1,200" in one chunk and 1200 in the next
+    path = tmp_path / "Master Data.csv"
+    path.write_text(
+        "Molecule,Product,Manufacturer,Market,Pack,Retail Price,Month,2024 Units,2024 LC Value\n"
+        + "".join(
+            f"METFORMIN,GLUCOPHAGE,MERCK,LPO,TABS 30 500MG,{price},{month},10,\"12,000\"\n"
+            for month, price in [(1, '"1,200"'), (2, "1200"), (3, "1200.0"), (4, "1200")]
+        )
+    )
+    streamed = stream_master_data(str(path), chunksize=1)
+    assert "Month" not in streamed.columns
+    assert len(streamed) == 1
+    assert streamed.loc[0, "2024 Units"] == 40
+    assert streamed.loc[0, "Retail Price"] == 1200
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tool_functions.Erosion import build_uptake_library, get_erosion_benchmark, plot_market_erosion
+
+UNITS = {
+    # combination, manufacturer: 2020..2024 units
+    ("METFORMIN", "MERCK"): [100, 100, 90, 80, 60],
+    ("METFORMIN", "JULPHAR"): [0, 0, 10, 20, 40],
+    ("SITAGLIPTIN", "MSD"): [50, 50, 50, 40, 30],
+    ("SITAGLIPTIN", "NEOPHARMA"): [0, 0, 0, 10, 30],
+    ("GLIMEPIRIDE", "SANOFI"): [10, 10, 10, 10, 10],
+}
+
+
+def _frame():
+    rows = []
+    for (combo, manufacturer), units in UNITS.items():
+        row = {"Molecule": combo, "Product": f"{combo} {manufacturer}", "Manufacturer": manufacturer,
+               "Molecule Combination": combo, "ATC4": "A10BA BIGUANIDES", "ATC3": "A10B"}
+        row.update({f"{2020 + i} Units": u for i, u in enumerate(units)})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("molecule", ["METFORMIN", "SITAGLIPTIN", "GLIMEPIRIDE"])
+def test_library_matches_frame(molecule):
+    df = _frame()
+    library = build_uptake_library(df)
+    _, from_frame = plot_market_erosion(df, molecule)
+    _, from_library = plot_market_erosion(None, molecule, library=library)
+    assert from_frame.keys() == from_library.keys()
+    for key, value in from_frame.items():
+        assert value == from_library[key] if key == "atc4_code" else np.isclose(value, from_library[key])
+
+
+def test_atc4_benchmark_skips_single_manufacturer():
+    stats = get_erosion_benchmark(build_uptake_library(_frame()), "A10BA BIGUANIDES")
+    # MERCK 100% -> 60%, MSD 100% -> 50%; GLIMEPIRIDE has a single manufacturer
+    assert np.isclose(stats["average_atc4_erosion"], 45)
+    assert np.isclose(stats["avg_originator_2024"], 0.55)
+
+
+def test_unknown_molecule():
+    library = build_uptake_library(_frame())
+    assert plot_market_erosion(None, "UNOBTAINIUM", library=library) == (None, None)
+    assert get_erosion_benchmark(library, "Z99ZZ")["average_atc4_erosion"] == 0
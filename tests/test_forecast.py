@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from tool_functions.Forecast import fit_log_linear
+
+Y = np.array([
+    [100.0, 112.0, 118.0, 135.0, 149.0],  # five years of sales
+    [0.0, 0.0, 0.0, 100.0, 120.0],        # two years: exact fit, no spread
+    [0.0, 0.0, 0.0, 0.0, 50.0],           # one year: carried flat
+    [100.0, 80.0, 0.0, 0.0, 0.0],         # exited
+])
+
+
+def test_point_forecasts():
+    point, _, _ = fit_log_linear(Y)
+    assert np.all(np.diff(point[0]) > 0)
+    assert np.all(point[1] > 120)
+    assert np.all(point[2] == 50)
+    assert np.all(point[3] == 0)
+
+
+def test_no_interval_below_three_years():
+    _, lower, upper = fit_log_linear(Y)
+    assert np.isnan(lower[1:3]).all() and np.isnan(upper[1:3]).all()
+    assert np.all(lower[0] < upper[0])
+
+
+def test_interval_follows_the_damped_path():
+    # log-width is 2·z·se; read at the damped position it grows slower than at t = h
+    point, lower, upper = fit_log_linear(Y[:1], damping=0.5)
+    _, lower_1, upper_1 = fit_log_linear(Y[:1], damping=1.0)
+    width = np.log(upper / lower)[0]
+    width_1 = np.log(upper_1 / lower_1)[0]
+    assert np.all(width < width_1)
+    # damping 0.5 converges after ~1 step: the interval nearly stops widening too
+    assert width[-1] - width[1] == pytest.approx(0, abs=0.02)
+    assert np.allclose(np.log(point[0]), (np.log(upper[0]) + np.log(lower[0])) / 2)
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from tool_functions.Columns import METRIC_COLS
+from tool_functions.MarketPivot import build_market_pivot, market_slice, market_split_table, market_totals
+from tool_functions.MoleculePlot import plot_combination_market_breakdown_plotly
+
+
+def _frame():
+    """METFORMIN: MERCK sells in both markets and lists a zero-sales pack in LPO; JULPHAR / NEOPHARMA are listed with no sales."""
+    rows = []
+    for manufacturer, product, market, units in [
+        ("MERCK", "GLUCOPHAGE", "PRIVATE MARKET", 100.0),
+        ("MERCK", "GLUCOPHAGE", "LPO", 40.0),
+        ("MERCK", "GLUCOPHAGE XR", "LPO", 0.0),
+        ("JULPHAR", "METFORMIN GEN", "LPO", 0.0),
+        ("NEOPHARMA", "METFORMIN NEO", "PRIVATE MARKET", 0.0),
+    ]:
+        row = {"Molecule Combination": "METFORMIN", "Manufacturer": manufacturer, "Product": product,
+               "Strength": "500MG", "Market": market}
+        row.update({c: units if "Units" in c else units * 10 for c in METRIC_COLS})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_slice_keeps_listed_zero_rows():
+    pivot = build_market_pivot(_frame())
+    assert set(market_slice(pivot, "METFORMIN", "LPO")["Manufacturer"]) == {"MERCK", "JULPHAR"}
+    assert set(market_slice(pivot, "METFORMIN", "PRIVATE MARKET")["Manufacturer"]) == {"MERCK", "NEOPHARMA"}
+    assert len(market_slice(pivot, "METFORMIN")) == 4
+    assert "Rows" not in market_slice(pivot, "METFORMIN").columns
+
+
+def test_slice_matches_master_filter():
+    df, pivot = _frame(), build_market_pivot(_frame())
+    for use_filter, market in [(True, "LPO"), (True, "PRIVATE MARKET"), (False, "PRIVATE MARKET")]:
+        from_df = market_slice(pivot, "METFORMIN", market if use_filter else "TOTAL")
+        expected = df[(df["Market"] == market) | (not use_filter)].groupby(["Manufacturer", "Product"])[METRIC_COLS].sum()
+        pd.testing.assert_frame_equal(from_df.groupby(["Manufacturer", "Product"])[METRIC_COLS].sum(), expected, check_names=False)
+
+        fig_df, _ = plot_combination_market_breakdown_plotly(df, "METFORMIN", use_filter, market)
+        fig_pivot, _ = plot_combination_market_breakdown_plotly(df, "METFORMIN", use_filter, market, market_pivot=pivot)
+        assert fig_df.to_dict() == fig_pivot.to_dict()
+    lpo, _ = plot_combination_market_breakdown_plotly(df, "METFORMIN", True, "LPO", market_pivot=pivot)
+    assert "GLUCOPHAGE XR" in lpo.data[0].hovertemplate[0]
+
+
+def test_totals_and_split_ignore_row_count():
+    pivot = build_market_pivot(_frame())
+    totals = market_totals(pivot, "METFORMIN")
+    assert list(totals.columns) == METRIC_COLS
+    assert totals.loc["TOTAL", "2024 Units"] == 140
+    split = market_split_table(pivot, "METFORMIN")
+    assert list(split.index) == ["MERCK"]
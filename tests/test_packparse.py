@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from tool_functions.PackParse import _total_mg, parse_master_pack, parse_pack_size, parse_strength
+
+
+def _one(parse, text):
+    return parse(pd.Series([text])).iloc[0]
+
+
+@pytest.mark.parametrize("text, strength_mg, per_unit, per_amount", [
+    ("500mg/Tablet", 500.0, "unit", 1.0),
+    ("250mg/5ml", 250.0, "ml", 5.0),
+    ("1g/Vial", 1000.0, "unit", 1.0),
+    ("14mg, 57mg/5ml", 71.0, "ml", 5.0),
+    ("10mg/ 160mg", 170.0, "unit", 1.0),       # two strengths, not "per 160 mg"
+    ("14mg/57mg/5ml", 71.0, "ml", 5.0),
+    ("1%", 10.0, "content", 1.0),              # concentration: 10 mg per g / ml
+    ("0.28 g/100g, 2 g/100g", 2280.0, "g", 100.0),
+])
+def test_parse_strength(text, strength_mg, per_unit, per_amount):
+    row = _one(parse_strength, text)
+    assert row["Strength mg"] == pytest.approx(strength_mg)
+    assert row["Per Unit"] == per_unit
+    assert row["Per Amount"] == per_amount
+
+
+@pytest.mark.parametrize("text, count", [
+    ("1's Sachet x 5", 5),
+    ("2 x 14's", 28),
+    ("30's (10's Blister x 3)", 30),
+    ("500 ml x 20 Viaflo Bags", 20),
+    ("60 Viaflo Bags (100 mL)", 60),
+    ("1 Glass Vial", 1),
+    ("10's", 10),
+    ("30's (10's Blister x 3", 30),             # unclosed bracket: the first N's is the total
+    ("3's [Glass Vial (0.5 ml) x 3)", 3),
+    ("20's Single Dose Vials x 0.5ml", 20),
+    ("Maintenance pack of 28's (7's Blister x 4)", 28),
+    ("2 x 1.0 mL Prefilled Syringe", 2),
+])
+def test_parse_pack_size_count(text, count):
+    assert _one(parse_pack_size, text)["Pack Count"] == count
+
+
+@pytest.mark.parametrize("text, count, content, total_mg", [
+    ("TABS 10 500MG", 10, None, 5000.0),
+    ("TABS 28 10MG/160MG", 28, None, 28 * 170.0),
+    ("SYR 5MG/ML 100ML 1", 1, 100.0, 500.0),
+    ("SUSP 250MG/5ML 60ML 1", 1, 60.0, 3000.0),
+    ("CREAM 1% 30G 1", 1, 30.0, 300.0),          # 30 G is the tube, not the strength
+    ("OINT 0.1% 15G 1", 1, 15.0, 15.0),
+    ("INJ 1G 1", 1, None, 1000.0),               # a lone gram amount is the strength
+])
+def test_parse_master_pack(text, count, content, total_mg):
+    parsed = parse_master_pack(pd.Series([text]))
+    row = parsed.iloc[0]
+    assert row["Pack Count"] == count
+    if content is None:
+        assert pd.isna(row["Pack Content"])
+    else:
+        assert row["Pack Content"] == content
+    assert _total_mg(parsed).iloc[0] == pytest.approx(total_mg)
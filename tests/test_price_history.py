@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from tool_functions.PriceHistory import KEY_COLS, load_price_history, prices_as_of, record_release, state_at
+
+
+def _price_list(prices):
+    """MOHAP-shaped list: one pack per trade name, {trade name: public price}."""
+    return pd.DataFrame({
+        "Trade Name": list(prices),
+        "Form": "Tablet",
+        "Strength": "500mg",
+        "Pack Size": "30's",
+        "Company": "MERCK",
+        "Pharmacy Price (AED)": [p * 0.8 for p in prices.values()],
+        "Public Price (AED)": list(prices.values()),
+    })
+
+
+RELEASES = [
+    ("2023-01-01", {"GLUCOPHAGE": 20.0, "JANUMET": 90.0}),
+    ("2023-06-01", {"GLUCOPHAGE": 18.0, "JANUMET": 90.0, "CRESTOR": 60.0}),
+    ("2024-01-01", {"GLUCOPHAGE": 18.0, "CRESTOR": 55.0}),
+]
+
+
+def _comparable(history):
+    log = history["log"].sort_values(["Version"] + KEY_COLS).reset_index(drop=True)
+    return log, history["versions"].drop(columns=["Fingerprint"])
+
+
+def test_backfill_matches_in_order_history(tmp_path):
+    for date, prices in RELEASES:
+        in_order = record_release(_price_list(prices), date, store_dir=tmp_path / "in_order")
+
+    # newest first, then the oldest, then the middle one
+    for date, prices in [RELEASES[2], RELEASES[0], RELEASES[1]]:
+        backfilled = record_release(_price_list(prices), date, store_dir=tmp_path / "backfilled")
+
+    for a, b in zip(_comparable(in_order), _comparable(backfilled)):
+        pd.testing.assert_frame_equal(a, b)
+    assert list(backfilled["versions"]["Version"]) == [1, 2, 3]
+    assert list(backfilled["versions"]["Changed"]) == [0, 1, 1]
+
+
+def test_backfill_reprices_against_actual_predecessor(tmp_path):
+    record_release(_price_list(RELEASES[2][1]), RELEASES[2][0], store_dir=tmp_path)
+    history = record_release(_price_list(RELEASES[1][1]), RELEASES[1][0], store_dir=tmp_path)
+
+    june = prices_as_of(history, "2023-12-31").set_index("Trade Name")["Public Price (AED)"]
+    assert june.to_dict() == {"CRESTOR": 60.0, "GLUCOPHAGE": 18.0, "JANUMET": 90.0}
+    latest = state_at(history).set_index("Trade Name")["Public Price (AED)"]
+    assert latest.to_dict() == {"CRESTOR": 55.0, "GLUCOPHAGE": 18.0}
+    assert prices_as_of(history, "2022-12-31").empty
+
+
+def test_repeated_release_is_not_stored(tmp_path):
+    record_release(_price_list(RELEASES[0][1]), RELEASES[0][0], store_dir=tmp_path)
+    history = record_release(_price_list(RELEASES[0][1]), "2023-03-01", store_dir=tmp_path)
+    assert len(history["versions"]) == 1
+    assert len(load_price_history(tmp_path)["versions"]) == 1
+
+
+def test_backfill_of_the_next_release_moves_it_earlier(tmp_path):
+    record_release(_price_list(RELEASES[1][1]), RELEASES[1][0], store_dir=tmp_path)
+    history = record_release(_price_list(RELEASES[1][1]), "2023-02-01", store_dir=tmp_path)
+    assert list(history["versions"]["Date"].dt.strftime("%Y-%m-%d")) == ["2023-02-01"]
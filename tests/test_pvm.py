@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tool_functions.Columns import YEARS
+from tool_functions.PriceVolumeMix import EFFECTS, build_pvm, get_pvm, pvm_bridge
+
+ATC4 = {"METFORMIN": "A10BA BIGUANIDES", "GLIMEPIRIDE": "A10BB SULFONYLUREAS"}
+# Combination, Pack, Market: (units, value) per year 2020..2024
+PACKS = {
+    ("METFORMIN", "TABS 30 500MG", "PRIVATE MARKET"): [(100, 1000), (110, 1100), (120, 1320), (0, 0), (90, 990)],
+    ("METFORMIN", "TABS 60 500MG", "PRIVATE MARKET"): [(0, 0), (50, 900), (60, 1080), (70, 1400), (70, 1400)],
+    ("METFORMIN", "TABS 30 850MG", "LPO"): [(-5, -60), (10, 120), (10, 130), (0, 50), (0, 0)],
+    # value with no units (rebates / adjustments), including years with no units in the whole node
+    ("GLIMEPIRIDE", "TABS 30 2MG", "LPO"): [(0, 300), (40, 200), (0, 150), (0, 0), (20, 180)],
+}
+
+
+def _frame():
+    rows = []
+    for (combo, pack, market), cells in PACKS.items():
+        row = {"Molecule Combination": combo, "Manufacturer": "MERCK", "Product": combo,
+               "Pack": pack, "Market": market, "Retail Price": 10.0,
+               "ATC1": "A", "ATC2": "A10", "ATC3": "A10B", "ATC4": ATC4[combo]}
+        for y, (units, value) in zip(YEARS, cells):
+            row[f"{y} Units"] = units
+            row[f"{y} LC Value"] = value
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_effects_add_up_on_every_row():
+    pvm = build_pvm(_frame())
+    assert len(pvm) == 7 * (len(YEARS) - 1)
+    np.testing.assert_allclose(pvm[EFFECTS].sum(axis=1), pvm["Value Change"], atol=1e-9)
+
+
+def test_value_without_units_counts_as_price():
+    rows = get_pvm(build_pvm(_frame()), "Molecule Combination", "GLIMEPIRIDE")
+    # 2021: 300 of unit-less value replaced by 40 units at 5
+    assert rows.loc[2021, "Value Change"] == pytest.approx(-100)
+    assert rows.loc[2021, "Price Effect"] == pytest.approx(-300)
+    assert rows.loc[2021, "Volume Effect"] + rows.loc[2021, "Mix Effect"] == pytest.approx(200)
+    # 2022: the 40 units stop, 150 of adjustments remain
+    assert rows.loc[2022, "Volume Effect"] == pytest.approx(-200)
+    assert rows.loc[2022, "Price Effect"] == pytest.approx(150)
+
+
+def test_bridge_matches_value_change():
+    bridge = pvm_bridge(build_pvm(_frame()), "ATC4", "A10BA BIGUANIDES", start=2020, end=2024)
+    assert bridge["Start Value"] + sum(bridge[e] for e in EFFECTS) == pytest.approx(bridge["End Value"])
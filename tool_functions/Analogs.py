@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from tool_functions.Columns import cagr
+
+NUMERIC_FEATURES = [
+    "Log 2024 Value",
+    "Value CAGR (%)",
+    "Units CAGR (%)",
+    "Manufacturers",
+    "Top Share (%)",
+    "HHI",
+    "Private Share (%)",
+    "Years Since Launch",
+]
+
+# Relative weight of each block in the distance
+FEATURE_WEIGHTS = {
+    "Log 2024 Value": 1.5,
+    "Value CAGR (%)": 1.0,
+    "Units CAGR (%)": 0.5,
+    "Manufacturers": 1.0,
+    "Top Share (%)": 1.0,
+    "HHI": 1.0,
+    "Private Share (%)": 0.75,
+    "Years Since Launch": 0.75,
+}
+ATC_WEIGHTS = {"ATC1": 0.5, "ATC2": 0.75, "ATC3": 1.0}
+
+
+def build_molecule_features(df, current_year=2024):
+    """
+    One row of market-structure features per Molecule Combination, using the same
+    definitions as the exec summary (values split by molecule count, shares on 2024 value).
+    """
+    cols = ["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]
+    num = df[cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    num = num.div(df["Molecule Combination"].str.count(r" \+ ") + 1, axis=0)
+    num["Private Units"] = num["2024 Units"].where(df["Market"] == "PRIVATE MARKET", 0)
+    keys = [df["Molecule Combination"], df["Manufacturer"]]
+
+    by_manu = num.groupby(keys).sum()
+    combo = by_manu.groupby(level=0).sum()
+
+    # --- Concentration from manufacturer 2024 value shares ---
+    manu_share = by_manu["2024 LC Value"] / combo["2024 LC Value"].reindex(by_manu.index.get_level_values(0)).replace(0, np.nan).values
+    manu_share = manu_share.fillna(0)
+
+    feats = pd.DataFrame(index=combo.index)
+    feats["2024 Value (AED)"] = combo["2024 LC Value"]
+    feats["Log 2024 Value"] = np.log10(combo["2024 LC Value"].clip(lower=0) + 1)
+    feats["Value CAGR (%)"] = cagr(combo["2021 LC Value"], combo["2024 LC Value"])
+    feats["Units CAGR (%)"] = cagr(combo["2021 Units"], combo["2024 Units"])
+    feats["Manufacturers"] = df.groupby("Molecule Combination")["Manufacturer"].nunique()
+    feats["Top Share (%)"] = manu_share.groupby(level=0).max() * 100
+    feats["HHI"] = (manu_share ** 2).groupby(level=0).sum() * 10000
+    feats["Private Share (%)"] = (combo["Private Units"] / combo["2024 Units"].replace(0, np.nan) * 100).fillna(0)
+    feats["LPO Share (%)"] = np.where(combo["2024 Units"] > 0, 100 - feats["Private Share (%)"], 0)
+
+    launch = pd.to_numeric(df["Launch Year"], errors="coerce").groupby(df["Molecule Combination"]).min()
+    feats["Years Since Launch"] = (current_year - launch).reindex(feats.index)
+
+    atc = df.groupby("Molecule Combination")[["ATC1", "ATC2", "ATC3", "ATC4"]].first()
+    feats = feats.join(atc)
+
+    return feats
+
+
+def build_analog_index(df):
+    """
+    Standardized, weighted feature matrix over every combination (numeric block + one-hot ATC).
+    """
+    feats = build_molecule_features(df)
+
+    numeric = feats[NUMERIC_FEATURES].astype(float)
+    numeric = numeric.fillna(numeric.median())
+    std = numeric.std(ddof=0).replace(0, 1)
+    z = (numeric - numeric.mean()) / std
+    z = z.clip(-4, 4) * pd.Series(FEATURE_WEIGHTS)
+
+    blocks = [z.values]
+    for level, weight in ATC_WEIGHTS.items():
+        # one-hot × weight/√2 so two different classes are `weight` apart
+        onehot = pd.get_dummies(feats[level].fillna("N/A")).values.astype(float)
+        blocks.append(onehot * weight / np.sqrt(2))
+
+    matrix = np.hstack(blocks).astype(np.float32)
+    return {
+        "names": feats.index.to_numpy(),
+        "position": {name: i for i, name in enumerate(feats.index)},
+        "matrix": matrix,
+        "sq_norms": (matrix ** 2).sum(axis=1),
+        "features": feats,
+    }
+
+
+def find_analogs(index, molecule, k=10, same_atc_level=None):
+    """
+    Top-k nearest combinations to `molecule` (Euclidean distance in feature space).
+    `same_atc_level` ("ATC2", "ATC3", ...) restricts candidates to the same class.
+    """
+    pos = index["position"].get(molecule.strip().upper())
+    if pos is None:
+        return None
+
+    q = index["matrix"][pos]
+    dist2 = index["sq_norms"] - 2 * index["matrix"] @ q + index["sq_norms"][pos]
+    dist = np.sqrt(np.maximum(dist2, 0))
+    dist[pos] = np.inf
+
+    feats = index["features"]
+    if same_atc_level:
+        dist[feats[same_atc_level].values != feats[same_atc_level].values[pos]] = np.inf
+
+    k = min(k, int(np.isfinite(dist).sum()))
+    if k <= 0:
+        return feats.iloc[[]]
+    top = np.argpartition(dist, k - 1)[:k]
+    top = top[np.argsort(dist[top])]
+
+    result = feats.iloc[top].copy()
+    result.insert(0, "Distance", dist[top])
+    result.index.name = "Molecule Combination"
+    return result
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from tool_functions.Columns import cagr
+
+ATC_LEVELS = ["ATC1", "ATC2", "ATC3", "ATC4"]
+TREE_LEVELS = ATC_LEVELS + ["Molecule Combination"]
+METRIC_COLS = ["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]
+
+
+def _node_metrics(base, keys):
+    """
+    Totals, CAGRs and manufacturer concentration for every group of `keys`,
+    computed from the (keys…, Manufacturer) base aggregate.
+    """
+    by_manu = base.groupby(keys + ["Manufacturer"])[METRIC_COLS].sum()
+    nodes = by_manu.groupby(level=keys).sum()
+
+    totals = nodes["2024 LC Value"].reindex(by_manu.index.droplevel("Manufacturer")).values
+    share = np.divide(
+        by_manu["2024 LC Value"].values, totals,
+        out=np.zeros(len(by_manu)), where=totals > 0
+    )
+    share = pd.Series(share, index=by_manu.index)
+    share_by_node = share.groupby(level=keys)
+
+    nodes["Value CAGR (%)"] = cagr(nodes["2021 LC Value"], nodes["2024 LC Value"])
+    nodes["Units CAGR (%)"] = cagr(nodes["2021 Units"], nodes["2024 Units"])
+    nodes["HHI"] = (share ** 2).groupby(level=keys).sum() * 10000
+    nodes["Top Manufacturer"] = share_by_node.idxmax().map(lambda ix: ix[-1])
+    nodes["Top Share (%)"] = share_by_node.max() * 100
+    nodes["Manufacturers"] = (by_manu[METRIC_COLS].sum(axis=1) > 0).groupby(level=keys).sum()
+    nodes["Combinations"] = base.groupby(keys)["Molecule Combination"].nunique()
+    return nodes
+
+
+def build_atc_tree(df):
+    """
+    Precomputed ATC1 → ATC2 → ATC3 → ATC4 → combination rollup.
+
+    Returns a dict:
+      nodes   one row per tree node (id, parent, label, level + metrics), for treemap / sunburst
+      levels  {level: metrics indexed by code}, the same totals the class blocks used to
+              compute by filtering the full frame (e.g. levels["ATC4"].loc[code])
+    Value / Units are plain row sums, as in the existing class overview.
+    """
+    base = df[ATC_LEVELS + ["Molecule Combination", "Manufacturer"]].copy()
+    base[ATC_LEVELS] = base[ATC_LEVELS].fillna("N/A")
+    base[METRIC_COLS] = df[METRIC_COLS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    base = base.groupby(TREE_LEVELS + ["Manufacturer"], as_index=False)[METRIC_COLS].sum()
+
+    frames = []
+    levels = {}
+    for depth, level in enumerate(TREE_LEVELS, 1):
+        keys = TREE_LEVELS[:depth]
+        nodes = _node_metrics(base, keys).reset_index()
+
+        path = nodes[keys].astype(str)
+        nodes["id"] = path.agg("/".join, axis=1)
+        nodes["parent"] = path[keys[:-1]].agg("/".join, axis=1) if depth > 1 else ""
+        nodes["label"] = nodes[level].astype(str)
+        nodes["level"] = level
+        frames.append(nodes.drop(columns=keys))
+
+        levels[level] = _node_metrics(base, [level])
+
+    return {
+        "nodes": pd.concat(frames, ignore_index=True).set_index("id", drop=False),
+        "levels": levels,
+    }
+
+
+def get_class_metrics(tree, level, code):
+    """
+    {"value_2024", "unit_cagr", "value_cagr", "combinations", ...} for one ATC code,
+    or None if the code is not in the tree.
+    """
+    table = tree["levels"].get(level)
+    if table is None or code not in table.index:
+        return None
+    row = table.loc[code]
+    return {
+        "value_2024": row["2024 LC Value"],
+        "units_2024": row["2024 Units"],
+        "value_cagr": row["Value CAGR (%)"],
+        "unit_cagr": row["Units CAGR (%)"],
+        "hhi": row["HHI"],
+        "top_manufacturer": row["Top Manufacturer"],
+        "top_share": row["Top Share (%)"],
+        "combinations": int(row["Combinations"]),
+    }
+
+
+def plot_atc_tree(tree, chart="treemap", root=None, root_level=None, max_depth=3):
+    """
+    Treemap / sunburst over the rollup. `root` is a code to zoom into (at `root_level`, if given).
+    """
+    nodes = tree["nodes"]
+    nodes = nodes[nodes["2024 LC Value"] > 0]
+
+    parents = nodes["parent"]
+    if root:
+        match = nodes["label"] == root
+        if root_level:
+            match &= nodes["level"] == root_level
+        root_ids = nodes.index[match]
+        if len(root_ids):
+            rid = root_ids[0]
+            nodes = nodes[(nodes.index == rid) | nodes.index.str.startswith(rid + "/")]
+            parents = nodes["parent"].where(nodes.index != rid, "")
+
+    trace_cls = go.Treemap if chart == "treemap" else go.Sunburst
+    fig = go.Figure(trace_cls(
+        ids=nodes["id"],
+        labels=nodes["label"],
+        parents=parents,
+        values=nodes["2024 LC Value"],
+        branchvalues="total",
+        maxdepth=max_depth,
+        marker=dict(
+            colors=nodes["Value CAGR (%)"].clip(-30, 30),
+            colorscale="RdYlGn",
+            cmid=0,
+            colorbar=dict(title="Value CAGR %")
+        ),
+        customdata=np.stack([
+            nodes["Value CAGR (%)"], nodes["Units CAGR (%)"], nodes["HHI"],
+            nodes["Top Share (%)"], nodes["2024 Units"]
+        ], axis=-1),
+        hovertemplate=(
+            "<b>%{label}</b><br>"
+            "2024 Value: AED %{value:,.0f}<br>"
+            "2024 Units: %{customdata[4]:,.0f}<br>"
+            "Value CAGR: %{customdata[0]:.1f}%<br>"
+            "Units CAGR: %{customdata[1]:.1f}%<br>"
+            "HHI: %{customdata[2]:,.0f}<br>"
+            "Top Share: %{customdata[3]:.1f}%<extra></extra>"
+        )
+    ))
+    fig.update_layout(
+        title="ATC Market Map (2024 Value, coloured by Value CAGR 2021→2024)",
+        height=700,
+        margin=dict(t=60, l=10, r=10, b=10)
+    )
+    return fig
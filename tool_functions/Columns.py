@@ -0,0 +1,23 @@
+import numpy as np
+
+# Master Data yearly metric columns; the 2020 headers come starred in the export ("2020* Units")
+YEARS = ["2020", "2021", "2022", "2023", "2024"]
+UNIT_COLS = [f"{y} Units" for y in YEARS]
+VALUE_COLS = [f"{y} LC Value" for y in YEARS]
+METRIC_COLS = UNIT_COLS + VALUE_COLS
+
+STARRED_COLS = {"2020* Units": "2020 Units", "2020* LC Value": "2020 LC Value"}
+
+
+def unstar_years(df):
+    """Copy of df with the starred 2020 columns renamed to the plain year."""
+    return df.rename(columns=STARRED_COLS)
+
+
+def cagr(start, end, n=4):
+    """CAGR (%) over n years, element-wise; 0 where either end is not positive."""
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = ((end / start) ** (1 / n) - 1) * 100
+    return np.where((start > 0) & (end > 0), out, 0.0)
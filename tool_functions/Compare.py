@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from tool_functions.Columns import UNIT_COLS, VALUE_COLS, YEARS, cagr, unstar_years
+
+
+def compare_combinations(df, combinations):
+    """
+    Computes market split, share trend, CAGR and erosion for several combinations
+    from a single filter + groupby over the data.
+    Returns (metrics_df indexed by combination, manufacturer_share_df, yearly_totals_df).
+    """
+    combos = [c.strip().upper() for c in combinations]
+    df = unstar_years(df)
+
+    # --- One filter + one grouped pass ---
+    sub = df.loc[
+        df["Molecule Combination"].isin(combos),
+        ["Molecule Combination", "Market", "Manufacturer"] + UNIT_COLS + VALUE_COLS
+    ]
+    if sub.empty:
+        return None, None, None
+
+    num = sub[UNIT_COLS + VALUE_COLS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    num = num.div(sub["Molecule Combination"].str.count(r" \+ ") + 1, axis=0)
+    num[["Molecule Combination", "Market", "Manufacturer"]] = sub[["Molecule Combination", "Market", "Manufacturer"]]
+    grouped = num.groupby(["Molecule Combination", "Market", "Manufacturer"])[UNIT_COLS + VALUE_COLS].sum()
+
+    # --- Everything below is derived from `grouped` ---
+    by_combo = grouped.groupby(level=0).sum()
+    by_market = grouped.groupby(level=[0, 1]).sum()
+    by_manu = grouped.groupby(level=[0, 2]).sum()
+
+    totals_units = by_combo[UNIT_COLS]
+    manu_share = by_manu[UNIT_COLS].div(
+        totals_units.reindex(by_manu.index.get_level_values(0)).values
+    ).fillna(0) * 100
+    manu_share.columns = YEARS
+
+    # Originator = top manufacturer by 2024 units (same rule as the Erosion tab)
+    top_idx = by_manu["2024 Units"].groupby(level=0).idxmax()
+    originator = manu_share.loc[top_idx.values]
+    originator.index = originator.index.get_level_values(0)
+
+    def market_col(market, col):
+        try:
+            return by_market.xs(market, level=1)[col].reindex(by_combo.index).fillna(0)
+        except KeyError:
+            return pd.Series(0.0, index=by_combo.index)
+
+    total_units_24 = by_combo["2024 Units"].replace(0, np.nan)
+    metrics = pd.DataFrame({
+        "2024 Value (AED)": by_combo["2024 LC Value"],
+        "2024 Units": by_combo["2024 Units"],
+        "Value CAGR (%)": cagr(by_combo["2021 LC Value"], by_combo["2024 LC Value"]),
+        "Units CAGR (%)": cagr(by_combo["2021 Units"], by_combo["2024 Units"]),
+        "Manufacturers": (by_manu[UNIT_COLS + VALUE_COLS].sum(axis=1) > 0).groupby(level=0).sum(),
+        "Private Share (%)": (market_col("PRIVATE MARKET", "2024 Units") / total_units_24 * 100).fillna(0),
+        "LPO Share (%)": (market_col("LPO", "2024 Units") / total_units_24 * 100).fillna(0),
+        "Private CAGR (Units) (%)": cagr(market_col("PRIVATE MARKET", "2021 Units"), market_col("PRIVATE MARKET", "2024 Units")),
+        "LPO CAGR (Units) (%)": cagr(market_col("LPO", "2021 Units"), market_col("LPO", "2024 Units")),
+        "Top Manufacturer": top_idx.map(lambda ix: ix[1]),
+        "Top Share 2021 (%)": originator["2021"],
+        "Top Share 2024 (%)": originator["2024"],
+    })
+    metrics["Erosion (pts)"] = metrics["Top Share 2021 (%)"] - metrics["Top Share 2024 (%)"]
+
+    # keep the order the user picked
+    metrics = metrics.reindex([c for c in combos if c in metrics.index])
+    return metrics, manu_share, by_combo
+
+
+def plot_comparison(df, combinations, use_value=False):
+    """
+    Returns (metrics_df, trend_fig, split_fig, share_fig) for the comparison tab.
+    """
+    metrics, manu_share, totals = compare_combinations(df, combinations)
+    if metrics is None:
+        return None, None, None, None
+
+    trend = totals[VALUE_COLS if use_value else UNIT_COLS]
+
+    # --- Trend lines ---
+    trend_fig = go.Figure()
+    for combo in metrics.index:
+        trend_fig.add_trace(go.Scatter(
+            x=YEARS, y=trend.loc[combo].values, mode="lines+markers", name=combo
+        ))
+    trend_fig.update_layout(
+        title="Market Size Over Time",
+        xaxis_title="Year",
+        yaxis_title="Value (AED)" if use_value else "Units",
+        template="plotly_white",
+        height=450
+    )
+
+    # --- Market split ---
+    split_fig = go.Figure()
+    for label in ["Private Share (%)", "LPO Share (%)"]:
+        split_fig.add_trace(go.Bar(name=label.replace(" Share (%)", ""), x=list(metrics.index), y=metrics[label].values))
+    split_fig.update_layout(
+        barmode="stack",
+        title="2024 Market Split (Units)",
+        yaxis_title="Share (%)",
+        template="plotly_white",
+        height=450
+    )
+
+    # --- Top manufacturer share trend ---
+    share_fig = go.Figure()
+    for combo in metrics.index:
+        top = metrics.at[combo, "Top Manufacturer"]
+        share_fig.add_trace(go.Scatter(
+            x=YEARS,
+            y=manu_share.loc[(combo, top)].round(2).values,
+            mode="lines+markers",
+            name=f"{combo} ({top})"
+        ))
+    share_fig.update_layout(
+        title="Top Manufacturer Share Over Time",
+        xaxis_title="Year",
+        yaxis_title="Market Share (%)",
+        template="plotly_white",
+        height=450
+    )
+
+    return metrics, trend_fig, split_fig, share_fig
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from tool_functions.Columns import unstar_years
+
+YEAR = "2024"
+ATC_LEVELS = ["ATC1", "ATC2", "ATC3", "ATC4"]
+
+
+def build_overlap_matrix(df, year=YEAR):
+    """
+    Sparse manufacturer × combination matrices of `year` LC value and units (split by
+    molecule count, as in the portfolio index), built from one grouped pass.
+
+    Returns a dict:
+      manufacturers, combinations  row / column labels (sorted Index)
+      atc        ATC1–4 per combination, aligned with the columns
+      value      csr matrix of LC value
+      units      csr matrix of units
+      presence   csr matrix, 1 where the manufacturer sells the combination
+    """
+    df = unstar_years(df)
+    value_col, units_col = f"{year} LC Value", f"{year} Units"
+    num = df[[value_col, units_col]].apply(pd.to_numeric, errors="coerce").fillna(0)
+    num = num.div(df["Molecule Combination"].str.count(r" \+ ") + 1, axis=0)
+    num[["Manufacturer", "Molecule Combination"]] = df[["Manufacturer", "Molecule Combination"]]
+
+    cells = num.groupby(["Manufacturer", "Molecule Combination"])[[value_col, units_col]].sum()
+    cells = cells[(cells > 0).any(axis=1)]
+    rows, manufacturers = pd.factorize(cells.index.get_level_values(0), sort=True)
+    cols, combinations = pd.factorize(cells.index.get_level_values(1), sort=True)
+    shape = (len(manufacturers), len(combinations))
+
+    def csr(values):
+        return sparse.csr_matrix((values, (rows, cols)), shape=shape)
+
+    return {
+        "year": year,
+        "manufacturers": manufacturers,
+        "combinations": combinations,
+        "atc": df.groupby("Molecule Combination")[ATC_LEVELS].first().reindex(combinations),
+        "value": csr(cells[value_col].to_numpy()),
+        "units": csr(cells[units_col].to_numpy()),
+        "presence": csr(np.ones(len(cells))),
+    }
+
+
+def atc_codes(matrix):
+    """Every ATC1–4 code that has at least one combination in the matrix."""
+    return sorted(set(matrix["atc"][ATC_LEVELS].stack().dropna()))
+
+
+def _scoped(matrix, atc=None, use_value=True):
+    """(presence, weights) restricted to the combinations of one ATC code (any level)."""
+    presence = matrix["presence"]
+    weights = matrix["value"] if use_value else matrix["units"]
+    if atc:
+        cols = np.flatnonzero((matrix["atc"][ATC_LEVELS] == atc).any(axis=1).to_numpy())
+        presence, weights = presence[:, cols], weights[:, cols]
+    return presence.tocsr(), weights.tocsr()
+
+
+def _row_norms(weights):
+    return np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+
+
+def competitor_overlap(matrix, manufacturer, atc=None, use_value=True, top_n=20):
+    """
+    Rivals of one manufacturer ranked by how many combinations they share, from sparse
+    row × matrix products (no pairwise loop):
+      Shared Combinations   combinations both sell
+      Jaccard               shared / combinations either sells
+      Similarity            cosine of the two value (or units) vectors
+      Our Exposure (%)      share of our value / units in combinations the rival sells
+      Rival in Shared       the rival's value / units in the shared combinations
+    None if the manufacturer has no sales in the matrix year.
+    """
+    if manufacturer not in matrix["manufacturers"]:
+        return None
+    i = matrix["manufacturers"].get_loc(manufacturer)
+    presence, weights = _scoped(matrix, atc, use_value)
+
+    ours, our_weights = presence[i], weights[i]
+    shared = (presence @ ours.T).toarray().ravel()
+    counts = np.asarray(presence.sum(axis=1)).ravel()
+    norms = _row_norms(weights)
+    our_total = our_weights.sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jaccard = np.nan_to_num(shared / (counts + counts[i] - shared))
+        similarity = np.nan_to_num((weights @ our_weights.T).toarray().ravel() / (norms * norms[i]))
+        exposure = np.nan_to_num((presence @ our_weights.T).toarray().ravel() / our_total * 100)
+    rival_in_shared = (weights @ ours.T).toarray().ravel()
+
+    table = pd.DataFrame({
+        "Shared Combinations": shared.astype(int),
+        "Jaccard": jaccard,
+        "Similarity": similarity,
+        "Our Exposure (%)": exposure,
+        "Rival in Shared": rival_in_shared,
+    }, index=pd.Index(matrix["manufacturers"], name="Rival"))
+    table = table[(table["Shared Combinations"] > 0) & (np.arange(len(table)) != i)]
+    return table.sort_values(["Shared Combinations", "Our Exposure (%)"], ascending=False).head(top_n)
+
+
+def overlap_pairs(matrix, atc=None, use_value=True, top_n=20):
+    """
+    Manufacturer pairs with the most shared combinations (optionally within one ATC code),
+    from one sparse P × Pᵀ product; ties broken by value (or units) similarity.
+    """
+    presence, weights = _scoped(matrix, atc, use_value)
+    shared = sparse.triu(presence @ presence.T, k=1).tocoo()
+    if shared.nnz == 0:
+        return pd.DataFrame(columns=["Manufacturer A", "Manufacturer B", "Shared Combinations", "Jaccard", "Similarity"])
+
+    counts = np.asarray(presence.sum(axis=1)).ravel()
+    norms = _row_norms(weights)
+    dots = np.asarray((weights @ weights.T).tocsr()[shared.row, shared.col]).ravel()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jaccard = shared.data / (counts[shared.row] + counts[shared.col] - shared.data)
+        similarity = np.nan_to_num(dots / (norms[shared.row] * norms[shared.col]))
+
+    names = np.asarray(matrix["manufacturers"])
+    table = pd.DataFrame({
+        "Manufacturer A": names[shared.row],
+        "Manufacturer B": names[shared.col],
+        "Shared Combinations": shared.data.astype(int),
+        "Jaccard": jaccard,
+        "Similarity": similarity,
+    })
+    return table.sort_values(["Shared Combinations", "Similarity"], ascending=False).head(top_n).reset_index(drop=True)
@@ -0,0 +1,339 @@
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from tool_functions.Normalize import clean_ingredient_series, collapse_spaces, map_unique
+
+CROSSWALK_DIR = os.path.join(".cache", "crosswalk")
+CROSSWALK_FILE = "product_crosswalk.parquet"
+MANIFEST_FILE = "manifest.json"
+
+# Bump when the normalization or scoring changes: stored matches are then rescored
+MATCHER_VERSION = 1
+
+MASTER_KEYS = ["Product", "Manufacturer", "Molecule Combination"]
+CROSSWALK_COLS = MASTER_KEYS + [
+    "Trade Name Key", "Trade Names", "Company", "Score", "Name Score", "Ingredient Score",
+    "Company Score", "Confidence", "Block", "Candidates", "Block Signature",
+]
+SCORE_COLS = ["Score", "Name Score", "Ingredient Score", "Company Score"]
+
+# Score = weighted name / ingredient / company similarity, each in [0, 1]
+WEIGHTS = {"name": 0.7, "ingredient": 0.2, "company": 0.1}
+MIN_SCORE = 0.5
+HIGH_CONFIDENCE = 0.85
+MEDIUM_CONFIDENCE = 0.7
+# Products with no ingredient block fall back to names sharing this share of their 3-grams
+NGRAM_MIN_OVERLAP = 0.5
+
+# Salt / form words that don't identify a molecule ("Metformin Hydrochloride" → METFORMIN)
+SALT_WORDS = {
+    "AS", "HCL", "HYDROCHLORIDE", "DIHYDROCHLORIDE", "HYDROBROMIDE", "SODIUM", "POTASSIUM", "CALCIUM",
+    "MAGNESIUM", "SULFATE", "SULPHATE", "MESYLATE", "MESILATE", "MALEATE", "BESYLATE", "BESILATE",
+    "TARTRATE", "CITRATE", "FUMARATE", "SUCCINATE", "ACETATE", "PHOSPHATE", "HYDRATE", "DIHYDRATE",
+    "MONOHYDRATE", "TRIHYDRATE", "ANHYDROUS", "BROMIDE", "CHLORIDE", "NITRATE", "TROMETHAMINE",
+    "DIPROPIONATE", "PROPIONATE", "VALERATE", "FUROATE", "XINAFOATE", "BASE", "AND", "WITH",
+}
+# Form / pack words dropped from trade names ("GLUCORMINXR 500\nmg" → GLUCORMINXR)
+FORM_WORDS = {
+    "TAB", "TABS", "TABLET", "TABLETS", "CAP", "CAPS", "CAPSULE", "CAPSULES", "FC", "FILM", "COATED",
+    "INJ", "INJECTION", "VIAL", "VIALS", "AMP", "AMPOULE", "AMPOULES", "SYRUP", "SUSPENSION", "SUSP",
+    "SOLUTION", "SOL", "DROPS", "CREAM", "OINTMENT", "GEL", "SACHET", "SACHETS", "POWDER", "ORAL",
+    "MG", "MCG", "G", "ML", "IU", "UNITS", "UNIT",
+}
+
+
+# --- Normalization ---
+def normalize_trade_name(series):
+    """Upper-case brand text without strengths, symbols and form words ("SOLU MEDROL\\n500mg/8ml" → "SOLU MEDROL")."""
+    def _clean(s):
+        words = (
+            s.fillna("").astype(str).str.upper()
+            .str.replace(r"\(.*?\)", " ", regex=True)
+            .str.replace(r"\d+(?:[.,]\d+)?\s*(?:MG|MCG|G|ML|IU|%|UNITS?)?\b", " ", regex=True)
+            .str.replace(r"[^A-Z ]", " ", regex=True)
+            .str.split()
+        )
+        return words.map(lambda w: " ".join(x for x in w if x not in FORM_WORDS))
+    return map_unique(series, _clean)
+
+
+def ingredient_key(series):
+    """Sorted identifying ingredient words, space-separated ("Verapamil HCl, Trandolapril," → "TRANDOLAPRIL VERAPAMIL")."""
+    def _clean(s):
+        words = clean_ingredient_series(s.str.replace(r"[+,;/&\-]", " ", regex=True)).str.split()
+        return words.map(lambda w: " ".join(sorted({x for x in w if len(x) > 2 and x not in SALT_WORDS})))
+    return map_unique(series.fillna("").astype(str), _clean)
+
+
+def _trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+# --- Both sides reduced to distinct entities ---
+def master_entities(df):
+    """Distinct (Product, Manufacturer, Molecule Combination) with normalized name / ingredient keys."""
+    out = df[MASTER_KEYS].dropna(subset=["Product"]).drop_duplicates().reset_index(drop=True)
+    out["Name Key"] = normalize_trade_name(out["Product"])
+    out["Ingredient Key"] = ingredient_key(out["Molecule Combination"])
+    out["Company Key"] = collapse_spaces(out["Manufacturer"]).str.upper()
+    return out
+
+
+def mohap_entities(mohap_df):
+    """
+    Distinct (Trade Name Key, Ingredient Key, Company) from the MOHAP price list, with the
+    raw trade names (one per strength / pack) that share them. Repeated header rows dropped.
+    """
+    mohap = mohap_df[mohap_df["Trade Name"].astype(str).str.strip() != "Trade Name"]
+    out = pd.DataFrame({
+        "Trade Name Key": normalize_trade_name(mohap["Trade Name"]),
+        "Ingredient Key": ingredient_key(mohap["Ingredient"]),
+        "Company": collapse_spaces(mohap["Company"]),
+        "Trade Name": collapse_spaces(mohap["Trade Name"]),
+    })
+    out = out[out["Trade Name Key"] != ""]
+    out = out.groupby(["Trade Name Key", "Ingredient Key", "Company"], sort=True)["Trade Name"].agg(
+        lambda names: " | ".join(sorted(set(names)))
+    ).reset_index().rename(columns={"Trade Name": "Trade Names"})
+    out["Company Key"] = out["Company"].str.upper()
+    out["Digest"] = pd.util.hash_pandas_object(out[["Trade Name Key", "Ingredient Key", "Company", "Trade Names"]], index=False).to_numpy()
+    return out
+
+
+# --- Blocking ---
+def build_blocks(mohap):
+    """Inverted indexes over the MOHAP entities: ingredient word → rows and name 3-gram → rows."""
+    by_ingredient = defaultdict(list)
+    by_ngram = defaultdict(list)
+    for i, (name, ingredient) in enumerate(zip(mohap["Trade Name Key"], mohap["Ingredient Key"])):
+        for word in ingredient.split():
+            by_ingredient[word].append(i)
+        for gram in _trigrams(name):
+            by_ngram[gram].append(i)
+    return {"ingredient": by_ingredient, "ngram": by_ngram}
+
+
+def candidates(name_key, ingredient_words, blocks):
+    """
+    (block label, candidate rows). The block is the product's rarest ingredient word in
+    MOHAP; without one, MOHAP names sharing at least NGRAM_MIN_OVERLAP of its 3-grams.
+    """
+    known = [w for w in ingredient_words if w in blocks["ingredient"]]
+    if known:
+        word = min(known, key=lambda w: len(blocks["ingredient"][w]))
+        return f"ingredient:{word}", blocks["ingredient"][word]
+
+    grams = _trigrams(name_key)
+    if not name_key:
+        return "none", []
+    hits = Counter(i for g in grams if g in blocks["ngram"] for i in blocks["ngram"][g])
+    needed = max(1, int(np.ceil(NGRAM_MIN_OVERLAP * len(grams))))
+    return "ngram", sorted(i for i, n in hits.items() if n >= needed)
+
+
+def assign_blocks(master, mohap, blocks):
+    """
+    Adds Block / Candidates / Block Signature to `master` and returns each row's candidate
+    MOHAP rows. The signature fingerprints the candidates, so it changes whenever any
+    entity the product is compared against is added, removed or renamed.
+    """
+    digests = mohap["Digest"].to_numpy()
+    labels, rows, signatures, seen = [], [], [], {}
+    for name, ingredient in zip(master["Name Key"], master["Ingredient Key"]):
+        label, cand = candidates(name, ingredient.split(), blocks)
+        key = label if label.startswith("ingredient:") else (label, tuple(cand))
+        if key not in seen:
+            seen[key] = hashlib.sha1(digests[cand].tobytes()).hexdigest()[:12]
+        labels.append(label)
+        rows.append(cand)
+        signatures.append(seen[key])
+    master["Block"] = labels
+    master["Candidates"] = [len(r) for r in rows]
+    master["Block Signature"] = signatures
+    return rows
+
+
+# --- Scoring ---
+def _first_word(text):
+    return text.split(" ", 1)[0]
+
+
+def score_block(task):
+    """
+    Best MOHAP entity for each product of one task. `task` is a list of
+    (product index, name key, ingredient key, company key, candidate tuples) —
+    plain Python objects so tasks can be shipped to worker processes.
+    """
+    results = []
+    for idx, name, ingredient, company, cands in task:
+        words = set(ingredient.split())
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(name)
+        best = None
+        for row, c_name, c_ingredient, c_company in cands:
+            matcher.set_seq1(c_name)
+            # cheap upper bound first: most candidates in a large block are clearly different names
+            if best is not None and WEIGHTS["name"] * matcher.quick_ratio() + WEIGHTS["ingredient"] + WEIGHTS["company"] <= best[0]:
+                continue
+            name_score = matcher.ratio()
+            ingredient_score = _jaccard(words, set(c_ingredient.split()))
+            company_score = float(bool(company) and _first_word(company) == _first_word(c_company))
+            total = (WEIGHTS["name"] * name_score + WEIGHTS["ingredient"] * ingredient_score
+                     + WEIGHTS["company"] * company_score)
+            if best is None or total > best[0]:
+                best = (total, row, name_score, ingredient_score, company_score)
+        results.append((idx, best))
+    return results
+
+
+def _confidence(score):
+    return np.select(
+        [score >= HIGH_CONFIDENCE, score >= MEDIUM_CONFIDENCE, score >= MIN_SCORE],
+        ["HIGH", "MEDIUM", "LOW"], default="NONE"
+    )
+
+
+def match_products(master, mohap, rows, workers=1, chunk=200):
+    """
+    Scores every row of `master` (master_entities frame, after assign_blocks) against its
+    candidate rows; with workers > 1 chunks of products are scored in parallel processes.
+    """
+    cand = mohap[["Trade Name Key", "Ingredient Key", "Company Key"]].to_numpy().tolist()
+    items = [
+        (idx, name, ingredient, company, [(r, *cand[r]) for r in rows[idx]])
+        for idx, (name, ingredient, company) in enumerate(zip(master["Name Key"], master["Ingredient Key"], master["Company Key"]))
+    ]
+    tasks = [items[i:i + chunk] for i in range(0, len(items), chunk)]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scored = [r for part in pool.map(score_block, tasks) for r in part]
+    else:
+        scored = [r for task in tasks for r in score_block(task)]
+
+    out = master[MASTER_KEYS + ["Block", "Candidates", "Block Signature"]].copy()
+    best = dict(scored)
+    matched_row = [best[i][1] if best[i] else -1 for i in range(len(master))]
+    for col, pos in [("Score", 0), ("Name Score", 2), ("Ingredient Score", 3), ("Company Score", 4)]:
+        out[col] = [best[i][pos] if best[i] else 0.0 for i in range(len(master))]
+
+    found = np.array(matched_row) >= 0
+    picked = mohap.iloc[np.where(found, matched_row, 0)].reset_index(drop=True)
+    keep = found & (out["Score"].to_numpy() >= MIN_SCORE)
+    for col in ["Trade Name Key", "Trade Names", "Company"]:
+        out[col] = picked[col].where(keep).to_numpy()
+    out["Confidence"] = _confidence(out["Score"].where(keep, 0.0).to_numpy())
+    return out[CROSSWALK_COLS]
+
+
+# --- Persisted crosswalk ---
+def load_crosswalk(store_dir=CROSSWALK_DIR):
+    """Stored crosswalk (empty frame if none, or if it was built by another matcher version)."""
+    path = os.path.join(store_dir, CROSSWALK_FILE)
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return pd.DataFrame(columns=CROSSWALK_COLS)
+    with open(manifest_path) as f:
+        if json.load(f).get("matcher_version") != MATCHER_VERSION:
+            return pd.DataFrame(columns=CROSSWALK_COLS)
+    return pd.read_parquet(path)
+
+
+def _save(crosswalk, stats, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, CROSSWALK_FILE)
+    crosswalk.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"matcher_version": MATCHER_VERSION, "built": dt.datetime.now().isoformat(timespec="seconds"), **stats}, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def build_crosswalk(master_df, mohap_df, store_dir=CROSSWALK_DIR, workers=1, full=False):
+    """
+    Master Data product → MOHAP trade name crosswalk, rebuilt incrementally.
+
+    A stored match is reused when the product is unchanged and its candidate block
+    (the MOHAP entities it is compared against) has the same signature; only new
+    products and products whose block changed are rescored. `full=True` rescores all.
+    Returns (crosswalk, stats).
+    """
+    master = master_entities(master_df)
+    mohap = mohap_entities(mohap_df)
+    blocks = build_blocks(mohap)
+
+    rows = assign_blocks(master, mohap, blocks)
+
+    stored = pd.DataFrame(columns=CROSSWALK_COLS) if full else load_crosswalk(store_dir)
+    reuse = master[MASTER_KEYS + ["Block Signature"]].merge(stored, on=MASTER_KEYS + ["Block Signature"], how="inner")
+    reused = master[MASTER_KEYS].merge(reuse[MASTER_KEYS], how="left", indicator=True)["_merge"].eq("both").to_numpy()
+    todo = master[~reused].reset_index(drop=True)
+    todo_rows = [r for r, done in zip(rows, reused) if not done]
+
+    fresh = match_products(todo, mohap, todo_rows, workers=workers) if len(todo) else pd.DataFrame(columns=CROSSWALK_COLS)
+    parts = [part for part in (reuse[CROSSWALK_COLS], fresh) if len(part)]
+    crosswalk = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=CROSSWALK_COLS)
+    crosswalk = crosswalk.astype({c: float for c in SCORE_COLS} | {"Candidates": int})
+    crosswalk = crosswalk.sort_values(MASTER_KEYS).reset_index(drop=True)
+
+    stats = {
+        "products": len(crosswalk),
+        "reused": len(reuse),
+        "rescored": len(fresh),
+        "matched": int((crosswalk["Confidence"] != "NONE").sum()),
+    }
+    _save(crosswalk, stats, store_dir)
+    return crosswalk, stats
+
+
+# --- Lookups ---
+def products_for(crosswalk, molecule_combination):
+    """Crosswalk rows for one combination, best matches first."""
+    rows = crosswalk[crosswalk["Molecule Combination"] == molecule_combination]
+    return rows.sort_values(["Score", "Product"], ascending=[False, True]).reset_index(drop=True)
+
+
+def join_mohap(crosswalk, mohap_df, min_confidence="MEDIUM"):
+    """
+    MOHAP price list rows joined to their Master Data products (crosswalk rows at or
+    above `min_confidence`). One output row per (product, MOHAP pack).
+    """
+    levels = ["HIGH", "MEDIUM", "LOW"]
+    keep = crosswalk[crosswalk["Confidence"].isin(levels[:levels.index(min_confidence) + 1])]
+    mohap = mohap_df[mohap_df["Trade Name"].astype(str).str.strip() != "Trade Name"].copy()
+    mohap["Trade Name Key"] = normalize_trade_name(mohap["Trade Name"])
+    mohap["Company"] = collapse_spaces(mohap["Company"])
+    return keep[MASTER_KEYS + ["Trade Name Key", "Company", "Score", "Confidence"]].merge(
+        mohap, on=["Trade Name Key", "Company"], how="inner"
+    )
+
+
+if __name__ == "__main__":
+    from tool_functions.DataLoad import load_master_data, load_mohap_data
+
+    parser = argparse.ArgumentParser(description="Build the Master Data product → MOHAP trade name crosswalk.")
+    parser.add_argument("--store", default=CROSSWALK_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--full", action="store_true", help="rescore every product instead of only changed blocks")
+    args = parser.parse_args()
+
+    crosswalk, stats = build_crosswalk(load_master_data(), load_mohap_data(), store_dir=args.store,
+                                       workers=args.workers, full=args.full)
+    print(json.dumps(stats, indent=2))
+    print(crosswalk["Confidence"].value_counts().to_string())
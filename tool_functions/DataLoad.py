@@ -0,0 +1,161 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from tool_functions.Normalize import clean_combo_series, format_ob_ingredients
+from tool_functions.PackParse import add_master_unit_prices, add_mohap_unit_prices
+from tool_functions.combinations import (
+    apply_combination_column,
+    create_combination_column,
+    normalize_product_columns,
+)
+
+MASTER_DATA_PATH = "Master Data.csv"
+MOHAP_PATH = "PriceListMOHAP.csv"
+OB_PRODUCTS_PATH = "OBproducts.csv"
+OB_PATENTS_PATH = "OBpatents.csv"
+# "Aug 24, 2026" — passed explicitly, since inferring from a first value like "May 26, 2030" picks %B
+OB_DATE_FORMAT = "%b %d, %Y"
+
+# Extracts bigger than this are ingested in chunks instead of one read_csv
+STREAM_THRESHOLD_BYTES = 512 * 1024 * 1024
+DEFAULT_CHUNKSIZE = 200_000
+# Columns a streamed extract is keyed by (everything else but the Units / Value columns is not read)
+MASTER_DIMENSIONS = (
+    "Molecule", "Product", "Manufacturer", "Market", "ATC1", "ATC2", "ATC3", "ATC4",
+    "Pack", "Strength", "Retail Price", "NFC3", "Launch Year",
+    "Molecule Combination", "Molecule Combination Type",
+)
+NUMERIC_DIMENSIONS = ("Retail Price", "Launch Year")
+
+
+def _is_metric(col):
+    return "Value" in col or "Units" in col
+
+
+def _clean_metrics(df):
+    for c in df.columns:
+        if _is_metric(c):
+            df[c] = pd.to_numeric(
+                df[c].astype(str).str.replace(",", "").str.strip(),
+                errors="coerce"
+            )
+    return df
+
+
+def load_master_data(path=MASTER_DATA_PATH, chunksize=None):
+    if chunksize is None and os.path.getsize(path) > STREAM_THRESHOLD_BYTES:
+        chunksize = DEFAULT_CHUNKSIZE
+    if chunksize:
+        return stream_master_data(path, chunksize=chunksize)
+
+    df = pd.read_csv(path)
+    df = create_combination_column(df)
+    df.columns = df.columns.str.replace("\n", " ", regex=False).str.strip()
+    df = _clean_metrics(df)
+
+    # 👉 Clean Molecule Combination column here
+    df["Molecule Combination"] = clean_combo_series(df["Molecule Combination"])
+
+    # 👉 Pack count / strength parsed from the Pack text → price per unit and per mg
+    df = add_master_unit_prices(df)
+
+    return df
+
+
+def _cast_keys(chunk, key_cols):
+    """Same dtype for a key column in every chunk ("90" in one chunk and 90.0 in the next are one key)."""
+    for c in key_cols:
+        if c in NUMERIC_DIMENSIONS:
+            chunk[c] = pd.to_numeric(chunk[c].astype(str).str.replace(",", "").str.strip(), errors="coerce")
+        else:
+            chunk[c] = chunk[c].astype(object).where(chunk[c].isna(), chunk[c].astype(str))
+    return chunk
+
+
+def _reduce(partials, key_cols):
+    return pd.concat(partials).groupby(level=key_cols, dropna=False, sort=False).sum(min_count=1)
+
+
+def stream_master_data(path=MASTER_DATA_PATH, chunksize=DEFAULT_CHUNKSIZE, dimensions=MASTER_DIMENSIONS):
+    """
+    Out-of-core version of load_master_data for extracts that don't fit in memory.
+
+    Pass 1 reads only Product / Molecule to build the product → molecules map.
+    Pass 2 streams the Units / Value columns plus `dimensions` (any other column, e.g.
+    Month or Country, is not read, so monthly or multi-country rows collapse to the grain
+    the UI works with) and sums each chunk per key. The per-chunk partials are merged
+    whenever they reach twice the size of the last merge, so every row is regrouped a
+    bounded number of times. Peak memory is one chunk plus about three times the final
+    aggregate (one row per distinct key), not a function of the chunk size alone.
+    """
+    # --- Pass 1: product → molecules ---
+    product_molecules = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=lambda c: c.strip() in ("Product", "Molecule")):
+        chunk = normalize_product_columns(chunk)
+        for product, mols in chunk.groupby("Product")["Molecule"].unique().items():
+            product_molecules.setdefault(product, set()).update(mols)
+    product_molecule_map = {p: " + ".join(sorted(m)) for p, m in product_molecules.items()}
+
+    # --- Pass 2: per-chunk partial sums, merged geometrically ---
+    partials, pending, merged = [], 0, 0
+    key_cols = metric_cols = columns = None
+    wanted = lambda c: c.strip() in dimensions or _is_metric(c)
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=wanted, dtype=str):
+        chunk = normalize_product_columns(chunk)
+        chunk = apply_combination_column(chunk, product_molecule_map)
+        chunk = _clean_metrics(chunk)
+
+        if key_cols is None:
+            columns = list(chunk.columns)
+            metric_cols = [c for c in columns if _is_metric(c)]
+            key_cols = [c for c in columns if c not in metric_cols]
+
+        chunk = _cast_keys(chunk, key_cols)
+        part = chunk.groupby(key_cols, dropna=False, sort=False)[metric_cols].sum(min_count=1)
+        partials.append(part)
+        pending += len(part)
+        if pending > max(2 * merged, chunksize):
+            partials = [_reduce(partials, key_cols)]
+            pending = merged = len(partials[0])
+
+    df = _reduce(partials, key_cols).reset_index()[columns]
+    df["Molecule Combination"] = clean_combo_series(df["Molecule Combination"])
+    return add_master_unit_prices(df)
+
+
+def load_mohap_data(path=MOHAP_PATH):
+    mohap_df = pd.read_csv(path)
+    mohap_df.columns = mohap_df.columns.str.replace("\n", " ", regex=False).str.strip()
+    return add_mohap_unit_prices(mohap_df)
+
+
+def load_orange_book(products_path=OB_PRODUCTS_PATH, patents_path=OB_PATENTS_PATH):
+    ob_products = pd.read_csv(products_path)
+    ob_patents = pd.read_csv(patents_path)
+
+    # --- Clean Orange Book product data ---
+    ob_products.columns = ob_products.columns.str.strip()
+    ob_products["Ingredient"] = ob_products["Ingredient"].astype(str).str.upper().str.strip()
+    ob_products["Ingredient_Formatted_Clean"] = format_ob_ingredients(ob_products["Ingredient"])
+
+    return ob_products, ob_patents
+
+
+def dataset_version(*paths):
+    """
+    Short fingerprint of the source files (path, size, mtime).
+    Changes whenever any of the files is replaced, so it can be used in cache keys.
+    """
+    if not paths:
+        paths = (MASTER_DATA_PATH, MOHAP_PATH, OB_PRODUCTS_PATH, OB_PATENTS_PATH)
+
+    h = hashlib.sha1()
+    for p in paths:
+        try:
+            st_ = os.stat(p)
+            h.update(f"{p}|{st_.st_size}|{st_.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{p}|missing;".encode())
+    return h.hexdigest()[:12]
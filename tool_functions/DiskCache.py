@@ -0,0 +1,98 @@
+import glob
+import hashlib
+import os
+import pickle
+import threading
+
+CACHE_DIR = os.path.join(".cache", "pharmai")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def code_version(folder=os.path.dirname(os.path.abspath(__file__))):
+    """Fingerprint of the analytics code, so entries built by older code are never reused."""
+    h = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(folder, "*.py"))):
+        with open(path, "rb") as f:
+            h.update(os.path.basename(path).encode())
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+CODE_VERSION = code_version()
+
+
+class DiskCache:
+    """
+    Pickled results on disk, shared by every process that points at the same folder.
+
+    Keys should include the source fingerprint (dataset_version()); the code version is
+    added here. When the folder grows past `max_bytes`, the least recently used entries
+    (by file mtime, refreshed on every hit) are deleted.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr((CODE_VERSION, key)).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def get_or_compute(self, key, fn):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return value
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # missing, half-written by a crashed process, or pickled by incompatible code
+            pass
+
+        with self._lock:
+            self.misses += 1
+        value = fn()
+
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # unpicklable or disk full: still return the value, just don't persist it
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return value
+
+        self.evict()
+        return value
+
+    def evict(self):
+        """Deletes least recently used entries until the folder is within max_bytes."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pkl"):
+                    st_ = entry.stat()
+                    entries.append((st_.st_mtime, st_.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            for path in glob.glob(os.path.join(self.directory, "*.pkl")):
+                os.remove(path)
@@ -0,0 +1,264 @@
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+EVENTS_DIR = os.path.join(".cache", "entry_events")
+EVENTS_FILE = "events.parquet"
+MANIFEST_FILE = "manifest.json"
+
+# Bump when the detection rules change: stored events are then rescanned
+DETECTOR_VERSION = 1
+
+# The originator "loses a step" when its unit share falls by at least this many points in a year
+ORIGINATOR_DROP_PTS = 5.0
+
+EVENT_TYPES = ["Launch", "New Entrant", "Competitor Count Change", "Originator Share Drop"]
+EVENT_COLS = [
+    "Year", "Event", "Molecule Combination", "Manufacturer", "First Sales Year",
+    "Competitors Before", "Competitors", "Share Before (%)", "Share (%)", "Share Change (pts)",
+    "ATC4", "ATC3",
+]
+
+
+# --- Units per (combination, manufacturer) and year ---
+def data_years(df):
+    """Years that have a units column ("2020* Units" counts as 2020), oldest first."""
+    years = {}
+    for col in df.columns:
+        m = re.match(r"^(\d{4})\*? Units$", col)
+        if m:
+            years[int(m.group(1))] = col
+    return dict(sorted(years.items()))
+
+
+def pair_units(df):
+    """
+    One grouped pass: units per (combination, manufacturer) with one column per year,
+    sorted so each combination is a contiguous block, plus the combination → ATC4 / ATC3 map.
+    """
+    years = data_years(df)
+    units = df[list(years.values())].apply(pd.to_numeric, errors="coerce").fillna(0)
+    units.columns = list(years)
+    pair = units.groupby([df["Molecule Combination"], df["Manufacturer"]]).sum().sort_index()
+    atc = df.groupby("Molecule Combination")[["ATC4", "ATC3"]].first()
+    return pair, atc
+
+
+def _year_fingerprints(pair):
+    """
+    Hash of each year's non-zero cells. Events for a year only depend on that year and
+    the ones before it, and pairs with no sales in a year don't change its fingerprint.
+    """
+    prints = {}
+    for year in pair.columns:
+        col = pair[year][pair[year] != 0]
+        prints[str(year)] = hashlib.sha1(pd.util.hash_pandas_object(col).values.tobytes()).hexdigest()[:12]
+    return prints
+
+
+# --- Detection ---
+def _empty_events():
+    events = pd.DataFrame({c: pd.Series(dtype=object) for c in EVENT_COLS})
+    return events.astype({
+        "Year": int, "First Sales Year": int, "Competitors Before": int, "Competitors": int,
+        "Share Before (%)": float, "Share (%)": float, "Share Change (pts)": float,
+    })
+
+
+def detect_events(pair, start=1):
+    """
+    Events for every year from column `start` on (the first year has nothing to compare to),
+    computed for all pairs at once:
+      Launch                   first sales of a combination
+      New Entrant              a manufacturer's first sales in a combination already on the market
+      Competitor Count Change  the number of manufacturers with sales changed (entries and exits)
+      Originator Share Drop    the originator (largest seller in the combination's first year)
+                               lost at least ORIGINATOR_DROP_PTS points of unit share
+    Shares are unit shares within the combination.
+    """
+    years = np.asarray(pair.columns, dtype=int)
+    n = len(years)
+    U = pair.to_numpy(dtype=float)
+    combo_codes, combo_names = pd.factorize(pair.index.get_level_values(0))
+    manufacturers = pair.index.get_level_values(1).to_numpy()
+    n_combos = len(combo_names)
+
+    totals = np.zeros((n_combos, n))
+    np.add.at(totals, combo_codes, U)
+    T = totals[combo_codes]
+    share = np.divide(U, T, out=np.zeros_like(U), where=T > 0) * 100
+
+    active = U > 0
+    counts = np.zeros((n_combos, n), dtype=int)
+    np.add.at(counts, combo_codes, active)
+    first = np.where(active.any(axis=1), active.argmax(axis=1), n)
+    combo_first = np.where(totals.any(axis=1), (totals > 0).argmax(axis=1), n)
+
+    # --- Originator: largest seller in the combination's first year of sales ---
+    at_launch = U[np.arange(len(U)), np.minimum(combo_first[combo_codes], n - 1)]
+    order = np.lexsort((-at_launch, combo_codes))
+    leads = order[np.r_[True, combo_codes[order][1:] != combo_codes[order][:-1]]] if len(order) else order
+    originator = np.full(n_combos, -1)
+    originator[combo_codes[leads]] = leads
+    originator[combo_first >= n] = -1
+
+    t_idx = np.arange(n)
+    in_scope = t_idx >= max(start, 1)
+    parts = []
+
+    def add(event, t, combo, pair_row, share_before, share_now):
+        by_pair = pair_row is not None
+        parts.append(pd.DataFrame({
+            "Year": years[t],
+            "Event": event,
+            "Molecule Combination": np.asarray(combo_names)[combo],
+            "Manufacturer": manufacturers[pair_row] if by_pair else "",
+            "First Sales Year": years[np.minimum(first[pair_row] if by_pair else combo_first[combo], n - 1)],
+            "Competitors Before": counts[combo, t - 1],
+            "Competitors": counts[combo, t],
+            "Share Before (%)": share_before,
+            "Share (%)": share_now,
+            "Share Change (pts)": share_now - share_before,
+        }))
+
+    # --- Entries (first sales of a pair) ---
+    rows, t = np.nonzero((first[:, None] == t_idx[None, :]) & in_scope[None, :])
+    combo = combo_codes[rows]
+    launch = combo_first[combo] == t
+    for event, mask in [("Launch", launch), ("New Entrant", ~launch)]:
+        add(event, t[mask], combo[mask], rows[mask], np.zeros(mask.sum()), share[rows[mask], t[mask]])
+
+    # --- Competitor count changes (launch years are covered by the Launch events) ---
+    changed = np.zeros((n_combos, n), dtype=bool)
+    changed[:, 1:] = counts[:, 1:] != counts[:, :-1]
+    combo, t = np.nonzero(changed & in_scope[None, :] & (combo_first[:, None] < t_idx[None, :]))
+    add("Competitor Count Change", t, combo, None, np.full(len(t), np.nan), np.full(len(t), np.nan))
+
+    # --- Originator share drops ---
+    has_orig = originator >= 0
+    orig_share = np.where(has_orig[:, None], share[np.maximum(originator, 0)], 0.0)
+    dropped = np.zeros((n_combos, n), dtype=bool)
+    dropped[:, 1:] = orig_share[:, :-1] - orig_share[:, 1:] >= ORIGINATOR_DROP_PTS
+    combo, t = np.nonzero(dropped & has_orig[:, None] & in_scope[None, :] & (combo_first[:, None] < t_idx[None, :]))
+    orig = originator[combo]
+    add("Originator Share Drop", t, combo, orig, share[orig, t - 1], share[orig, t])
+
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return _empty_events().drop(columns=["ATC4", "ATC3"])
+    return pd.concat(parts, ignore_index=True)
+
+
+# --- Persisted events ---
+def _load_manifest(store_dir):
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("detector_version") == DETECTOR_VERSION else {}
+
+
+def load_entry_events(store_dir=EVENTS_DIR):
+    """Stored event table (empty if none, or if it was built by another detector version)."""
+    if not _load_manifest(store_dir):
+        return _empty_events()
+    return pd.read_parquet(os.path.join(store_dir, EVENTS_FILE))
+
+
+def _save(events, fingerprints, stats, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, EVENTS_FILE)
+    events.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({
+            "detector_version": DETECTOR_VERSION,
+            "built": dt.datetime.now().isoformat(timespec="seconds"),
+            "fingerprints": fingerprints,
+            **stats,
+        }, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def build_entry_events(df, store_dir=EVENTS_DIR, full=False):
+    """
+    Market-wide event table, rebuilt incrementally.
+
+    Events for a year only depend on that year and the ones before it, so stored events
+    are kept up to the first year whose data changed (or is new, when a data period is
+    added) and only the years from there on are rescanned. `full=True` rescans every year.
+    Returns (events, stats).
+    """
+    pair, atc = pair_units(df)
+    fingerprints = _year_fingerprints(pair)
+    years = list(pair.columns)
+
+    stored_prints = {} if full else _load_manifest(store_dir).get("fingerprints", {})
+    changed = [i for i, y in enumerate(years) if stored_prints.get(str(y)) != fingerprints[str(y)]]
+    start = changed[0] if changed else len(years)
+
+    stored = _empty_events() if full or start == 0 else load_entry_events(store_dir)
+    kept = stored[stored["Year"].isin(years[:start])]
+    fresh = detect_events(pair, start=start) if start < len(years) else _empty_events()
+
+    parts = [part.drop(columns=["ATC4", "ATC3"], errors="ignore") for part in (kept, fresh) if len(part)]
+    events = pd.concat(parts, ignore_index=True) if parts else _empty_events().drop(columns=["ATC4", "ATC3"])
+    events["ATC4"] = events["Molecule Combination"].map(atc["ATC4"])
+    events["ATC3"] = events["Molecule Combination"].map(atc["ATC3"])
+    events = events[EVENT_COLS].astype(_empty_events().dtypes.to_dict())
+    events = events.sort_values(["Year", "Event", "Molecule Combination", "Manufacturer"], ascending=[False, True, True, True])
+    events = events.reset_index(drop=True)
+
+    stats = {
+        "years": [str(y) for y in years],
+        "rescanned_from": str(years[start]) if start < len(years) else None,
+        "events": len(events),
+        "reused": len(kept),
+        "detected": len(fresh),
+    }
+    _save(events, fingerprints, stats, store_dir)
+    return events, stats
+
+
+# --- Filtering ---
+def filter_events(events, event_types=None, years=None, atc3=None, search=None, min_drop=None):
+    """
+    Rows matching every given filter: event types, an inclusive (from, to) year range, an
+    ATC3 code, a case-insensitive search on combination / manufacturer, and a minimum share
+    drop (points) for Originator Share Drop events.
+    """
+    mask = np.ones(len(events), dtype=bool)
+    if event_types:
+        mask &= events["Event"].isin(event_types).to_numpy()
+    if years:
+        mask &= events["Year"].between(years[0], years[1]).to_numpy()
+    if atc3:
+        mask &= (events["ATC3"] == atc3).to_numpy()
+    if search:
+        text = events["Molecule Combination"].str.cat(events["Manufacturer"], sep=" ")
+        mask &= text.str.contains(search, case=False, regex=False, na=False).to_numpy()
+    if min_drop:
+        mask &= ((events["Event"] != "Originator Share Drop") | (-events["Share Change (pts)"] >= min_drop)).to_numpy()
+    return events[mask].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from tool_functions.DataLoad import load_master_data
+
+    parser = argparse.ArgumentParser(description="Scan every (combination, manufacturer) pair for entry events.")
+    parser.add_argument("--store", default=EVENTS_DIR)
+    parser.add_argument("--full", action="store_true", help="rescan every year instead of only new / changed ones")
+    args = parser.parse_args()
+
+    events, stats = build_entry_events(load_master_data(), store_dir=args.store, full=args.full)
+    print(json.dumps(stats, indent=2))
+    print(events.groupby(["Year", "Event"]).size().unstack(fill_value=0).to_string())
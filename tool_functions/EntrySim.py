@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Public price → CIF, same factor as the single-point prediction
+CIF_FACTOR = 0.4 / 1.4
+
+
+def simulate_entry_revenue(
+    base_sales,
+    base_growth,
+    capture=(4.0, 8.0, 12.0),
+    price_erosion=(10.0, 25.0, 40.0),
+    growth_sd=5.0,
+    launch_delay=(0, 2),
+    ramp_years=2,
+    horizon=5,
+    n_draws=5000,
+    start_year=2025,
+    seed=None,
+):
+    """
+    Monte Carlo entry-revenue scenarios, vectorized over draws and molecules.
+
+    base_sales / base_growth : 2024 market value (AED) and value CAGR (%), scalar or one per molecule
+    capture                  : (min, mode, max) market capture % at full uptake (triangular)
+    price_erosion            : (min, mode, max) % discount of our price vs. the market (triangular)
+    growth_sd                : std-dev (pts) of the yearly market growth around base_growth
+    launch_delay             : (min, max) whole years after start_year before we launch (uniform)
+    ramp_years               : years of linear uptake until full capture
+
+    Returns (years, revenue) with revenue shaped (n_molecules, n_draws, horizon) in CIF AED.
+    """
+    rng = np.random.default_rng(seed)
+    base_sales = np.atleast_1d(np.asarray(base_sales, dtype=float))
+    base_growth = np.broadcast_to(np.asarray(base_growth, dtype=float), base_sales.shape)
+    n_mol = len(base_sales)
+    shape = (n_mol, n_draws)
+
+    # --- Draws ---
+    capture_pct = rng.triangular(*capture, size=shape) / 100
+    erosion_pct = rng.triangular(*price_erosion, size=shape) / 100
+    delay = rng.integers(launch_delay[0], launch_delay[1] + 1, size=shape)
+    growth = rng.normal(base_growth[:, None, None], growth_sd, size=shape + (horizon,)) / 100
+
+    # --- Market path ---
+    market = base_sales[:, None, None] * np.cumprod(1 + np.maximum(growth, -0.99), axis=2)
+
+    # --- Uptake: 0 before launch, linear ramp to full capture ---
+    t = np.arange(horizon)[None, None, :]
+    years_live = t - delay[:, :, None] + 1
+    uptake = np.clip(years_live / max(ramp_years, 1), 0, 1)
+
+    revenue = market * CIF_FACTOR * capture_pct[:, :, None] * uptake * (1 - erosion_pct[:, :, None])
+    years = np.arange(start_year, start_year + horizon)
+    return years, revenue
+
+
+def summarize_revenue(years, revenue, percentiles=(10, 50, 90)):
+    """
+    Percentile table per year (plus cumulative) for a single molecule's draws (n_draws, horizon).
+    """
+    rows = np.percentile(revenue, percentiles, axis=0)
+    cum = np.percentile(revenue.sum(axis=1), percentiles)
+
+    table = pd.DataFrame(rows.T, columns=[f"P{p}" for p in percentiles])
+    table.insert(0, "Year", [str(y) for y in years])
+    table.loc[len(table)] = ["Cumulative"] + list(cum)
+    return table
+
+
+def plot_revenue_fan(years, revenue, title="Simulated Entry Revenue (CIF AED)"):
+    p10, p50, p90 = np.percentile(revenue, [10, 50, 90], axis=0)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=years, y=p90, mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"))
+    fig.add_trace(go.Scatter(
+        x=years, y=p10, mode="lines", line=dict(width=0), fill="tonexty",
+        fillcolor="rgba(31, 119, 180, 0.2)", name="P10–P90"
+    ))
+    fig.add_trace(go.Scatter(
+        x=years, y=p50, mode="lines+markers", name="Median",
+        hovertemplate="Year: %{x}<br>Median: AED %{y:,.0f}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Year",
+        yaxis_title="Revenue (AED)",
+        template="plotly_white",
+        height=450
+    )
+    return fig
+
+
+def simulate_entry_batch(metrics, **kwargs):
+    """
+    Runs the simulator for a shortlist in one vectorized call.
+    `metrics` needs "2024 Value (AED)" and "Value CAGR (%)" columns (e.g. compare_combinations output).
+    Returns a frame of P10 / P50 / P90 cumulative revenue per molecule.
+    """
+    years, revenue = simulate_entry_revenue(
+        metrics["2024 Value (AED)"].values,
+        metrics["Value CAGR (%)"].values,
+        **kwargs
+    )
+    cum = revenue.sum(axis=2)
+    p10, p50, p90 = np.percentile(cum, [10, 50, 90], axis=1)
+    return pd.DataFrame({
+        f"P10 {years[0]}–{years[-1]} (AED)": p10,
+        f"P50 {years[0]}–{years[-1]} (AED)": p50,
+        f"P90 {years[0]}–{years[-1]} (AED)": p90,
+    }, index=metrics.index)
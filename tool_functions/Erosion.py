@@ -2,71 +2,262 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 
-def plot_market_erosion(df, molecule):
-    df = df.copy()
-    df["Molecule"] = df["Molecule"].astype(str).str.strip().str.upper()
-    df["Molecule Combination"] = df.groupby("Product")["Molecule"].transform(
-        lambda x: " + ".join(sorted(x.unique()))
+from tool_functions.Columns import unstar_years
+from tool_functions.Normalize import combination_map, upper_strip
+
+UPTAKE_YEARS = [2020, 2021, 2022, 2023, 2024]
+EROSION_YEARS = (2021, 2024)
+EROSION_COLS = [f"{y} Units" for y in EROSION_YEARS]
+
+
+def originator_erosion(pair):
+    """
+    From units rows indexed by (..., combination, manufacturer), per group of every level but
+    the manufacturer: the top 2024 manufacturer's share in 2021 and 2024, the drop in points,
+    and whether the group counts towards an ATC4 benchmark (several manufacturers, no ≥99%
+    holder, sales in both years, a positive drop).
+    """
+    levels = list(range(pair.index.nlevels - 1))
+    first, last = pair[EROSION_COLS[0]], pair[EROSION_COLS[1]]
+    grouped = last.groupby(level=levels)
+    top = grouped.idxmax()
+    total_first = first.groupby(level=levels).sum().reindex(top.index)
+    total_last = grouped.sum().reindex(top.index)
+    top_first = first.loc[top.values].values
+    top_last = last.loc[top.values].values
+
+    out = pd.DataFrame(index=top.index)
+    out["originator_2021"] = np.where(total_first > 0, top_first / total_first.where(total_first > 0, 1), 0)
+    out["originator_2024"] = np.where(total_last > 0, top_last / total_last.where(total_last > 0, 1), 0)
+    out["drop"] = (out["originator_2021"] - out["originator_2024"]) * 100
+    top_last_share = np.where(total_last > 0, out["originator_2024"], 1)
+    out["benchmark"] = (
+        (grouped.size().reindex(top.index) > 1) & (top_last_share < 0.99)
+        & (total_first > 0) & (total_last > 0) & (out["drop"] > 0)
+    )
+    return out
+
+
+def atc4_erosion(erosion):
+    """Mean drop / originator shares over the benchmark rows of originator_erosion, per ATC4 (first level)."""
+    kept = erosion[erosion["benchmark"]]
+    return kept.groupby(level=0).agg(
+        average_atc4_erosion=("drop", "mean"),
+        avg_originator_2021=("originator_2021", "mean"),
+        avg_originator_2024=("originator_2024", "mean"),
+    )
+
+
+def build_uptake_library(df, years=UPTAKE_YEARS):
+    """
+    Uptake curves (share % by years since first sales) for every
+    (combination, manufacturer) pair, from one grouped pass.
+
+    Returns a dict:
+      index       one row per pair: combination, manufacturer, first year, ATC4, ATC3
+      curves      float32 array (n_pairs, n_years), NaN-padded after the last observed year
+      combo_rows  combination → (start, stop) row slice into index / curves
+      erosion     originator_erosion per combination
+      benchmarks  {"ATC4": frame, "ATC3": frame} of mean / median / count per years since entry,
+                  over entrants whose first sales fall inside the data window, and
+                  {"erosion": frame} of atc4_erosion
+    """
+    df = unstar_years(df)
+    unit_cols = [f"{y} Units" for y in years]
+    n = len(years)
+
+    units = df[unit_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    pair = units.groupby([df["Molecule Combination"], df["Manufacturer"]]).sum()
+    U = pair[unit_cols].values
+
+    # --- Shares within each combination ---
+    combo_codes, combo_names = pd.factorize(pair.index.get_level_values(0))
+    totals = np.zeros((len(combo_names), n))
+    np.add.at(totals, combo_codes, U)
+    T = totals[combo_codes]
+    share = np.divide(U, T, out=np.zeros_like(U, dtype=float), where=T > 0)
+
+    # --- Align by years since first sales ---
+    active = U > 0
+    has_sales = active.any(axis=1)
+    first = np.where(has_sales, active.argmax(axis=1), n)
+    idx = first[:, None] + np.arange(n)[None, :]
+    curves = np.where(
+        idx < n,
+        np.take_along_axis(share, np.minimum(idx, n - 1), axis=1),
+        np.nan
+    ).astype(np.float32) * 100
+
+    atc = df.groupby("Molecule Combination")[["ATC4", "ATC3"]].first().reindex(combo_names)
+    index = pd.DataFrame({
+        "Molecule Combination": pair.index.get_level_values(0),
+        "Manufacturer": pair.index.get_level_values(1),
+        "First Year": np.where(has_sales, np.asarray(years)[np.minimum(first, n - 1)], -1),
+        "ATC4": atc["ATC4"].values[combo_codes],
+        "ATC3": atc["ATC3"].values[combo_codes],
+    })
+
+    # pairs are sorted by combination, so each combination is one contiguous block
+    starts = np.searchsorted(combo_codes, np.arange(len(combo_names)), side="left")
+    stops = np.searchsorted(combo_codes, np.arange(len(combo_names)), side="right")
+    combo_rows = {name: (a, b) for name, a, b in zip(combo_names, starts, stops)}
+
+    # --- Class benchmarks (entrants observed entering, with ≥2 points) ---
+    entrant = has_sales & (first > 0) & (first < n - 1)
+    curve_df = pd.DataFrame(curves[entrant], columns=range(n))
+    benchmarks = {}
+    for level in ["ATC4", "ATC3"]:
+        grouped = curve_df.groupby(index.loc[entrant, level].values)
+        benchmarks[level] = pd.concat(
+            {"mean": grouped.mean(), "median": grouped.median(), "count": grouped.count()},
+            axis=1
+        )
+
+    # --- Originator erosion per combination; per ATC4 over each combination's rows in that class ---
+    erosion = originator_erosion(pair)
+    by_atc4 = units[EROSION_COLS].groupby([df["ATC4"], df["Molecule Combination"], df["Manufacturer"]]).sum()
+    benchmarks["erosion"] = atc4_erosion(originator_erosion(by_atc4))
+
+    return {
+        "years": list(years),
+        "index": index,
+        "curves": curves,
+        "combo_rows": combo_rows,
+        "erosion": erosion,
+        "benchmarks": benchmarks,
+    }
+
+
+def get_uptake_curves(library, molecule):
+    """
+    Long frame (Manufacturer, Years Since Entry, Market Share) for one combination,
+    for manufacturers that entered before the last data year.
+    """
+    rows = library["combo_rows"].get(molecule.strip().upper())
+    if rows is None:
+        return pd.DataFrame(columns=["Manufacturer", "Years Since Entry", "Market Share"])
+
+    last_year = library["years"][-1]
+    index = library["index"].iloc[rows[0]:rows[1]]
+    curves = library["curves"][rows[0]:rows[1]]
+    keep = ((index["First Year"] >= 0) & (index["First Year"] < last_year)).values
+
+    curves = curves[keep]
+    r, c = np.nonzero(~np.isnan(curves))
+    return pd.DataFrame({
+        "Manufacturer": index.loc[keep, "Manufacturer"].values[r],
+        "Years Since Entry": c,
+        "Market Share": curves[r, c].astype(float),
+    })
+
+
+def get_uptake_benchmark(library, code, level="ATC4"):
+    """
+    Mean / median / count of entrant share by years since entry for an ATC4 or ATC3 code.
+    """
+    bench = library["benchmarks"].get(level)
+    if bench is None or code not in bench.index:
+        return None
+    row = bench.loc[code]
+    out = pd.DataFrame({stat: row[stat] for stat in ["mean", "median", "count"]})
+    out.index.name = "Years Since Entry"
+    return out[out["count"] > 0].reset_index()
+
+
+def get_erosion_benchmark(library, code):
+    """ATC4 erosion averages (erosion_stats keys) for a code; zeros when no combination qualifies."""
+    bench = library["benchmarks"]["erosion"]
+    if code not in bench.index:
+        return {col: 0 for col in bench.columns}
+    return bench.loc[code].to_dict()
+
+
+def plot_market_erosion(df, molecule, library=None):
+    """
+    Uptake chart and originator erosion stats for one combination. With `library`
+    (build_uptake_library) both are read from it and `df` is not used.
+    """
+    if library is not None:
+        key = molecule.strip().upper()
+        if key not in library["erosion"].index:
+            return None, None
+        atc4_code = library["index"]["ATC4"].iloc[library["combo_rows"][key][0]]
+        originator = library["erosion"].loc[key]
+        atc4_stats = get_erosion_benchmark(library, atc4_code)
+        capture_df = get_uptake_curves(library, molecule)
+    else:
+        result = _erosion_from_frame(df, molecule)
+        if result is None:
+            return None, None
+        atc4_code, originator, atc4_stats, capture_df = result
+
+    fig = go.Figure()
+    for manu in capture_df["Manufacturer"].unique():
+        sub_df = capture_df[capture_df["Manufacturer"] == manu]
+        fig.add_trace(go.Scatter(
+            x=sub_df["Years Since Entry"],
+            y=sub_df["Market Share"],
+            mode="lines+markers",
+            name=manu,
+            hovertemplate="Manufacturer: %{text}<br>Year Since Entry: %{x}<br>Market Share: %{y:.2f}%<extra></extra>",
+            text=[manu]*len(sub_df)
+        ))
+
+    # --- ATC4 entrant benchmark (precomputed) ---
+    if library is not None:
+        bench = get_uptake_benchmark(library, atc4_code, level="ATC4")
+        if bench is not None and not bench.empty:
+            fig.add_trace(go.Scatter(
+                x=bench["Years Since Entry"],
+                y=bench["median"],
+                mode="lines",
+                name=f"ATC4 {atc4_code} median entrant",
+                line=dict(dash="dash", color="black"),
+                hovertemplate="ATC4 median entrant<br>Year Since Entry: %{x}<br>Market Share: %{y:.2f}%<extra></extra>"
+            ))
+
+    fig.update_layout(
+        title=f"Market Share Growth After Entry – {molecule.upper()}",
+        xaxis_title="Years Since Entry",
+        yaxis_title="Market Share (%)",
+        height=600,
+        template="plotly_white"
     )
 
+    erosion_stats = {
+        "originator_2021": originator["originator_2021"],
+        "originator_2024": originator["originator_2024"],
+        "drop": originator["drop"],
+        **atc4_stats,
+        "atc4_code": atc4_code
+    }
+
+    return fig, erosion_stats
+
+
+def _erosion_from_frame(df, molecule):
+    """plot_market_erosion inputs straight from the master rows, without a library."""
+    df = df.copy()
+    df["Molecule"] = upper_strip(df["Molecule"])
+    df["Molecule Combination"] = df["Product"].map(combination_map(df["Product"], df["Molecule"]))
+
     for col in df.columns:
         if "Units" in col:
             df[col] = pd.to_numeric(df[col].astype(str).str.replace(",", ""), errors="coerce").fillna(0)
 
     mol_df = df[df["Molecule Combination"].str.upper() == molecule.upper()].copy()
     if mol_df.empty:
-        return None, None
+        return None
 
     atc4_code = mol_df["ATC4"].dropna().unique()[0]
-    atc4_df = df[df["ATC4"] == atc4_code].copy()
+    atc4_df = df[df["ATC4"] == atc4_code]
+
+    originator = originator_erosion(mol_df.groupby(["Molecule Combination", "Manufacturer"])[EROSION_COLS].sum()).iloc[0]
+    atc4_stats = atc4_erosion(originator_erosion(atc4_df.groupby(["ATC4", "Molecule Combination", "Manufacturer"])[EROSION_COLS].sum()))
+    atc4_stats = atc4_stats.iloc[0].to_dict() if len(atc4_stats) else {col: 0 for col in atc4_stats.columns}
 
     years = [2020, 2021, 2022, 2023, 2024]
     total_units_by_year = {y: mol_df[f"{y} Units"].sum() for y in years}
-
-    manufacturer_totals = mol_df.groupby("Manufacturer")[["2021 Units", "2024 Units"]].sum()
-    top_manufacturer = manufacturer_totals["2024 Units"].idxmax()
-    top_2021 = manufacturer_totals.loc[top_manufacturer, "2021 Units"]
-    top_2024 = manufacturer_totals.loc[top_manufacturer, "2024 Units"]
-    total_2021 = mol_df["2021 Units"].sum()
-    total_2024 = mol_df["2024 Units"].sum()
-    originator_share_2021 = top_2021 / total_2021 if total_2021 > 0 else 0
-    originator_share_2024 = top_2024 / total_2024 if total_2024 > 0 else 0
-    erosion_percent = (originator_share_2021 - originator_share_2024) * 100
-
-    erosion_drops = []
-    avg_21_shares = []
-    avg_24_shares = []
-
-    for combo in atc4_df["Molecule Combination"].dropna().unique():
-        temp_df = atc4_df[atc4_df["Molecule Combination"] == combo]
-        manufacturers = temp_df["Manufacturer"].nunique()
-        total_2024 = temp_df["2024 Units"].sum()
-        top_2024_share = (
-            temp_df.groupby("Manufacturer")["2024 Units"].sum().max() / total_2024
-            if total_2024 > 0 else 1
-        )
-        if manufacturers <= 1 or top_2024_share >= 0.99:
-            continue
-
-        mfg_totals = temp_df.groupby("Manufacturer")[["2021 Units", "2024 Units"]].sum()
-        top_manuf = mfg_totals["2024 Units"].idxmax()
-        top_21 = mfg_totals.loc[top_manuf, "2021 Units"]
-        top_24 = mfg_totals.loc[top_manuf, "2024 Units"]
-        total_21 = temp_df["2021 Units"].sum()
-        total_24 = temp_df["2024 Units"].sum()
-        if total_21 > 0 and total_24 > 0:
-            share_2021 = top_21 / total_21
-            share_2024 = top_24 / total_24
-            drop_pct = (share_2021 - share_2024) * 100
-            if drop_pct > 0:
-                erosion_drops.append(drop_pct)
-                avg_21_shares.append(share_2021)
-                avg_24_shares.append(share_2024)
-
-    average_atc4_erosion = np.mean(erosion_drops) if erosion_drops else 0
-    avg_originator_2021 = np.mean(avg_21_shares) if avg_21_shares else 0
-    avg_originator_2024 = np.mean(avg_24_shares) if avg_24_shares else 0
-
     capture_data = []
     for manufacturer in mol_df["Manufacturer"].unique():
         man_df = mol_df[mol_df["Manufacturer"] == manufacturer]
@@ -89,35 +280,4 @@ def plot_market_erosion(df, molecule):
                     "Market Share": sh * 100
                 })
 
-    capture_df = pd.DataFrame(capture_data)
-    fig = go.Figure()
-    for manu in capture_df["Manufacturer"].unique():
-        sub_df = capture_df[capture_df["Manufacturer"] == manu]
-        fig.add_trace(go.Scatter(
-            x=sub_df["Years Since Entry"],
-            y=sub_df["Market Share"],
-            mode="lines+markers",
-            name=manu,
-            hovertemplate="Manufacturer: %{text}<br>Year Since Entry: %{x}<br>Market Share: %{y:.2f}%<extra></extra>",
-            text=[manu]*len(sub_df)
-        ))
-
-    fig.update_layout(
-        title=f"Market Share Growth After Entry – {molecule.upper()}",
-        xaxis_title="Years Since Entry",
-        yaxis_title="Market Share (%)",
-        height=600,
-        template="plotly_white"
-    )
-
-    erosion_stats = {
-        "originator_2021": originator_share_2021,
-        "originator_2024": originator_share_2024,
-        "drop": erosion_percent,
-        "average_atc4_erosion": average_atc4_erosion,
-        "avg_originator_2021": avg_originator_2021,
-        "avg_originator_2024": avg_originator_2024,
-        "atc4_code": atc4_code
-    }
-
-    return fig, erosion_stats
\ No newline at end of file
+    return atc4_code, originator, atc4_stats, pd.DataFrame(capture_data)
\ No newline at end of file
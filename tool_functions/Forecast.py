@@ -0,0 +1,139 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from tool_functions.Columns import unstar_years
+
+YEARS = [2020, 2021, 2022, 2023, 2024]
+LEVELS = ["Molecule Combination", "ATC4", "ATC3"]
+
+
+def fit_log_linear(Y, years=YEARS, horizon=5, damping=0.9, interval=0.8):
+    """
+    Fits log(y) = a + b·t to every row of Y at once (zero years are ignored) and
+    projects `horizon` years ahead with a damped slope.
+    Returns (point, lower, upper), each shaped (n_series, horizon). Series with fewer
+    than 3 positive years have no residual spread to estimate, so their bounds are NaN.
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = np.asarray(years, dtype=float) - years[-1]  # last actual year sits at t = 0
+
+    # --- Weighted least squares per row (weight 0 for non-positive years) ---
+    w = (Y > 0).astype(float)
+    L = np.log(np.where(Y > 0, Y, 1.0))
+    n = w.sum(axis=1)
+    n_safe = np.maximum(n, 1)
+
+    x_mean = (w * x).sum(axis=1) / n_safe
+    l_mean = (w * L).sum(axis=1) / n_safe
+    dx = x[None, :] - x_mean[:, None]
+    sxx = (w * dx ** 2).sum(axis=1)
+    sxy = (w * dx * (L - l_mean[:, None])).sum(axis=1)
+
+    has_slope = sxx > 0
+    slope = np.where(has_slope, sxy / np.where(has_slope, sxx, 1), 0.0)
+    intercept = l_mean - slope * x_mean
+
+    resid = w * (L - (intercept[:, None] + slope[:, None] * x[None, :]))
+    dof = n - 2
+    sigma = np.sqrt(np.where(dof > 0, (resid ** 2).sum(axis=1) / np.where(dof > 0, dof, 1), 0.0))
+
+    # --- Damped projection + prediction intervals ---
+    h = np.arange(1, horizon + 1, dtype=float)
+    damped_steps = np.cumsum(damping ** h)
+    log_fc = intercept[:, None] + slope[:, None] * damped_steps[None, :]
+
+    # leverage at the damped position the point forecast is read from, not at t = h
+    leverage = np.where(
+        has_slope[:, None],
+        (damped_steps[None, :] - x_mean[:, None]) ** 2 / np.where(has_slope, sxx, 1)[:, None],
+        0.0
+    )
+    se = sigma[:, None] * np.sqrt(1 + 1 / n_safe[:, None] + leverage)
+    z = NormalDist().inv_cdf(0.5 + interval / 2)
+
+    point = np.exp(log_fc)
+    lower = np.exp(log_fc - z * se)
+    upper = np.exp(log_fc + z * se)
+
+    # Too little history to fit a trend → carry the last year flat
+    flat = n < 2
+    point[flat] = Y[flat, -1:]
+    # Two points fit exactly (sigma = 0): no interval rather than a zero-width one
+    no_spread = dof < 1
+    lower[no_spread] = upper[no_spread] = np.nan
+
+    # No sales in the last year → treat as exited
+    exited = Y[:, -1] <= 0
+    point[exited] = lower[exited] = upper[exited] = 0.0
+
+    return point, lower, upper
+
+
+def build_series(df, years=YEARS):
+    """
+    Yearly Units / LC Value per combination, ATC4 and ATC3, stacked into one frame.
+    Combination totals are split by molecule count, like the exec summary.
+    """
+    df = unstar_years(df)
+    unit_cols = [f"{y} Units" for y in years]
+    value_cols = [f"{y} LC Value" for y in years]
+
+    num = df[unit_cols + value_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    n_mols = df["Molecule Combination"].str.count(r" \+ ") + 1
+
+    frames = []
+    for level in LEVELS:
+        vals = num.div(n_mols, axis=0) if level == "Molecule Combination" else num
+        grouped = vals.groupby(df[level]).sum()
+        for metric, cols in [("Units", unit_cols), ("Value", value_cols)]:
+            block = grouped[cols].copy()
+            block.columns = years
+            block.index = pd.MultiIndex.from_arrays(
+                [[level] * len(block), block.index, [metric] * len(block)],
+                names=["Level", "Key", "Metric"]
+            )
+            frames.append(block)
+
+    return pd.concat(frames)
+
+
+def batch_forecast(df, years=YEARS, horizon=5, damping=0.9, interval=0.8):
+    """
+    Forecasts every combination, ATC4 and ATC3 series in one vectorized fit.
+    Returns a long frame indexed by (Level, Key, Metric) with Year / Forecast / Lower / Upper.
+    """
+    series = build_series(df, years)
+    point, lower, upper = fit_log_linear(series.values, years, horizon, damping, interval)
+
+    fc_years = np.arange(years[-1] + 1, years[-1] + 1 + horizon)
+    n = len(series)
+    out = pd.DataFrame({
+        "Year": np.tile(fc_years, n),
+        "Forecast": point.ravel(),
+        "Lower": lower.ravel(),
+        "Upper": upper.ravel(),
+    }, index=series.index.repeat(horizon))
+
+    return out.sort_index()
+
+
+def get_forecast(forecasts, key, level="Molecule Combination"):
+    """
+    Per-year table for one series: Year, Units/Value forecasts with their intervals.
+    """
+    try:
+        sub = forecasts.loc[(level, key)]
+    except KeyError:
+        return None
+
+    table = None
+    for metric in ["Units", "Value"]:
+        if metric not in sub.index:
+            continue
+        part = sub.loc[metric].set_index("Year")
+        part.columns = [f"{metric} {c}" for c in part.columns]
+        table = part if table is None else table.join(part)
+
+    return table.reset_index() if table is not None else None
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from tool_functions.Columns import METRIC_COLS, UNIT_COLS, VALUE_COLS, YEARS, unstar_years
+
+MARKETS = ["PRIVATE MARKET", "LPO"]
+TOTAL = "TOTAL"
+KEYS = ["Molecule Combination", "Manufacturer", "Product", "Strength"]
+ROW_COUNT = "Rows"
+
+
+def build_market_pivot(df):
+    """
+    Yearly units / values per (combination, manufacturer, product, strength) with Market
+    pivoted into the columns: (PRIVATE MARKET | LPO | TOTAL, metric), built in one grouped
+    pass. TOTAL is every market summed (the unfiltered view). Units / values are split by
+    molecule count, as in the breakdown chart. The extra "Rows" metric counts the master rows
+    behind each cell, so a key listed in a market with zero sales stays apart from one that
+    is not listed there at all.
+    """
+    df = unstar_years(df)
+    num = df[METRIC_COLS].apply(
+        lambda c: pd.to_numeric(c.astype(str).str.replace(",", "").str.strip(), errors="coerce")
+    ).fillna(0)
+    num = num.div(df["Molecule Combination"].str.count(r" \+ ") + 1, axis=0)
+    num[ROW_COUNT] = 1
+    num[KEYS + ["Market"]] = df[KEYS + ["Market"]]
+
+    by_market = num.groupby(KEYS + ["Market"], dropna=False)[METRIC_COLS + [ROW_COUNT]].sum()
+    total = by_market.groupby(level=KEYS, dropna=False).sum()
+
+    wide = by_market.unstack("Market", fill_value=0)
+    parts = {m: wide.xs(m, axis=1, level="Market") if m in wide.columns.get_level_values("Market") else total * 0 for m in MARKETS}
+    parts[TOTAL] = total
+    pivot = pd.concat(parts, axis=1, names=["Market", "Metric"]).reindex(total.index).fillna(0)
+    return pivot.sort_index()
+
+
+def _market_key(market):
+    """Accepts the UI labels ("TOTAL (PRIVATE + LPO)") as well as the stored ones."""
+    return TOTAL if market is None or str(market).startswith(TOTAL) else market
+
+
+def molecule_markets(pivot, molecule):
+    """The combination's rows with every market side by side (empty frame if unknown)."""
+    try:
+        return pivot.loc[molecule.strip().upper()]
+    except KeyError:
+        return pivot.iloc[:0].droplevel(0)
+
+
+def market_slice(pivot, molecule, market=TOTAL):
+    """
+    Flat rows (Manufacturer, Product, Strength + metric columns) for one combination in one
+    market: every key listed in that market, including those with zero sales, the same rows
+    filtering the master data by combination and market gives.
+    """
+    rows = molecule_markets(pivot, molecule)[_market_key(market)]
+    rows = rows[rows[ROW_COUNT] > 0].drop(columns=ROW_COUNT)
+    return rows.reset_index()
+
+
+def market_totals(pivot, molecule):
+    """One row per market (PRIVATE MARKET, LPO, TOTAL), metric columns summed over the combination."""
+    sums = molecule_markets(pivot, molecule).sum()
+    return sums.unstack("Metric").reindex(index=MARKETS + [TOTAL], columns=METRIC_COLS).fillna(0)
+
+
+def market_split_table(pivot, molecule, group_by_column="Manufacturer", use_value=False, year="2024"):
+    """Private / LPO / Total for one year side by side per group, largest total first."""
+    metric = f"{year} LC Value" if use_value else f"{year} Units"
+    rows = molecule_markets(pivot, molecule).xs(metric, axis=1, level="Metric")
+    table = rows.groupby(level=group_by_column).sum()[MARKETS + [TOTAL]]
+    table = table[table[TOTAL] > 0].sort_values(TOTAL, ascending=False)
+    table["LPO Share (%)"] = (table["LPO"] / table[TOTAL] * 100).round(1)
+    return table
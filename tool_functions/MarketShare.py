@@ -1,16 +1,21 @@
 import pandas as pd
 import plotly.graph_objects as go
 
-def plot_manufacturer_market_share(df, selected_molecule, market_type="PRIVATE MARKET"):
-    df = df.copy()
-    df.columns = df.columns.str.replace("\n", " ", regex=False).str.strip()
-    df["Molecule Combination"] = df["Molecule Combination"].astype(str).str.upper().str.strip()
-    selected_molecule = selected_molecule.strip().upper()
+from tool_functions.MarketPivot import market_slice
 
-    mask = df["Molecule Combination"] == selected_molecule
-    mol_df = df[mask]
-    if market_type != "TOTAL":
-        mol_df = mol_df[mol_df["Market"] == market_type]
+def plot_manufacturer_market_share(df, selected_molecule, market_type="PRIVATE MARKET", market_pivot=None):
+    selected_molecule = selected_molecule.strip().upper()
+    if market_pivot is not None:
+        mol_df = market_slice(market_pivot, selected_molecule, market_type)
+    else:
+        df = df.copy()
+        df.columns = df.columns.str.replace("\n", " ", regex=False).str.strip()
+        df["Molecule Combination"] = df["Molecule Combination"].astype(str).str.upper().str.strip()
+
+        mask = df["Molecule Combination"] == selected_molecule
+        mol_df = df[mask]
+        if market_type != "TOTAL":
+            mol_df = mol_df[mol_df["Market"] == market_type]
 
     if mol_df.empty:
         return None
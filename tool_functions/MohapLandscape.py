@@ -1,23 +1,17 @@
 import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
-import re
+from tool_functions.Normalize import clean_ingredient_string, normalize_mohap
+from tool_functions.PackParse import add_mohap_unit_prices
+from tool_functions.PriceHistory import price_trend
 
-def clean_ingredient_string(text):
-    text = re.sub(r"\(.*?\)", "", str(text))  # Remove content in parentheses
-    text = text.replace(",", "").strip().upper()
-    return text
-
-def format_registered_products_by_company(molecule_name: str, mohap_df: pd.DataFrame):
+def format_registered_products_by_company(molecule_name: str, mohap_df: pd.DataFrame, price_history=None):
     molecule_name_clean = clean_ingredient_string(molecule_name)
 
     # --- Clean and normalize relevant columns ---
-    mohap_df["Ingredient"] = mohap_df["Ingredient"].astype(str)
-    mohap_df["Ingredient_clean"] = mohap_df["Ingredient"].apply(clean_ingredient_string)
-    mohap_df["Trade Name"] = mohap_df["Trade Name"].astype(str).str.strip()
-    mohap_df["Form"] = mohap_df["Form"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
-    mohap_df["Strength"] = mohap_df["Strength"].astype(str).str.strip()
-    mohap_df["Company"] = mohap_df["Company"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
-    mohap_df["Agent"] = mohap_df["Agent"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    normalize_mohap(mohap_df)
+    if "Public Price per Unit (AED)" not in mohap_df.columns:
+        add_mohap_unit_prices(mohap_df)
 
     # --- Match logic ---
     matched = mohap_df[mohap_df["Ingredient_clean"].str.contains(molecule_name_clean, na=False)]
@@ -42,7 +36,7 @@ def format_registered_products_by_company(molecule_name: str, mohap_df: pd.DataF
     # --- Clean subset ---
     subset = matched[[
         "Trade Name", "Strength", "Form", "Company",
-        "Source", "Agent", "Public Price (AED)", "Ingredient"
+        "Source", "Agent", "Public Price (AED)", "Ingredient", "Pack Size", "Public Price per Unit (AED)"
     ]].fillna("Unknown").drop_duplicates()
 
     st.markdown(f"📦 **Registered MOHAP Products for:** `{molecule_name}`")
@@ -50,9 +44,23 @@ def format_registered_products_by_company(molecule_name: str, mohap_df: pd.DataF
         st.markdown(f"\n#### 🏭 Company: `{company}`")
         for _, row in group.iterrows():
             st.markdown(
-                f"- **{row['Trade Name']}** — {row['Strength']} {row['Form']} — 💰 AED {row['Public Price (AED)']} — 🧾 Agent: {row['Agent']} — 🧪 Ingredient: {row['Ingredient']}"
+                f"- **{row['Trade Name']}** — {row['Strength']} {row['Form']} — 💰 AED {row['Public Price (AED)']}{_per_unit(row)} — 🧾 Agent: {row['Agent']} — 🧪 Ingredient: {row['Ingredient']}"
             )
 
+    # --- Unit-price benchmark: packs of different sizes made comparable ---
+    benchmark = matched.groupby("Company").agg(**{
+        "Packs": ("Public Price (AED)", "size"),
+        "Median AED / Unit": ("Public Price per Unit (AED)", "median"),
+        "Median AED / mg": ("Public Price per mg (AED)", "median"),
+    }).sort_values("Median AED / Unit")
+    if benchmark["Median AED / Unit"].notna().any():
+        st.markdown("⚖️ **Unit-Price Benchmark by Company:**")
+        st.dataframe(benchmark.style.format({"Median AED / Unit": "{:,.2f}", "Median AED / mg": "{:,.4f}"}, na_rep="–"))
+
+    # --- Price trends across recorded MOHAP releases ---
+    if price_history is not None and len(price_history["versions"]):
+        show_price_trends(matched, price_history)
+
     # --- CIF Price Prediction ---
     st.markdown("---")
     st.markdown("💰 **Predicted CIF Pricing Based on Originator Packs:**")
@@ -65,11 +73,57 @@ def format_registered_products_by_company(molecule_name: str, mohap_df: pd.DataF
             try:
                 public_price = float(row["Public Price (AED)"])
                 cif_price = round((public_price / 1.4) * 0.4, 2)
+                per_unit = row["Public Price per Unit (AED)"]
+                cif_unit = f" (AED {per_unit / 1.4 * 0.4:,.2f} / unit)" if isinstance(per_unit, float) else ""
                 st.markdown(
-                    f"- 🧪 **{row['Trade Name']}** — {row['Strength']} {row['Form']} → Predicted CIF: **AED {cif_price}** (from AED {public_price})"
+                    f"- 🧪 **{row['Trade Name']}** — {row['Strength']} {row['Form']} → Predicted CIF: **AED {cif_price}**{cif_unit} (from AED {public_price})"
                 )
             except:
                 continue
 
     st.markdown("---")
-    st.markdown(f"📊 **Summary:** {subset['Trade Name'].nunique()} unique products across {subset['Company'].nunique()} manufacturers.")
\ No newline at end of file
+    st.markdown(f"📊 **Summary:** {subset['Trade Name'].nunique()} unique products across {subset['Company'].nunique()} manufacturers.")
+
+
+def _per_unit(row):
+    price = row["Public Price per Unit (AED)"]
+    return f" ({row['Pack Size']}, AED {price:,.2f} / unit)" if isinstance(price, float) else ""
+
+
+def show_price_trends(matched: pd.DataFrame, price_history):
+    versions = price_history["versions"]
+    first_date = versions["Date"].min().date()
+    trend = price_trend(price_history, matched)
+
+    # Packs with more than one recorded public price
+    n_points = trend.groupby(["Trade Name", "Form", "Strength", "Pack Size", "Company"])["Public Price (AED)"].transform("nunique")
+    moved = trend[n_points > 1]
+
+    st.markdown("---")
+    st.markdown(f"📈 **MOHAP Price Changes** ({len(versions)} price list(s) recorded since {first_date}):")
+    if moved.empty:
+        st.markdown("- No public price changes recorded for these products.")
+        return
+
+    moved = moved.assign(Pack=moved["Trade Name"] + " — " + moved["Strength"] + " " + moved["Form"] + " (" + moved["Pack Size"] + ")")
+    for pack, group in moved.groupby("Pack", sort=False):
+        steps = " → ".join(
+            f"AED {price:,.2f} ({date:%Y-%m-%d})" if change != "REMOVED" else f"delisted ({date:%Y-%m-%d})"
+            for price, date, change in zip(group["Public Price (AED)"], group["Date"], group["Change"])
+        )
+        st.markdown(f"- **{pack}** — {steps}")
+
+    fig = go.Figure()
+    for pack, group in moved[moved["Change"] != "REMOVED"].groupby("Pack", sort=False):
+        fig.add_trace(go.Scatter(
+            x=group["Date"], y=group["Public Price (AED)"], mode="lines+markers", name=pack,
+            line_shape="hv", hovertemplate="%{x|%Y-%m-%d}<br>AED %{y:,.2f}<extra></extra>"
+        ))
+    fig.update_layout(
+        title="Public Price by Release",
+        xaxis_title="Release Date",
+        yaxis_title="Public Price (AED)",
+        template="plotly_white",
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True)
@@ -1,20 +1,39 @@
 import pandas as pd
 import plotly.graph_objects as go
 
+from tool_functions.Columns import UNIT_COLS, VALUE_COLS, YEARS, unstar_years
+from tool_functions.MarketPivot import market_slice
+
+
 def plot_combination_market_breakdown_plotly(
     df,
     selected_molecule,
     use_market_filter=True,
     market_type="PRIVATE MARKET",
     use_value=False,
-    group_by_column="Manufacturer"
+    group_by_column="Manufacturer",
+    market_pivot=None
 ):
+    """Pass `market_pivot` (build_market_pivot) to read the market rows instead of filtering df."""
     selected_molecule = selected_molecule.strip().upper()
+    market_label = market_type if use_market_filter else "TOTAL"
+
+    if market_pivot is not None:
+        mol_df = market_slice(market_pivot, selected_molecule, market_label)
+    else:
+        mol_df = _filter_molecule_market(df, selected_molecule, use_market_filter, market_type)
+
+    if group_by_column not in mol_df.columns:
+        return None, None
+    return _build_breakdown(mol_df, selected_molecule, market_label, use_value, group_by_column)
+
+
+def _filter_molecule_market(df, selected_molecule, use_market_filter, market_type):
     df = df.copy()
 
     # --- Clean & numericize ---
     df.columns = df.columns.str.replace("\n", " ", regex=False).str.strip()
-    df = df.rename(columns={"2020* Units": "2020 Units", "2020* LC Value": "2020 LC Value"})
+    df = unstar_years(df)
     for col in df.columns:
         if "Value" in col or "Units" in col:
             df[col] = pd.to_numeric(
@@ -28,10 +47,6 @@ def plot_combination_market_breakdown_plotly(
         if "Units" in col or "Value" in col:
             df[col] = df[col] / df["Molecule Count"]
 
-    years = ["2020", "2021", "2022", "2023", "2024"]
-    col_units = [f"{y} Units" for y in years]
-    col_value = [f"{y} LC Value" for y in years]
-
     # --- Filter molecule & market ---
     mask = df["Molecule Combination"].str.upper() == selected_molecule
     molecule_df_all = df[mask]
@@ -39,9 +54,11 @@ def plot_combination_market_breakdown_plotly(
         mol_df = molecule_df_all[molecule_df_all["Market"] == market_type]
     else:
         mol_df = molecule_df_all.copy()
+    return mol_df
 
-    if group_by_column not in mol_df.columns:
-        return None, None
+
+def _build_breakdown(mol_df, selected_molecule, market_label, use_value, group_by_column):
+    years, col_units, col_value = YEARS, UNIT_COLS, VALUE_COLS
 
     # --- Build product lookup per group ---
     product_map = (
@@ -93,7 +110,7 @@ def plot_combination_market_breakdown_plotly(
 
     fig.update_layout(
         barmode='stack',
-        title=f"{selected_molecule} — {market_type if use_market_filter else 'TOTAL'} by {group_by_column}",
+        title=f"{selected_molecule} — {market_label} by {group_by_column}",
         xaxis_title="Year",
         yaxis_title="Value (AED)" if use_value else "Units Sold",
         legend_title=group_by_column,
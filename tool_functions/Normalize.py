@@ -0,0 +1,106 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# --- Scalar versions (kept for one-off strings such as a selected molecule) ---
+def clean_combo(x):
+    if pd.isna(x):
+        return ""
+    return re.sub(r"\s+", " ", str(x).strip().upper())
+
+
+def clean_ingredient_string(text):
+    text = re.sub(r"\(.*?\)", "", str(text))  # Remove content in parentheses
+    text = text.replace(",", "").strip().upper()
+    return text
+
+
+# --- Vectorized versions ---
+def map_unique(series: pd.Series, fn) -> pd.Series:
+    """
+    Runs `fn` (Series → Series) over the distinct values only and broadcasts the
+    result back. Master Data / MOHAP string columns have a few thousand distinct
+    values across tens of thousands of rows, so this does most of the work once.
+    NaN is passed through to `fn` as its own distinct value.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    cleaned = fn(pd.Series(uniques, dtype=object)).reset_index(drop=True)
+    out = cleaned.take(codes)
+    out.index = series.index
+    return out
+
+
+def upper_strip(series: pd.Series) -> pd.Series:
+    """astype(str).str.strip().str.upper(), once per distinct value."""
+    return map_unique(series, lambda s: s.astype(str).str.strip().str.upper())
+
+
+def collapse_spaces(series: pd.Series) -> pd.Series:
+    """astype(str) with runs of whitespace collapsed and ends stripped (company / agent / form)."""
+    return map_unique(series, lambda s: s.astype(str).str.replace(r"\s+", " ", regex=True).str.strip())
+
+
+def clean_combo_series(series: pd.Series) -> pd.Series:
+    """Vectorized clean_combo: NaN → "", upper-case, single spaces."""
+    return map_unique(
+        series,
+        lambda s: s.astype(str).str.strip().str.upper().str.replace(r"\s+", " ", regex=True).where(s.notna(), "")
+    )
+
+
+def clean_ingredient_series(series: pd.Series) -> pd.Series:
+    """Vectorized clean_ingredient_string."""
+    return map_unique(
+        series,
+        lambda s: s.map(str)
+        .str.replace(r"\(.*?\)", "", regex=True)
+        .str.replace(",", "", regex=False)
+        .str.strip()
+        .str.upper()
+    )
+
+
+def combination_map(products: pd.Series, molecules: pd.Series) -> pd.Series:
+    """
+    Product → "MOL A + MOL B" (sorted, de-duplicated), built from the distinct
+    (product, molecule) pairs instead of every row.
+    """
+    pairs = pd.DataFrame({"Product": products.values, "Molecule": molecules.values}).drop_duplicates()
+    pairs = pairs.dropna().sort_values(["Product", "Molecule"])
+
+    mapping = {}
+    for product, molecule in zip(pairs["Product"].tolist(), pairs["Molecule"].tolist()):
+        mapping.setdefault(product, []).append(molecule)
+    return {product: " + ".join(mols) for product, mols in mapping.items()}
+
+
+def combination_type(combos: pd.Series) -> pd.Series:
+    return pd.Series(
+        np.where(combos.str.contains(" + ", regex=False), "COMBINATION", "MONO"),
+        index=combos.index
+    )
+
+
+def normalize_mohap(mohap_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    In-place clean-up of the MOHAP string columns used by the MOHAP tab and the
+    regulatory snapshot. Safe to call repeatedly.
+    """
+    mohap_df["Ingredient"] = mohap_df["Ingredient"].astype(str)
+    mohap_df["Ingredient_clean"] = clean_ingredient_series(mohap_df["Ingredient"])
+    mohap_df["Trade Name"] = map_unique(mohap_df["Trade Name"], lambda s: s.astype(str).str.strip())
+    mohap_df["Form"] = collapse_spaces(mohap_df["Form"])
+    mohap_df["Strength"] = map_unique(mohap_df["Strength"], lambda s: s.astype(str).str.strip())
+    mohap_df["Company"] = collapse_spaces(mohap_df["Company"])
+    mohap_df["Agent"] = collapse_spaces(mohap_df["Agent"])
+    return mohap_df
+
+
+def format_ob_ingredients(ingredients: pd.Series) -> pd.Series:
+    """Orange Book "A;B" → "A +B" (upper-case, stripped), as shown in the patent tab."""
+    return map_unique(
+        ingredients,
+        lambda s: s.astype(str).str.upper().str.strip().str.replace(";", " +", regex=False).str.strip()
+    )
@@ -1,5 +1,6 @@
 import pandas as pd
 import streamlit as st
+from tool_functions.DataLoad import OB_DATE_FORMAT
 
 def display_patent_summary(products_df, patents_df, ingredient_name):
     ingredient_name = ingredient_name.strip().upper()
@@ -19,7 +20,7 @@ def display_patent_summary(products_df, patents_df, ingredient_name):
 
     merged = pd.merge(df_match, patents_df, how="left", on=["Appl_No", "Product_No"])
     merged["Patent_Expire_Date_Text"] = pd.to_datetime(
-        merged["Patent_Expire_Date_Text"], errors='coerce'
+        merged["Patent_Expire_Date_Text"], format=OB_DATE_FORMAT, errors='coerce'
     )
 
     grouped = merged.groupby(["DF;Route", "Applicant"])
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from tool_functions.Normalize import map_unique
+
+# Mass units → mg
+MASS_TO_MG = {"mg": 1.0, "g": 1000.0, "mcg": 0.001, "ug": 0.001}
+AMOUNT = r"(\d+(?:\.\d+)?)"
+UNIT_AMOUNT = AMOUNT + r"\s*(mcg|ug|mg|g|iu|%|ml)(?![a-z])"
+# Text after a "/" is only a denominator when it starts with one of these (optionally after a number);
+# "10mg/ 160mg" is two strengths, "250mg/5ml" and "500mg/Tablet" are per 5 ml / per tablet
+PER_UNITS = (
+    r"ml|l|g|tab\w*|cap\w*|vial|amp\w*|sachet|dose|actuation|puff|spray|patch|unit|drop\w*|"
+    r"supp\w*|pessar\w*|pen|syringe|bag|bottle|lozenge|inhal\w*|film|piece|pre-?filled\w*"
+)
+# Pack content (ml / g per container), never preceded or followed by a "/" (that would be a ratio)
+CONTENT = r"(?<![/\d.])" + AMOUNT + r"\s*(ml|g)\b(?!\s*/)"
+# Added to Master Data by add_master_unit_prices
+MASTER_PRICE_COLS = ["Pack Count", "Pack Strength mg", "Price per Unit", "Price per mg"]
+
+
+def _prep(s):
+    """Lower-case, thousands separators and bracketed breakdowns removed, single spaces."""
+    return (
+        s.astype(str).str.lower()
+        .str.replace("µ", "mc", regex=False)
+        .str.replace("’", "'", regex=False)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.replace(r"(\d),(\d{3})(?!\d)", r"\1\2", regex=True)
+        .str.replace(r"[\(\[].*?[\)\]]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def _strength_frame(s):
+    """
+    Distinct strength strings → Strength mg / Strength Unit / Per Amount / Per Unit.
+    A "%" strength is a concentration: x% = 10·x mg per 1 g (or ml) of pack content,
+    so Per Unit is "content" and matches either content unit.
+    """
+    t = _prep(s)
+    parts = t.str.rsplit("/", n=1, expand=True).reindex(columns=[0, 1])
+    is_per = parts[1].fillna("").str.match(r"^\s*(?:" + AMOUNT + r"\s*)?(?:" + PER_UNITS + r")\b", na=False)
+    numerator = parts[0].where(is_per, t).fillna("")
+    denominator = parts[1].where(is_per, "").fillna("")
+
+    # All "<number><unit>" amounts before the "/" (combination strengths are summed in mg);
+    # denominators of earlier components are dropped first: "0.28 g/100g, 2 g/100g"
+    numerator = numerator.str.replace(r"/\s*" + AMOUNT + r"\s*(?:ml|l|g)\b", " ", regex=True)
+    amounts = numerator.str.extractall(UNIT_AMOUNT)
+    amounts["mg"] = pd.to_numeric(amounts[0]) * amounts[1].map({**MASS_TO_MG, "%": 10.0})
+
+    out = pd.DataFrame(index=s.index)
+    out["Strength mg"] = amounts["mg"].groupby(level=0).sum(min_count=1).reindex(s.index)
+    out["Strength Unit"] = amounts[1].groupby(level=0).first().reindex(s.index)
+
+    # What the strength is expressed per: a dose unit (tablet, vial, ...) or an amount of ml / g
+    per = denominator.str.extract(r"^\s*" + AMOUNT + r"?\s*(ml|g|l)\b")
+    out["Per Unit"] = per[1].replace({"l": "ml"}).fillna("unit").where(out["Strength Unit"] != "%", "content")
+    out["Per Amount"] = pd.to_numeric(per[0]).fillna(1.0) * np.where(per[1] == "l", 1000, 1)
+    return out
+
+
+def parse_strength(series):
+    """
+    Free-text strength ("500mg/Tablet", "250mg/5ml", "14mg, 57mg/5ml", "1g/Vial") →
+    Strength mg (per Per Amount of Per Unit), Strength Unit, Per Amount, Per Unit.
+    Parsed once per distinct string.
+    """
+    return map_unique(series, _strength_frame)
+
+
+def _pack_frame(s):
+    """Distinct MOHAP pack strings → Pack Count / Pack Content (ml or g per container) / Content Unit."""
+    t = _prep(s)
+    # bracketed text kept here: "60 Viaflo Bags (100 mL)" has the content only in brackets
+    raw = s.astype(str).str.lower().str.replace("’", "'", regex=False).str.replace(r"\s+", " ", regex=True)
+
+    times_n = r"x\s*(\d+)(?![\d.]|\s*(?:ml|l|g|mg)\b)"                                         # x 5, not x 0.5ml
+    units = pd.to_numeric(t.str.extract(r"(\d+)\s*'s")[0])                                   # 30's (10's Blister x 3)
+    units = units.fillna(pd.to_numeric(raw.str.extract(r"^\s*(\d+)\s*'s")[0]))
+    # "N's" times a multiplier, only when it is the pack's only "N's" (otherwise the first one is the total)
+    times = pd.to_numeric(t.str.extract(r"^(\d+)\s*x\s*\d+\s*'s")[0])                        # 2 x 14's
+    times = times.fillna(pd.to_numeric(raw.str.extract(r"'s\b[^\[(]*?\b" + times_n)[0]))        # 1's Sachet x 5
+    times = times.where(raw.str.count(r"\d+\s*'s") == 1)
+    count = units * times.fillna(1.0)
+    count = count.fillna(pd.to_numeric(t.str.extract(r"\b" + times_n)[0]))                    # 500 ml x 20 Viaflo Bags
+    count = count.fillna(pd.to_numeric(t.str.extract(r"^(\d+) (?!ml\b|l\b|g\b|mg\b)[a-z]")[0]))  # 1 Glass Vial
+
+    content = raw.str.extract(AMOUNT + r"\s*(ml|l|g)\b")                                     # 100ml Glass Bottle, 30g Tube
+    out = pd.DataFrame(index=s.index)
+    out["Content Unit"] = content[1].replace({"l": "ml"})
+    out["Pack Content"] = pd.to_numeric(content[0]) * np.where(content[1] == "l", 1000, 1)
+    out["Pack Count"] = count.where(count.notna() | out["Pack Content"].isna(), 1.0)
+    return out
+
+
+def parse_pack_size(series):
+    """MOHAP "Pack Size" text → Pack Count, Pack Content, Content Unit (parsed once per distinct string)."""
+    return map_unique(series, _pack_frame)
+
+
+def _master_pack_frame(s):
+    """Distinct Master Data packs ("TABS 10 500MG", "SYR 5MG/ML 100ML 1") → strength + count + content."""
+    t = _prep(s)
+
+    # The ml / g amount is the pack content ("CREAM 1% 30G 1", "SYR 5MG/ML 100ML 1") unless it is the
+    # only amount, in which case a gram amount is the strength ("INJ 1G 1")
+    content = t.str.extract(CONTENT)
+    is_content = content[1].eq("ml") | (t.str.count(UNIT_AMOUNT) > 1)
+    out = _strength_frame(t.where(~is_content, t.str.replace(CONTENT, " ", n=1, regex=True)))
+
+    # Pack count = last bare integer (not followed by a unit and not part of a ratio)
+    bare = t.str.extractall(r"(?<![\d./])(\d+)(?![\d.]|\s*(?:mcg|ug|mg|g|iu|%|ml|l)(?![a-z])|\s*/)")
+    out["Pack Count"] = pd.to_numeric(bare[0]).groupby(level=0).last().reindex(s.index)
+
+    out["Content Unit"] = content[1].where(is_content)
+    out["Pack Content"] = pd.to_numeric(content[0]).where(is_content)
+    return out
+
+
+def parse_master_pack(series):
+    return map_unique(series, _master_pack_frame)
+
+
+def _total_mg(parsed):
+    """Active mg in one pack: per-dose strength × count, or per-ml/g strength × pack content."""
+    count = parsed["Pack Count"].fillna(1.0)
+    per_dose = parsed["Strength mg"] * count
+    per_amount = parsed["Strength mg"] / parsed["Per Amount"] * parsed["Pack Content"] * count
+    return pd.Series(
+        np.where(
+            parsed["Per Unit"] == "unit", per_dose,
+            np.where((parsed["Per Unit"] == parsed["Content Unit"]) | (parsed["Per Unit"] == "content"), per_amount, np.nan)
+        ),
+        index=parsed.index
+    )
+
+
+def add_mohap_unit_prices(mohap_df):
+    """
+    Adds Strength mg, Pack Count, Pack Content and public price per unit / per mg
+    columns to the MOHAP price list.
+    """
+    strength = parse_strength(mohap_df["Strength"])
+    pack = parse_pack_size(mohap_df["Pack Size"])
+    parsed = pd.concat([strength, pack], axis=1)
+    price = pd.to_numeric(mohap_df["Public Price (AED)"].astype(str).str.replace(",", "").str.strip(), errors="coerce")
+    total_mg = _total_mg(parsed)
+
+    mohap_df["Strength mg"] = strength["Strength mg"]
+    mohap_df["Pack Count"] = pack["Pack Count"]
+    mohap_df["Pack Content"] = pack["Pack Content"]
+    mohap_df["Public Price per Unit (AED)"] = price / pack["Pack Count"].where(pack["Pack Count"] > 0)
+    mohap_df["Public Price per mg (AED)"] = price / total_mg.where(total_mg > 0)
+    return mohap_df
+
+
+def add_master_unit_prices(df):
+    """Adds Pack Count, Pack Strength mg and retail price per unit / per mg to Master Data."""
+    if df.empty:
+        # header-only extract: same columns, nothing to parse
+        return df.assign(**{c: pd.Series(dtype=float) for c in MASTER_PRICE_COLS})
+    parsed = parse_master_pack(df["Pack"])
+    price = pd.to_numeric(df["Retail Price"], errors="coerce")
+    total_mg = _total_mg(parsed)
+
+    df["Pack Count"] = parsed["Pack Count"]
+    df["Pack Strength mg"] = parsed["Strength mg"]
+    df["Price per Unit"] = price / parsed["Pack Count"].where(parsed["Pack Count"] > 0)
+    df["Price per mg"] = price / total_mg.where(total_mg > 0)
+    return df
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -15,87 +16,126 @@ def compute_cagr(start, end, years=4):
     except:
         return 0
 
-def generate_combination_first_clean_summary(df, molecule_name):
-    molecule_name = molecule_name.strip().upper()
-    mol_df = df[df["Molecule Combination"].str.upper() == molecule_name].copy()
-    if mol_df.empty:
-        st.warning(f"No data found for molecule: {molecule_name}")
-        return
-
+PRODUCT_KEYS = ["Molecule Combination", "Product", "Manufacturer", "Molecule Combination Type"]
+PACK_KEYS = PRODUCT_KEYS + ["Pack", "Retail Price", "NFC3"]
+SUM_COLS = ["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value", "Pack Value 2024", "LPO Units", "Private Units"]
+
+
+def build_pack_hierarchy(df, products_df=None):
+    """
+    Materializes the Combination → Product → Pack drill-down in one pass.
+    Returns a dict of keyed lookups:
+      combos            (combination, type) → summed units / values
+      manufacturers     combination → manufacturer count
+      products          combination → product-level frame (with LPO / private units)
+      packs             (combination, product, manufacturer, type) → pack-level frame
+      product_molecules product → molecules it contains
+    `products_df` is the frame used for the product → molecule index (defaults to `df`).
+    """
+    h = df[PACK_KEYS + ["Market", "2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]].copy()
     for col in ["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value", "Retail Price"]:
-        if col in mol_df.columns:
-            mol_df[col] = pd.to_numeric(mol_df[col], errors='coerce').fillna(0)
+        h[col] = pd.to_numeric(h[col], errors='coerce').fillna(0)
+    h["Molecule Combination"] = h["Molecule Combination"].str.upper()
+
+    h["Pack Value 2024"] = h["Retail Price"] * h["2024 Units"]
+    h["LPO Units"] = h["2024 Units"].where(h["Market"] == "LPO", 0)
+    h["Private Units"] = h["2024 Units"].where(h["Market"] == "PRIVATE MARKET", 0)
+
+    combos = h.groupby(["Molecule Combination", "Molecule Combination Type"])[SUM_COLS].sum()
+    manufacturers = h.groupby("Molecule Combination")["Manufacturer"].nunique()
+
+    products = h.groupby(PRODUCT_KEYS)[["2024 Units", "Pack Value 2024", "LPO Units", "Private Units"]].sum()
+    packs = h.groupby(PACK_KEYS)[["2024 Units", "LPO Units", "Private Units"]].sum()
 
-    mol_df["Pack Value 2024"] = mol_df["Retail Price"] * mol_df["2024 Units"]
-    mol_df["Pack Value 2021"] = mol_df["Retail Price"] * mol_df["2021 Units"]
+    # --- Within-product shares ---
+    prod_units = products["2024 Units"].reindex(packs.index.droplevel(["Pack", "Retail Price", "NFC3"])).values
+    packs["Within Product %"] = packs["2024 Units"] / np.where(prod_units == 0, 1, prod_units) * 100
+    packs["LPO %"] = packs["LPO Units"] / packs["2024 Units"].replace(0, 1) * 100
+    packs["Private %"] = packs["Private Units"] / packs["2024 Units"].replace(0, 1) * 100
 
-    mono_mask = mol_df["Molecule Combination Type"].str.upper() == "MONO"
-    combi_mask = ~mono_mask
+    # --- Product → molecules index ---
+    src = df if products_df is None else products_df
+    product_molecules = src.dropna(subset=["Molecule"]).groupby("Product")["Molecule"].unique().apply(list).to_dict()
+
+    return {
+        "combos": combos,
+        "manufacturers": manufacturers.to_dict(),
+        "products": {combo: g.droplevel(0) for combo, g in products.groupby(level=0)},
+        "packs": {key: g.droplevel(PRODUCT_KEYS) for key, g in packs.groupby(level=PRODUCT_KEYS)},
+        "product_molecules": product_molecules,
+    }
+
+
+def generate_combination_first_clean_summary(df, molecule_name, hierarchy=None):
+    molecule_name = molecule_name.strip().upper()
+    if hierarchy is None:
+        mol_df = df[df["Molecule Combination"].str.upper() == molecule_name]
+        if mol_df.empty:
+            st.warning(f"No data found for molecule: {molecule_name}")
+            return
+        mol_products = df[df["Product"].isin(mol_df["Product"].unique())]
+        hierarchy = build_pack_hierarchy(mol_df, products_df=mol_products)
+
+    if molecule_name not in hierarchy["products"]:
+        st.warning(f"No data found for molecule: {molecule_name}")
+        return
 
-    def _agg_cagr(df_, col_21, col_24):
-        return compute_cagr(df_[col_21].sum(), df_[col_24].sum())
+    combo_rows = hierarchy["combos"].loc[molecule_name]
+    mono = combo_rows.loc[combo_rows.index.str.upper() == "MONO"].sum()
+    combi = combo_rows.loc[combo_rows.index.str.upper() != "MONO"].sum()
 
-    mono_units_cagr = _agg_cagr(mol_df[mono_mask], "2021 Units", "2024 Units")
-    combi_units_cagr = _agg_cagr(mol_df[combi_mask], "2021 Units", "2024 Units")
-    mono_value_cagr = _agg_cagr(mol_df[mono_mask], "2021 LC Value", "2024 LC Value")
-    combi_value_cagr = _agg_cagr(mol_df[combi_mask], "2021 LC Value", "2024 LC Value")
+    mono_units_cagr = compute_cagr(mono["2021 Units"], mono["2024 Units"])
+    combi_units_cagr = compute_cagr(combi["2021 Units"], combi["2024 Units"])
+    mono_value_cagr = compute_cagr(mono["2021 LC Value"], mono["2024 LC Value"])
+    combi_value_cagr = compute_cagr(combi["2021 LC Value"], combi["2024 LC Value"])
 
     st.markdown(f"## 📦 Product & Pack Breakdown for `{molecule_name}`")
     st.markdown(f"### 📈 Mono vs. Combo CAGR (2021 → 2024)")
     st.markdown(f"- **Mono**: Units CAGR = `{safe_fmt(mono_units_cagr)}%`, Value CAGR = `{safe_fmt(mono_value_cagr)}%`")
     st.markdown(f"- **Combo**: Units CAGR = `{safe_fmt(combi_units_cagr)}%`, Value CAGR = `{safe_fmt(combi_value_cagr)}%`")
 
-    total_units = mol_df["2024 Units"].sum()
-    total_value = mol_df["Pack Value 2024"].sum()
-    
-    for combo, combo_df in mol_df.groupby("Molecule Combination"):
-        combo_units = combo_df["2024 Units"].sum()
-        combo_value = combo_df["Pack Value 2024"].sum()
-        unit_pct = combo_units / (total_units or 1) * 100
-        value_pct = combo_value / (total_value or 1) * 100
-
-        units_cagr = compute_cagr(combo_df["2021 Units"].sum(), combo_df["2024 Units"].sum())
-        value_cagr = compute_cagr(combo_df["2021 LC Value"].sum(), combo_df["2024 LC Value"].sum())
-
-        st.markdown(f"---\n### 🔗 Combination: `{combo}`")
-        st.markdown(f"- 💊 Units Share: `{safe_fmt(unit_pct)}%`, 💰 Value Share: `{safe_fmt(value_pct)}%`")
-        st.markdown(f"- 🚀 CAGR: Units = `{safe_fmt(units_cagr)}%`, Value = `{safe_fmt(value_cagr)}%`")
-        st.markdown(f"- 🏭 Competitors: `{combo_df['Manufacturer'].nunique()}`")
-
-        for (product, manufacturer, combo_type), prod_df in combo_df.groupby(["Product", "Manufacturer", "Molecule Combination Type"]):
-            prod_units = prod_df["2024 Units"].sum()
-            prod_value = prod_df["Pack Value 2024"].sum()
-            prod_unit_pct = prod_units / (total_units or 1) * 100
-            prod_value_pct = prod_value / (total_value or 1) * 100
-
-            st.markdown(f"#### 📌 Product: `{product}` by `{manufacturer}` ({combo_type})")
-            st.markdown(f"- 📦 Units: `{safe_fmt(prod_units, '{:,.0f}')}`, 💰 Value: AED `{safe_fmt(prod_value, '{:,.0f}')}`")
-            st.markdown(f"- 🌍 Share of Molecule: `{safe_fmt(prod_unit_pct)}%` units, `{safe_fmt(prod_value_pct)}%` value")
-
-            lpo_units = prod_df[prod_df["Market"] == "LPO"]["2024 Units"].sum()
-            private_units = prod_df[prod_df["Market"] == "PRIVATE MARKET"]["2024 Units"].sum()
-            lpo_pct = lpo_units / (prod_units or 1) * 100
-            private_pct = private_units / (prod_units or 1) * 100
-            st.markdown(f"- 🏪 Market Split: LPO = `{safe_fmt(lpo_pct)}%`, Private = `{safe_fmt(private_pct)}%`")
-
-            shared_molecules = df[df["Product"] == product]["Molecule"].dropna().unique().tolist()
-            shared_molecules = [m for m in shared_molecules if m.upper() != molecule_name]
-            shared_note = ", ".join(shared_molecules) if shared_molecules else "Mono-molecule Product"
-            st.markdown(f"- 🔄 Shared Molecule(s): {shared_note}")
-
-            total_prod_units = prod_df["2024 Units"].sum()
-
-            for (pack, price, nfc3), pack_df in prod_df.groupby(["Pack", "Retail Price", "NFC3"]):
-                pack_units = pack_df["2024 Units"].sum()
-                lpo_pack_units = pack_df[pack_df["Market"] == "LPO"]["2024 Units"].sum()
-                private_pack_units = pack_df[pack_df["Market"] == "PRIVATE MARKET"]["2024 Units"].sum()
-                
-                lpo_pack_pct = lpo_pack_units / (pack_units or 1) * 100
-                private_pack_pct = private_pack_units / (pack_units or 1) * 100
-                within_product_pct = pack_units / (total_prod_units or 1) * 100
-
-                st.markdown(
-                    f"• `{pack}` — AED `{safe_fmt(price)}` — {safe_fmt(pack_units, '{:,.0f}')} units "
-                    f"(**{safe_fmt(within_product_pct)}% of product**) | "
-                    f"LPO: `{safe_fmt(lpo_pack_pct)}%`, Private: `{safe_fmt(private_pack_pct)}%` — {nfc3 or 'NFC3: Unknown'}"
-                )
\ No newline at end of file
+    combo_tot = combo_rows.sum()
+    total_units = combo_tot["2024 Units"]
+    total_value = combo_tot["Pack Value 2024"]
+
+    combo = molecule_name
+    unit_pct = total_units / (total_units or 1) * 100
+    value_pct = total_value / (total_value or 1) * 100
+
+    units_cagr = compute_cagr(combo_tot["2021 Units"], combo_tot["2024 Units"])
+    value_cagr = compute_cagr(combo_tot["2021 LC Value"], combo_tot["2024 LC Value"])
+
+    st.markdown(f"---\n### 🔗 Combination: `{combo}`")
+    st.markdown(f"- 💊 Units Share: `{safe_fmt(unit_pct)}%`, 💰 Value Share: `{safe_fmt(value_pct)}%`")
+    st.markdown(f"- 🚀 CAGR: Units = `{safe_fmt(units_cagr)}%`, Value = `{safe_fmt(value_cagr)}%`")
+    st.markdown(f"- 🏭 Competitors: `{hierarchy['manufacturers'].get(combo, 0)}`")
+
+    for (product, manufacturer, combo_type), prod in hierarchy["products"][combo].iterrows():
+        prod_units = prod["2024 Units"]
+        prod_value = prod["Pack Value 2024"]
+        prod_unit_pct = prod_units / (total_units or 1) * 100
+        prod_value_pct = prod_value / (total_value or 1) * 100
+
+        st.markdown(f"#### 📌 Product: `{product}` by `{manufacturer}` ({combo_type})")
+        st.markdown(f"- 📦 Units: `{safe_fmt(prod_units, '{:,.0f}')}`, 💰 Value: AED `{safe_fmt(prod_value, '{:,.0f}')}`")
+        st.markdown(f"- 🌍 Share of Molecule: `{safe_fmt(prod_unit_pct)}%` units, `{safe_fmt(prod_value_pct)}%` value")
+
+        lpo_pct = prod["LPO Units"] / (prod_units or 1) * 100
+        private_pct = prod["Private Units"] / (prod_units or 1) * 100
+        st.markdown(f"- 🏪 Market Split: LPO = `{safe_fmt(lpo_pct)}%`, Private = `{safe_fmt(private_pct)}%`")
+
+        shared_molecules = hierarchy["product_molecules"].get(product, [])
+        shared_molecules = [m for m in shared_molecules if m.upper() != molecule_name]
+        shared_note = ", ".join(shared_molecules) if shared_molecules else "Mono-molecule Product"
+        st.markdown(f"- 🔄 Shared Molecule(s): {shared_note}")
+
+        packs = hierarchy["packs"].get((combo, product, manufacturer, combo_type))
+        if packs is None:
+            continue
+
+        for (pack, price, nfc3), pack_row in packs.iterrows():
+            st.markdown(
+                f"• `{pack}` — AED `{safe_fmt(price)}` — {safe_fmt(pack_row['2024 Units'], '{:,.0f}')} units "
+                f"(**{safe_fmt(pack_row['Within Product %'])}% of product**) | "
+                f"LPO: `{safe_fmt(pack_row['LPO %'])}%`, Private: `{safe_fmt(pack_row['Private %'])}%` — {nfc3 or 'NFC3: Unknown'}"
+            )
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from tool_functions.Columns import UNIT_COLS, VALUE_COLS, YEARS, cagr, unstar_years
+
+# A position counts as "losing share" below this change in 2024 vs 2021 value share
+LOSING_SHARE_PTS = -2.0
+
+
+def build_portfolio_index(df):
+    """
+    Manufacturer → footprint inverted index, built in one grouped pass.
+
+    Returns a dict:
+      manufacturers  one row per manufacturer: yearly units / value totals, CAGR, footprint
+                     counts, number of combinations led / losing share, overall rank
+      portfolios     {manufacturer: {"combinations", "products", "packs"}} frames
+    Units / values are split by molecule count, as in the exec summary, so shares
+    match the molecule-first tabs.
+    """
+    df = unstar_years(df)
+    keys = ["Manufacturer", "Molecule Combination", "Product", "Pack"]
+
+    num = df[UNIT_COLS + VALUE_COLS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    num = num.div(df["Molecule Combination"].str.count(r" \+ ") + 1, axis=0)
+    num["LPO 2024 Units"] = num["2024 Units"].where(df["Market"] == "LPO", 0)
+    num[keys] = df[keys].fillna("N/A")
+    metric_cols = UNIT_COLS + VALUE_COLS + ["LPO 2024 Units"]
+
+    packs = num.groupby(keys)[metric_cols].sum()
+    products = packs.groupby(level=keys[:3]).sum()
+    positions = products.groupby(level=keys[:2]).sum()
+
+    # --- Shares and ranks within each combination ---
+    combo_totals = positions.groupby(level=1)[VALUE_COLS].sum()
+    aligned = combo_totals.reindex(positions.index.get_level_values(1)).values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = np.where(aligned > 0, positions[VALUE_COLS].values / aligned * 100, 0.0)
+
+    positions["Share 2021 (%)"] = shares[:, YEARS.index("2021")]
+    positions["Share 2024 (%)"] = shares[:, YEARS.index("2024")]
+    positions["Share Change (pts)"] = positions["Share 2024 (%)"] - positions["Share 2021 (%)"]
+    positions["Value CAGR (%)"] = cagr(positions["2021 LC Value"], positions["2024 LC Value"])
+    positions["Rank 2024"] = positions.groupby(level=1)["2024 LC Value"].rank(ascending=False, method="min").astype(int)
+    positions["Competitors"] = positions.groupby(level=1)["2024 LC Value"].transform("size") - 1
+    positions["LPO Share of Units (%)"] = np.where(
+        positions["2024 Units"] > 0, positions["LPO 2024 Units"] / positions["2024 Units"].replace(0, 1) * 100, 0.0
+    )
+
+    # --- Manufacturer-level aggregates ---
+    manufacturers = positions.groupby(level=0)[UNIT_COLS + VALUE_COLS].sum()
+    manufacturers["Value CAGR (%)"] = cagr(manufacturers["2021 LC Value"], manufacturers["2024 LC Value"])
+    manufacturers["Units CAGR (%)"] = cagr(manufacturers["2021 Units"], manufacturers["2024 Units"])
+    manufacturers["Combinations"] = positions.groupby(level=0).size()
+    manufacturers["Products"] = products.groupby(level=0).size()
+    manufacturers["Packs"] = packs.groupby(level=0).size()
+    manufacturers["Leads"] = (positions["Rank 2024"] == 1).groupby(level=0).sum()
+    manufacturers["Losing Share"] = (positions["Share Change (pts)"] < LOSING_SHARE_PTS).groupby(level=0).sum()
+    manufacturers["Rank 2024"] = manufacturers["2024 LC Value"].rank(ascending=False, method="min").astype(int)
+    manufacturers = manufacturers.sort_values("Rank 2024")
+
+    product_cols = ["2024 Units", "2024 LC Value", "2021 LC Value"]
+    portfolios = {}
+    for manu, pos in positions.groupby(level=0):
+        portfolios[manu] = {"combinations": pos.droplevel(0).sort_values("2024 LC Value", ascending=False)}
+    for manu, prod in products[product_cols].groupby(level=0):
+        portfolios[manu]["products"] = prod.droplevel(0).sort_values("2024 LC Value", ascending=False)
+    for manu, pack in packs[product_cols].groupby(level=0):
+        portfolios[manu]["packs"] = pack.droplevel(0).sort_values("2024 LC Value", ascending=False)
+
+    return {"manufacturers": manufacturers, "portfolios": portfolios}
+
+
+def get_portfolio(index, manufacturer):
+    """{"summary": manufacturer row, "combinations", "products", "packs"} or None."""
+    if manufacturer not in index["portfolios"]:
+        return None
+    return {"summary": index["manufacturers"].loc[manufacturer], **index["portfolios"][manufacturer]}
+
+
+def plot_portfolio(index, manufacturer, use_value=True, top_n=15):
+    """
+    (trend_fig, share_fig): yearly portfolio totals, and 2021 → 2024 share change for the
+    manufacturer's largest combinations.
+    """
+    portfolio = get_portfolio(index, manufacturer)
+    if portfolio is None:
+        return None, None
+
+    cols = VALUE_COLS if use_value else UNIT_COLS
+    label = "Value (AED)" if use_value else "Units"
+    trend_fig = go.Figure(go.Scatter(
+        x=YEARS, y=portfolio["summary"][cols].values.astype(float), mode="lines+markers",
+        hovertemplate=f"%{{x}}<br>{label}: %{{y:,.0f}}<extra></extra>"
+    ))
+    trend_fig.update_layout(
+        title=f"{manufacturer} — Portfolio {label}",
+        xaxis_title="Year", yaxis_title=label, template="plotly_white", height=400
+    )
+
+    top = portfolio["combinations"].head(top_n).iloc[::-1]
+    change = top["Share Change (pts)"]
+    share_fig = go.Figure(go.Bar(
+        x=change, y=top.index, orientation="h",
+        marker_color=np.where(change >= 0, "#2ca02c", "#d62728"),
+        customdata=np.stack([top["Share 2021 (%)"], top["Share 2024 (%)"], top["Rank 2024"]], axis=-1),
+        hovertemplate=(
+            "<b>%{y}</b><br>Share 2021: %{customdata[0]:.1f}%<br>Share 2024: %{customdata[1]:.1f}%"
+            "<br>Change: %{x:+.1f} pts<br>Rank 2024: #%{customdata[2]}<extra></extra>"
+        )
+    ))
+    share_fig.update_layout(
+        title=f"Value Share Change 2021 → 2024 (top {len(top)} combinations by 2024 value)",
+        xaxis_title="Share change (pts)", template="plotly_white", height=max(350, 28 * len(top))
+    )
+    return trend_fig, share_fig
@@ -0,0 +1,254 @@
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from tool_functions.DataLoad import MOHAP_PATH, load_mohap_data
+from tool_functions.Normalize import collapse_spaces
+
+PRICE_HISTORY_DIR = "price_history"
+LOG_FILE = "price_log.parquet"
+MANIFEST_FILE = "manifest.json"
+
+KEY_COLS = ["Trade Name", "Form", "Strength", "Pack Size", "Company"]
+PRICE_COLS = ["Pharmacy Price (AED)", "Public Price (AED)"]
+LOG_COLS = ["Version", "Date", "Change"] + KEY_COLS + PRICE_COLS
+
+
+# --- Snapshot of one price list ---
+def price_snapshot(mohap_df):
+    """
+    One row per (Trade Name, Form, Strength, Pack Size, Company) with numeric prices.
+    Key text is whitespace-collapsed; repeated header rows and exact duplicates are dropped.
+    """
+    snap = pd.DataFrame({c: collapse_spaces(mohap_df[c].fillna("")) for c in KEY_COLS})
+    for c in PRICE_COLS:
+        snap[c] = pd.to_numeric(mohap_df[c].astype(str).str.replace(",", "").str.strip(), errors="coerce")
+
+    snap = snap[snap["Trade Name"] != "Trade Name"]
+    snap = snap.drop_duplicates(KEY_COLS, keep="last")
+    return snap.sort_values(KEY_COLS).reset_index(drop=True)
+
+
+def _fingerprint(snap):
+    return hashlib.sha1(pd.util.hash_pandas_object(snap, index=False).values.tobytes()).hexdigest()[:12]
+
+
+def _normalize_keys(frame):
+    return pd.DataFrame({c: collapse_spaces(frame[c].fillna("")) for c in KEY_COLS})
+
+
+# --- Store ---
+def _empty_log():
+    log = pd.DataFrame({c: pd.Series(dtype=object) for c in LOG_COLS})
+    log["Version"] = log["Version"].astype(int)
+    log["Date"] = pd.to_datetime(log["Date"])
+    for c in PRICE_COLS:
+        log[c] = log[c].astype(float)
+    return log
+
+
+def load_price_history(store_dir=PRICE_HISTORY_DIR):
+    """
+    {"log": row-level deltas (ADDED / CHANGED / REMOVED per key and version),
+     "versions": one row per recorded release}
+    """
+    log_path = os.path.join(store_dir, LOG_FILE)
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {"log": _empty_log(), "versions": pd.DataFrame(columns=["Version", "Date", "Fingerprint", "Rows", "Added", "Changed", "Removed"])}
+
+    with open(manifest_path) as f:
+        versions = pd.DataFrame(json.load(f)["versions"])
+    versions["Date"] = pd.to_datetime(versions["Date"])
+    log = pd.read_parquet(log_path)
+    log["Date"] = pd.to_datetime(log["Date"])
+    return {"log": log, "versions": versions}
+
+
+def _save(history, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    log_path = os.path.join(store_dir, LOG_FILE)
+    history["log"].to_parquet(log_path + ".tmp", index=False)
+    os.replace(log_path + ".tmp", log_path)
+
+    versions = history["versions"].copy()
+    versions["Date"] = versions["Date"].dt.strftime("%Y-%m-%d")
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"versions": versions.to_dict(orient="records")}, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def state_at(history, version=None):
+    """Full price list as of `version` (latest if None), with the date each price took effect."""
+    log = history["log"]
+    if version is not None:
+        log = log[log["Version"] <= version]
+    latest = log.sort_values("Version", kind="stable").drop_duplicates(KEY_COLS, keep="last")
+    latest = latest[latest["Change"] != "REMOVED"]
+    return latest.rename(columns={"Date": "Effective Date"}).drop(columns=["Change"]).reset_index(drop=True)
+
+
+def _diff(old, new):
+    """Row-level changes from `old` to `new` (both KEY_COLS + PRICE_COLS)."""
+    merged = old.merge(new, on=KEY_COLS, how="outer", suffixes=(" Old", " New"), indicator=True)
+
+    price_changed = np.zeros(len(merged), dtype=bool)
+    for c in PRICE_COLS:
+        a, b = merged[f"{c} Old"], merged[f"{c} New"]
+        price_changed |= ~((a == b) | (a.isna() & b.isna())).values
+
+    change = np.select(
+        [merged["_merge"] == "right_only", merged["_merge"] == "left_only", price_changed],
+        ["ADDED", "REMOVED", "CHANGED"],
+        default=""
+    )
+    merged["Change"] = change
+    return merged[merged["Change"] != ""].drop(columns="_merge").reset_index(drop=True)
+
+
+def _release_rows(old, new, version, release_date):
+    """Log rows for one release: what was added, re-priced or removed since `old`."""
+    delta = _diff(old, new)
+    # Removed rows keep their last prices, so the log reads as "what disappeared"
+    rows = delta[KEY_COLS + ["Change"]].copy()
+    for c in PRICE_COLS:
+        rows[c] = delta[f"{c} New"].where(delta["Change"] != "REMOVED", delta[f"{c} Old"])
+    rows.insert(0, "Date", release_date)
+    rows.insert(0, "Version", version)
+    return rows[LOG_COLS]
+
+
+def _version_row(version, release_date, fingerprint, snap, rows):
+    counts = rows["Change"].value_counts()
+    return {
+        "Version": version,
+        "Date": release_date,
+        "Fingerprint": fingerprint,
+        "Rows": len(snap),
+        "Added": int(counts.get("ADDED", 0)),
+        "Changed": int(counts.get("CHANGED", 0)),
+        "Removed": int(counts.get("REMOVED", 0)),
+    }
+
+
+def _rebuild(releases):
+    """History from full snapshots [(date, fingerprint, snapshot)] in release order; versions renumbered 1..n."""
+    log, versions = [], []
+    previous = _empty_log()[KEY_COLS + PRICE_COLS]
+    for version, (release_date, fingerprint, snap) in enumerate(releases, start=1):
+        rows = _release_rows(previous, snap, version, release_date)
+        log.append(rows)
+        versions.append(_version_row(version, release_date, fingerprint, snap, rows))
+        previous = snap
+    return {"log": pd.concat(log, ignore_index=True), "versions": pd.DataFrame(versions)}
+
+
+def record_release(mohap_df, release_date, store_dir=PRICE_HISTORY_DIR):
+    """
+    Stores one MOHAP price list as a version, keeping only the rows that were added,
+    re-priced or removed since the release before it. A release dated after the latest one
+    is appended; an older one (a backfill) is slotted in by date, and the log is re-derived
+    from every release's full list so each version diffs against its actual predecessor
+    (versions are renumbered in date order). A release identical to the one before it is
+    not stored; one identical to the release after it moves that release to the earlier
+    date. Returns the updated history.
+    """
+    history = load_price_history(store_dir)
+    release_date = pd.Timestamp(release_date).normalize()
+    snap = price_snapshot(mohap_df)
+    fingerprint = _fingerprint(snap)
+
+    versions = history["versions"]
+    # position in date order (after any release on the same date)
+    position = int((versions["Date"] <= release_date).sum()) if len(versions) else 0
+    if position and versions["Fingerprint"].iloc[position - 1] == fingerprint:
+        return history
+
+    if position == len(versions):
+        version = position + 1
+        rows = _release_rows(state_at(history)[KEY_COLS + PRICE_COLS], snap, version, release_date)
+        new_version = pd.DataFrame([_version_row(version, release_date, fingerprint, snap, rows)])
+        # (concat with an empty frame would reset the dtypes, so the first version replaces it)
+        history["log"] = pd.concat([history["log"], rows], ignore_index=True) if len(history["log"]) else rows
+        history["versions"] = pd.concat([versions, new_version], ignore_index=True) if len(versions) else new_version
+    else:
+        releases = [
+            (r.Date, r.Fingerprint, state_at(history, r.Version)[KEY_COLS + PRICE_COLS])
+            for r in versions.itertuples()
+        ]
+        if releases[position][1] == fingerprint:
+            # the same list as the next release: that release was in force from the earlier date
+            releases.pop(position)
+        releases.insert(position, (release_date, fingerprint, snap))
+        history = _rebuild(releases)
+
+    _save(history, store_dir)
+    return history
+
+
+def sync_price_history(path=MOHAP_PATH, store_dir=PRICE_HISTORY_DIR):
+    """
+    Records the current price list file, dated by the file's modification date.
+    A list that is already stored (under any date) is not recorded again.
+    """
+    mohap_df = load_mohap_data(path)
+    history = load_price_history(store_dir)
+    if _fingerprint(price_snapshot(mohap_df)) in set(history["versions"]["Fingerprint"]):
+        return history
+    release_date = pd.Timestamp(dt.date.fromtimestamp(os.path.getmtime(path)))
+    return record_release(mohap_df, release_date, store_dir=store_dir)
+
+
+# --- Queries ---
+def version_as_of(history, date):
+    """Latest version released on or before `date` (None if none)."""
+    versions = history["versions"]
+    eligible = versions[versions["Date"] <= pd.Timestamp(date)]
+    return int(eligible["Version"].max()) if len(eligible) else None
+
+
+def prices_as_of(history, date):
+    """Price list in force on `date` (empty before the first recorded release)."""
+    return state_at(history, version_as_of(history, date) or 0)
+
+
+def changes_between(history, from_version, to_version):
+    """
+    Keys whose prices differ between two versions, with old and new prices side by side.
+    """
+    old = state_at(history, from_version)[KEY_COLS + PRICE_COLS]
+    new = state_at(history, to_version)[KEY_COLS + PRICE_COLS]
+    delta = _diff(old, new)
+    public = "Public Price (AED)"
+    delta["Public Change (%)"] = (delta[f"{public} New"] / delta[f"{public} Old"].replace(0, np.nan) - 1) * 100
+    return delta
+
+
+def price_trend(history, products):
+    """
+    Every recorded price point for the keys in `products` (any frame with the key columns),
+    one row per key and version where it was added / changed / removed.
+    """
+    keys = _normalize_keys(products).drop_duplicates()
+    log = history["log"].merge(keys, on=KEY_COLS, how="inner")
+    return log.sort_values(KEY_COLS + ["Version"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record a MOHAP price list release in the price history store.")
+    parser.add_argument("path", nargs="?", default=MOHAP_PATH)
+    parser.add_argument("--date", help="Release date (YYYY-MM-DD); defaults to the file's modification date")
+    parser.add_argument("--store", default=PRICE_HISTORY_DIR)
+    args = parser.parse_args()
+
+    if args.date:
+        history = record_release(load_mohap_data(args.path), args.date, store_dir=args.store)
+    else:
+        history = sync_price_history(args.path, store_dir=args.store)
+    print(history["versions"].to_string(index=False))
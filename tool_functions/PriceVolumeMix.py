@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from tool_functions.Columns import UNIT_COLS, VALUE_COLS, YEARS, unstar_years
+
+LEVELS = ["Molecule Combination", "ATC4", "ATC3", "ATC2", "ATC1"]
+# A "pack" is one priced cell: the same pack sold in the private market and through LPO counts twice,
+# so a shift between channels shows up as mix
+PACK_KEYS = ["Molecule Combination", "Manufacturer", "Product", "Pack", "Market", "ATC1", "ATC2", "ATC3", "ATC4"]
+PVM_COLS = ["Value Before", "Value", "Value Change", "Volume Effect", "Price Effect", "Mix Effect", "Units Before", "Units"]
+EFFECTS = ["Volume Effect", "Price Effect", "Mix Effect"]
+
+
+def pack_prices(df):
+    """
+    Yearly units and LC value per pack (split by molecule count, as in the exec summary).
+    Rows with units but no LC value are valued at Retail Price.
+    Returns (packs index, units, values) with one column per year.
+    """
+    df = unstar_years(df)
+    units = df[UNIT_COLS].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
+    values = df[VALUE_COLS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    retail = pd.to_numeric(df["Retail Price"], errors="coerce").to_numpy(dtype=float)[:, None]
+
+    missing = (units > 0) & ~(values > 0) & ~np.isnan(retail)
+    values = np.where(missing, units * retail, np.nan_to_num(values))
+
+    n_mols = (df["Molecule Combination"].str.count(r" \+ ") + 1).to_numpy()[:, None]
+    frame = pd.DataFrame(np.hstack([units, values]) / n_mols, columns=UNIT_COLS + VALUE_COLS)
+    frame[PACK_KEYS] = df[PACK_KEYS].fillna("N/A").to_numpy()
+    packs = frame.groupby(PACK_KEYS)[UNIT_COLS + VALUE_COLS].sum()
+    return packs.index, packs[UNIT_COLS].to_numpy(), packs[VALUE_COLS].to_numpy()
+
+
+def build_pvm(df):
+    """
+    Year-over-year LC value change split into volume, price and mix effects for every
+    combination and ATC1–4 node, from one pack-level pass.
+
+    For a node with packs i and years 0 → 1 (p = value / units per pack):
+      Volume = (Q1 − Q0) × average price in year 0
+      Mix    = Σ q1·p0 − Q1 × average price in year 0   (shift toward pricier / cheaper packs)
+      Price  = Σ q1·(p1 − p0) + (U1 − U0)               (price changes on the packs sold now)
+    U is LC value booked on packs with no units that year (rebates, adjustments); it has
+    no price to spread over volume, so its change counts as price, and Q and the average
+    price only cover packs with units. The three add up to V1 − V0 on every row. A pack
+    with no year-0 sales is priced at its year-1 price, so new packs count as volume / mix,
+    never price.
+
+    Returns a frame indexed by (Level, Node, Year) with PVM_COLS; Year is the later year.
+    """
+    index, Q, V = pack_prices(df)
+    priced = Q > 0
+    P = np.divide(V, Q, out=np.full_like(V, np.nan), where=priced)
+    P0 = np.where(np.isnan(P[:, :-1]), P[:, 1:], P[:, :-1])
+    Qp = np.where(priced, Q, 0)
+    U = np.where(priced, 0, V)
+    A = np.nan_to_num(Qp[:, 1:] * P0)
+
+    # one block of columns per sum: V0, V1, U0, priced Q0 / Q1, A, Q0, Q1 (each n_years - 1 wide)
+    M = np.hstack([V[:, :-1], V[:, 1:], U[:, :-1], Qp[:, :-1], Qp[:, 1:], A, Q[:, :-1], Q[:, 1:]])
+    t = len(YEARS) - 1
+
+    parts = []
+    for level in LEVELS:
+        codes, nodes = pd.factorize(index.get_level_values(level))
+        sums = np.zeros((len(nodes), M.shape[1]))
+        np.add.at(sums, codes, M)
+        v0, v1, u0, qp0, qp1, a, q0, q1 = (sums[:, k * t:(k + 1) * t] for k in range(8))
+
+        avg0 = np.divide(v0 - u0, qp0, out=np.divide(a, qp1, out=np.zeros_like(a), where=qp1 > 0), where=qp0 > 0)
+        volume = (qp1 - qp0) * avg0
+        mix = a - qp1 * avg0
+        # = Σ q1·(p1 − p0) + U1 − U0, since V1 = Σ q1·p1 + U1
+        price = v1 - a - u0
+
+        parts.append(pd.DataFrame({
+            "Level": level,
+            "Node": np.repeat(np.asarray(nodes), t),
+            "Year": np.tile(np.asarray(YEARS[1:], dtype=int), len(nodes)),
+            "Value Before": v0.ravel(),
+            "Value": v1.ravel(),
+            "Value Change": (v1 - v0).ravel(),
+            "Volume Effect": volume.ravel(),
+            "Price Effect": price.ravel(),
+            "Mix Effect": mix.ravel(),
+            "Units Before": q0.ravel(),
+            "Units": q1.ravel(),
+        }))
+    return pd.concat(parts, ignore_index=True).set_index(["Level", "Node", "Year"]).sort_index()
+
+
+def get_pvm(pvm, level, node):
+    """Yearly rows (indexed by Year) for one node; empty frame if unknown."""
+    try:
+        return pvm.loc[(level, node)]
+    except KeyError:
+        return pd.DataFrame(columns=PVM_COLS)
+
+
+def pvm_bridge(pvm, level, node, start=2021, end=2024):
+    """
+    Value bridge from `start` to `end`: start value, the yearly effects summed (chain-linked),
+    end value. None if the node is unknown.
+    """
+    rows = get_pvm(pvm, level, node)
+    rows = rows[(rows.index > start) & (rows.index <= end)]
+    if rows.empty:
+        return None
+    bridge = {"Start Value": rows["Value Before"].iloc[0]}
+    bridge.update(rows[EFFECTS].sum().to_dict())
+    bridge["End Value"] = rows["Value"].iloc[-1]
+    return {k: float(v) for k, v in bridge.items()}
+
+
+def plot_pvm_bridge(bridge, start=2021, end=2024, title=None):
+    fig = go.Figure(go.Waterfall(
+        x=[f"{start} Value", "Volume", "Price", "Mix", f"{end} Value"],
+        measure=["absolute", "relative", "relative", "relative", "total"],
+        y=[bridge["Start Value"], bridge["Volume Effect"], bridge["Price Effect"], bridge["Mix Effect"], bridge["End Value"]],
+        text=[f"{v:,.0f}" for v in [bridge["Start Value"], bridge["Volume Effect"], bridge["Price Effect"], bridge["Mix Effect"], bridge["End Value"]]],
+        textposition="outside",
+        connector={"line": {"color": "gray"}},
+    ))
+    fig.update_layout(
+        title=title or f"Value Bridge {start} → {end}",
+        yaxis_title="LC Value (AED)",
+        showlegend=False,
+        height=420,
+    )
+    return fig
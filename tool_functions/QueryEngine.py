@@ -0,0 +1,167 @@
+import os
+
+import duckdb
+import pandas as pd
+
+from tool_functions.DataLoad import dataset_version, load_master_data, load_mohap_data, load_orange_book
+from tool_functions.Normalize import normalize_mohap
+
+# Parquet snapshots of the cleaned frames, one folder per dataset_version()
+SNAPSHOT_DIR = ".snapshots"
+DEFAULT_MAX_ROWS = 10_000
+TABLE_NAMES = ("master", "mohap", "ob_products", "ob_patents")
+
+# Only statements that read; anything else (CREATE, DROP, COPY, INSTALL, SET ...) is rejected
+READ_STATEMENTS = {
+    duckdb.StatementType.SELECT,
+    duckdb.StatementType.EXPLAIN,
+}
+
+EXAMPLE_QUERIES = {
+    "Pack share within an ATC3": (
+        'SELECT "Molecule Combination", Pack, SUM("2024 LC Value") AS value_2024,\n'
+        '       100 * value_2024 / SUM(value_2024) OVER () AS share_pct\n'
+        "FROM master\n"
+        "WHERE ATC3 = '{atc3}'\n"
+        "GROUP BY ALL\n"
+        "ORDER BY value_2024 DESC"
+    ),
+    "LPO growth for one manufacturer": (
+        'SELECT "Molecule Combination",\n'
+        '       SUM("2021 LC Value") AS value_2021, SUM("2024 LC Value") AS value_2024,\n'
+        "       100 * (POW(value_2024 / NULLIF(value_2021, 0), 1 / 3.0) - 1) AS value_cagr_pct\n"
+        "FROM master\n"
+        "WHERE Market = 'LPO' AND Manufacturer = '{manufacturer}'\n"
+        "GROUP BY ALL\n"
+        "ORDER BY value_2024 DESC"
+    ),
+    "MOHAP registrations by company": (
+        "SELECT Company, COUNT(*) AS registrations, COUNT(DISTINCT Ingredient_clean) AS ingredients\n"
+        "FROM mohap\n"
+        "GROUP BY ALL\n"
+        "ORDER BY registrations DESC"
+    ),
+}
+
+
+def _to_snapshot_frame(df):
+    """Object columns with mixed values (numbers / text / NaN) become plain strings so they map to one Parquet type."""
+    out = df.copy()
+    for c in out.columns:
+        if out[c].dtype == object:
+            out[c] = out[c].astype("string")
+    return out
+
+
+def write_snapshots(tables, version, root=SNAPSHOT_DIR):
+    """
+    Writes each {name: DataFrame} to <root>/<version>/<name>.parquet (skipped if it
+    already exists for this version). Returns {name: path}.
+    """
+    folder = os.path.abspath(os.path.join(root, version))
+    os.makedirs(folder, exist_ok=True)
+
+    paths = {}
+    for name, frame in tables.items():
+        path = os.path.join(folder, f"{name}.parquet")
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            _to_snapshot_frame(frame).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        paths[name] = path
+    return paths
+
+
+def open_engine(snapshot_paths):
+    """
+    In-process DuckDB over the Parquet snapshots. Each table is a view on its file,
+    so DuckDB reads only the referenced columns and pushes WHERE filters into the
+    scan (row groups whose min/max can't match are skipped).
+
+    File access is then limited to the snapshot folder and the configuration is
+    locked, so queries can't read other files or write anywhere.
+    """
+    folders = sorted({os.path.dirname(p) + os.sep for p in snapshot_paths.values()})
+    con = duckdb.connect()
+    con.execute("SET allowed_directories = ?", [folders])
+    con.execute("SET enable_external_access = false")
+    for name, path in snapshot_paths.items():
+        con.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{path}')")
+    con.execute("SET lock_configuration = true")
+    return {"con": con, "tables": list(snapshot_paths)}
+
+
+def build_query_engine(tables, version, root=SNAPSHOT_DIR):
+    return open_engine(write_snapshots(tables, version, root=root))
+
+
+def load_query_engine(root=SNAPSHOT_DIR):
+    """
+    Python API entry point: loads the source files (or reuses this version's snapshots)
+    and returns an engine for query() / run_query().
+
+        engine = load_query_engine()
+        query(engine, "SELECT ATC3, SUM(\"2024 LC Value\") FROM master GROUP BY ALL")
+    """
+    version = dataset_version()
+    folder = os.path.abspath(os.path.join(root, version))
+    paths = {name: os.path.join(folder, f"{name}.parquet") for name in TABLE_NAMES}
+    if all(os.path.exists(p) for p in paths.values()):
+        return open_engine(paths)
+
+    ob_products, ob_patents = load_orange_book()
+    return build_query_engine({
+        "master": load_master_data(),
+        "mohap": normalize_mohap(load_mohap_data()),
+        "ob_products": ob_products,
+        "ob_patents": ob_patents,
+    }, version, root=root)
+
+
+def run_query(engine, sql, max_rows=DEFAULT_MAX_ROWS):
+    """
+    Runs one read-only statement, capped at `max_rows` (None = no cap).
+    Returns (result DataFrame, truncated flag).
+    Raises ValueError for empty / multiple / non-read statements and
+    duckdb.Error for SQL errors.
+    """
+    statements = duckdb.extract_statements(sql)
+    if len(statements) != 1:
+        raise ValueError("Enter exactly one SQL statement.")
+    if statements[0].type not in READ_STATEMENTS:
+        raise ValueError("Only read queries (SELECT / WITH / EXPLAIN) are allowed.")
+
+    # a cursor per call, so concurrent sessions don't share statement state
+    cur = engine["con"].cursor()
+    try:
+        rel = cur.sql(sql)
+        if rel is None:
+            return pd.DataFrame(), False
+        if max_rows is not None:
+            rel = rel.limit(max_rows + 1)
+        result = rel.df()
+    finally:
+        cur.close()
+
+    if max_rows is None:
+        return result, False
+    return result.head(max_rows), len(result) > max_rows
+
+
+def query(engine, sql, max_rows=None):
+    """Python API: run_query without the row cap, returning just the DataFrame."""
+    result, _ = run_query(engine, sql, max_rows=max_rows)
+    return result
+
+
+def table_schemas(engine):
+    """table / column / type for every exposed table."""
+    frames = []
+    cur = engine["con"].cursor()
+    try:
+        for name in engine["tables"]:
+            cols = cur.sql(f"DESCRIBE {name}").df()[["column_name", "column_type"]]
+            frames.append(cols.assign(table=name))
+    finally:
+        cur.close()
+    return pd.concat(frames, ignore_index=True)[["table", "column_name", "column_type"]]
@@ -1,31 +1,45 @@
 import pandas as pd
-import re
+from tool_functions.DataLoad import OB_DATE_FORMAT
+from tool_functions.Normalize import clean_ingredient_string, clean_ingredient_series, collapse_spaces, format_ob_ingredients
 from datetime import date
 
-def clean_ingredient_string(text):
-    text = re.sub(r"\(.*?\)", "", str(text))  # Remove parentheses
-    text = text.replace(",", "").strip().upper()
-    return text
+def build_expiry_map(ob_products, ob_patents):
+    """Latest Orange Book patent expiry per formatted ingredient (NDA products only)."""
+    nda = ob_products[ob_products["Appl_Type"] == "N"].copy()
+    nda["Ingredient_Formatted_Clean"] = format_ob_ingredients(nda["Ingredient"])
 
-def get_regulatory_summary(molecule_name, mohap_df, ob_products, ob_patents):
+    merged = pd.merge(
+        nda[["Ingredient_Formatted_Clean", "Appl_No", "Product_No"]],
+        ob_patents[["Appl_No", "Product_No", "Patent_Expire_Date_Text"]],
+        how="left", on=["Appl_No", "Product_No"]
+    )
+    merged["Patent_Expire_Date_Text"] = pd.to_datetime(merged["Patent_Expire_Date_Text"], format=OB_DATE_FORMAT, errors='coerce')
+    return merged.groupby("Ingredient_Formatted_Clean")["Patent_Expire_Date_Text"].max()
+
+
+def get_regulatory_summary(molecule_name, mohap_df, ob_products, ob_patents, expiry_map=None):
     molecule_name_clean = clean_ingredient_string(molecule_name)
 
     # --- MOHAP Manufacturer Count ---
     mohap_df = mohap_df.copy()
-    mohap_df["Ingredient_clean"] = mohap_df["Ingredient"].astype(str).apply(clean_ingredient_string)
-    mohap_df["Company"] = mohap_df["Company"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    mohap_df["Ingredient_clean"] = clean_ingredient_series(mohap_df["Ingredient"].astype(str))
+    mohap_df["Company"] = collapse_spaces(mohap_df["Company"])
 
     matched_mohap = mohap_df[mohap_df["Ingredient_clean"].str.contains(molecule_name_clean, na=False)]
     n_mohap_manufacturers = matched_mohap["Company"].nunique()
 
     # --- Orange Book Expiry Lookup ---
+    if expiry_map is not None:
+        expiry_dates = expiry_map[expiry_map.index.str.contains(molecule_name_clean, na=False)].dropna()
+        return {
+            "mohap_manufacturers": n_mohap_manufacturers,
+            "orange_book_expiry": expiry_dates.max().date() if not expiry_dates.empty else "N/A"
+        }
+
     ob_products = ob_products.copy()
     ob_patents = ob_patents.copy()
 
-    ob_products["Ingredient"] = ob_products["Ingredient"].astype(str).str.upper().str.strip()
-    ob_products["Ingredient_List"] = ob_products["Ingredient"].str.split(";")
-    ob_products["Ingredient_Formatted"] = ob_products["Ingredient_List"].apply(lambda x: " +".join(x))
-    ob_products["Ingredient_Formatted_Clean"] = ob_products["Ingredient_Formatted"].str.strip().str.upper()
+    ob_products["Ingredient_Formatted_Clean"] = format_ob_ingredients(ob_products["Ingredient"])
 
     ob_match = ob_products[ob_products["Ingredient_Formatted_Clean"].str.contains(molecule_name_clean, na=False)]
     ob_match = ob_match[ob_match["Appl_Type"] == "N"]  # Only NDA products
@@ -33,7 +47,7 @@ def get_regulatory_summary(molecule_name, mohap_df, ob_products, ob_patents):
     latest_expiry = None
     if not ob_match.empty:
         merged = pd.merge(ob_match, ob_patents, how="left", on=["Appl_No", "Product_No"])
-        merged["Patent_Expire_Date_Text"] = pd.to_datetime(merged["Patent_Expire_Date_Text"], errors='coerce')
+        merged["Patent_Expire_Date_Text"] = pd.to_datetime(merged["Patent_Expire_Date_Text"], format=OB_DATE_FORMAT, errors='coerce')
         expiry_dates = merged["Patent_Expire_Date_Text"].dropna()
         if not expiry_dates.empty:
             latest_expiry = expiry_dates.max().date()
@@ -0,0 +1,79 @@
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Modules PharmAI.py imports at the top of every cold process
+APP_IMPORTS = [
+    "streamlit", "pandas", "numpy", "plotly.graph_objects",
+    "tool_functions.DataLoad", "tool_functions.SummaryGen", "tool_functions.MoleculePlot",
+    "tool_functions.MohapLandscape", "tool_functions.Erosion", "tool_functions.Reg",
+    "tool_functions.Forecast", "tool_functions.EntrySim", "tool_functions.Portfolio",
+    "tool_functions.Crosswalk", "tool_functions.MarketPivot",
+]
+
+
+# --- Import-time breakdown ---
+def import_breakdown(modules=APP_IMPORTS, top_n=20):
+    """
+    Imports `modules` in a fresh interpreter with `-X importtime` and returns the
+    slowest imports: Module, Self ms, Cumulative ms, Depth (0 = imported directly).
+    """
+    code = "\n".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if m:
+            rows.append({
+                "Module": m.group(4),
+                "Self ms": int(m.group(1)) / 1000,
+                "Cumulative ms": int(m.group(2)) / 1000,
+                "Depth": len(m.group(3)) // 2,
+            })
+    table = pd.DataFrame(rows, columns=["Module", "Self ms", "Cumulative ms", "Depth"])
+    return table.sort_values("Cumulative ms", ascending=False).head(top_n).reset_index(drop=True)
+
+
+# --- Time to first render ---
+class StartupTimer:
+    """
+    Process-wide record of how long each startup stage took the first time it ran
+    (later runs hit the caches), plus the first script run's time to first render.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = time.perf_counter()
+        self.stages = {}
+        self.first_render = None
+
+    @contextmanager
+    def stage(self, label):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t
+            with self._lock:
+                self.stages.setdefault(label, elapsed)
+
+    def mark_first_render(self, run_started):
+        """Called once the first tab has been drawn; only the first call per process counts."""
+        with self._lock:
+            if self.first_render is None:
+                self.first_render = time.perf_counter() - run_started
+
+    def as_frame(self):
+        with self._lock:
+            rows = [{"Stage": k, "Seconds": v} for k, v in self.stages.items()]
+            if self.first_render is not None:
+                rows.append({"Stage": "time to first render", "Seconds": self.first_render})
+        return pd.DataFrame(rows, columns=["Stage", "Seconds"])
+
+
+STARTUP = StartupTimer()
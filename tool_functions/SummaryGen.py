@@ -1,6 +1,10 @@
 import pandas as pd
 
-def generate_exec_summary_data(df, molecule_name):
+from tool_functions.AtcTree import get_class_metrics as get_tree_metrics
+from tool_functions.MarketPivot import market_totals
+from tool_functions.PriceVolumeMix import build_pvm, pvm_bridge
+
+def generate_exec_summary_data(df, molecule_name, atc_tree=None, market_pivot=None, pvm=None):
     molecule_name = molecule_name.strip().upper()
     mol_df = df[df["Molecule Combination"].str.upper() == molecule_name].copy()
 
@@ -52,15 +56,20 @@ def generate_exec_summary_data(df, molecule_name):
     top_product_name = top_product_row["Product"].values[0] if not top_product_row.empty else "Unknown"
     top_product_launch_year = int(top_product_row["Launch Year"].values[0]) if not top_product_row.empty else None
 
-    private_df = mol_df[mol_df["Market"] == "PRIVATE MARKET"]
-    lpo_df = mol_df[mol_df["Market"] == "LPO"]
+    if market_pivot is not None:
+        # Private / LPO already summed side by side → no re-filtering
+        markets = market_totals(market_pivot, molecule_name)
+        private_2021_units, private_2024_units = markets.loc["PRIVATE MARKET", ["2021 Units", "2024 Units"]]
+        lpo_2021_units, lpo_2024_units = markets.loc["LPO", ["2021 Units", "2024 Units"]]
+    else:
+        private_df = mol_df[mol_df["Market"] == "PRIVATE MARKET"]
+        lpo_df = mol_df[mol_df["Market"] == "LPO"]
+        private_2021_units = private_df["2021 Units"].sum()
+        private_2024_units = private_df["2024 Units"].sum()
+        lpo_2021_units = lpo_df["2021 Units"].sum()
+        lpo_2024_units = lpo_df["2024 Units"].sum()
 
-    private_2021_units = private_df["2021 Units"].sum()
-    private_2024_units = private_df["2024 Units"].sum()
     private_cagr = compute_cagr(private_2021_units, private_2024_units)
-
-    lpo_2021_units = lpo_df["2021 Units"].sum()
-    lpo_2024_units = lpo_df["2024 Units"].sum()
     lpo_cagr = compute_cagr(lpo_2021_units, lpo_2024_units)
 
     private_pct = private_2024_units / (total_2024_units or 1) * 100
@@ -72,17 +81,9 @@ def generate_exec_summary_data(df, molecule_name):
         forecast_units[year] = int(total_2024_units * ((1 + unit_cagr / 100) ** i))
         forecast_value[year] = int(total_2024_value * ((1 + value_cagr / 100) ** i))
 
-    df_clean = df.copy()
-    df_clean[["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]] = df_clean[
-        ["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]
-    ].apply(pd.to_numeric, errors="coerce").fillna(0)
-
     atc4_code = mol_df["ATC4"].dropna().unique()[0]
     atc3_code = mol_df["ATC3"].dropna().unique()[0]
 
-    atc4_df = df_clean[df_clean["ATC4"] == atc4_code]
-    atc3_df = df_clean[df_clean["ATC3"] == atc3_code]
-
     def get_class_metrics(subdf):
         return {
             "value_2024": subdf["2024 LC Value"].sum(),
@@ -90,6 +91,27 @@ def generate_exec_summary_data(df, molecule_name):
             "value_cagr": compute_cagr(subdf["2021 LC Value"].sum(), subdf["2024 LC Value"].sum())
         }
 
+    if atc_tree is not None:
+        # Precomputed rollup → no full-frame scan
+        atc4_metrics = get_tree_metrics(atc_tree, "ATC4", atc4_code)
+        atc3_metrics = get_tree_metrics(atc_tree, "ATC3", atc3_code)
+    else:
+        df_clean = df.copy()
+        df_clean[["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]] = df_clean[
+            ["2021 Units", "2024 Units", "2021 LC Value", "2024 LC Value"]
+        ].apply(pd.to_numeric, errors="coerce").fillna(0)
+
+        atc4_metrics = get_class_metrics(df_clean[df_clean["ATC4"] == atc4_code])
+        atc3_metrics = get_class_metrics(df_clean[df_clean["ATC3"] == atc3_code])
+
+    # Value growth 2021 → 2024 split into volume / price / mix
+    if pvm is None:
+        # the combination and its ATC4 / ATC3 nodes only need the class's rows
+        pvm = build_pvm(df[(df["ATC3"] == atc3_code) | (df["Molecule Combination"].str.upper() == molecule_name)])
+    value_bridge = pvm_bridge(pvm, "Molecule Combination", molecule_name)
+    atc4_bridge = pvm_bridge(pvm, "ATC4", atc4_code)
+    atc3_bridge = pvm_bridge(pvm, "ATC3", atc3_code)
+
     def pretty_list(values):
         return ", ".join(sorted(set(values))) if len(values) > 0 else "N/A"
 
@@ -115,8 +137,11 @@ def generate_exec_summary_data(df, molecule_name):
         "atc4": pretty_list(mol_df["ATC4"].dropna().unique()),
         "forecast_units": forecast_units,
         "forecast_value": forecast_value,
-        "atc4_metrics": get_class_metrics(atc4_df),
-        "atc3_metrics": get_class_metrics(atc3_df),
+        "atc4_metrics": atc4_metrics,
+        "atc3_metrics": atc3_metrics,
+        "value_bridge": value_bridge,
+        "atc4_bridge": atc4_bridge,
+        "atc3_bridge": atc3_bridge,
         "top_product": top_product_name,
         "top_product_launch_year": top_product_launch_year
     }
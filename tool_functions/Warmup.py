@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+USAGE_LOG = os.path.join(".cache", "usage.log")
+DEFAULT_TOP_N = 25
+USAGE_WINDOW_DAYS = 30
+
+
+# --- Which molecules to warm ---
+def record_usage(molecule, path=USAGE_LOG):
+    """Appends one "<unix time>\t<molecule>" line; called when a user opens a molecule."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{int(time.time())}\t{molecule}\n")
+
+
+def recent_molecules(path=USAGE_LOG, n=DEFAULT_TOP_N, days=USAGE_WINDOW_DAYS):
+    """Most opened molecules in the last `days` days, most popular first."""
+    if not os.path.exists(path):
+        return []
+
+    cutoff = time.time() - days * 86400
+    counts = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            ts, _, molecule = line.rstrip("\n").partition("\t")
+            if molecule and ts.isdigit() and int(ts) >= cutoff:
+                counts[molecule] += 1
+    return [m for m, _ in counts.most_common(n)]
+
+
+def top_molecules_by_value(df, n=DEFAULT_TOP_N):
+    value = pd.to_numeric(df["2024 LC Value"], errors="coerce").fillna(0)
+    return value.groupby(df["Molecule Combination"]).sum().nlargest(n).index.tolist()
+
+
+def warmup_candidates(df, n=DEFAULT_TOP_N, usage_path=USAGE_LOG):
+    """Recently used molecules first, topped up with the largest by 2024 value."""
+    known = set(df["Molecule Combination"].dropna().unique())
+    picked = []
+    for molecule in recent_molecules(usage_path, n=n) + top_molecules_by_value(df, n=n):
+        if molecule in known and molecule not in picked:
+            picked.append(molecule)
+    return picked[:n]
+
+
+# --- Background worker ---
+class WarmupScheduler:
+    """
+    Runs (label, fn) jobs on `max_workers` daemon threads, pausing between jobs so
+    interactive reruns get the interpreter back quickly. Failures are counted and
+    skipped; nothing is returned to the caller (jobs are expected to fill a cache).
+    """
+
+    def __init__(self, max_workers=2, pause=0.05):
+        self.max_workers = max_workers
+        self.pause = pause
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.total = 0
+        self.done = 0
+        self.failed = []
+        self.started_at = None
+        self.finished_at = None
+
+    def submit(self, label, fn):
+        with self._lock:
+            self.total += 1
+        self._jobs.put((label, fn))
+
+    def start(self):
+        self.started_at = time.time()
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._run, name=f"warmup-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                label, fn = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn()
+            except Exception as e:
+                with self._lock:
+                    self.failed.append((label, repr(e)))
+            with self._lock:
+                self.done += 1
+                if self.done == self.total:
+                    self.finished_at = time.time()
+            time.sleep(self.pause)
+
+    def status(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "total": self.total,
+                "done": self.done,
+                "failed": len(self.failed),
+                "running": self.done < self.total and not self._stop.is_set(),
+                "elapsed": end - self.started_at if self.started_at else 0.0,
+            }
@@ -1,27 +1,27 @@
 import pandas as pd
 
-def create_combination_column(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+from tool_functions.Normalize import combination_map, combination_type, upper_strip
 
+def normalize_product_columns(df: pd.DataFrame) -> pd.DataFrame:
     # Ensure columns are clean
     df.columns = df.columns.str.replace("\n", " ", regex=False).str.strip()
 
-    # Normalize molecule column
-    df["Molecule"] = df["Molecule"].astype(str).str.strip().str.upper()
-    df["Product"] = df["Product"].astype(str).str.strip().str.upper()
+    # Normalize molecule column (each distinct string cleaned once)
+    df["Molecule"] = upper_strip(df["Molecule"])
+    df["Product"] = upper_strip(df["Product"])
+    return df
+
+def apply_combination_column(df: pd.DataFrame, product_molecule_map) -> pd.DataFrame:
+    # object even when empty (a header-only chunk maps to a float Series)
+    df["Molecule Combination"] = df["Product"].map(product_molecule_map).astype(object)
+    df["Molecule Combination Type"] = combination_type(df["Molecule Combination"])
+    return df
+
+def create_combination_column(df: pd.DataFrame) -> pd.DataFrame:
+    df = normalize_product_columns(df.copy())
 
     # Step 1: Create a mapping from Product → sorted list of Molecules in that product
-    product_molecule_map = (
-        df.groupby("Product")["Molecule"]
-        .unique()
-        .apply(lambda mols: " + ".join(sorted(set(mols))))
-        .to_dict()
-    )
+    product_molecule_map = combination_map(df["Product"], df["Molecule"])
 
     # Step 2: Apply combination and type
-    df["Molecule Combination"] = df["Product"].map(product_molecule_map)
-    df["Molecule Combination Type"] = df["Molecule Combination"].apply(
-        lambda x: "MONO" if " + " not in x else "COMBINATION"
-    )
-
-    return df
+    return apply_combination_column(df, product_molecule_map)
@@ -1,8 +1,13 @@
 import pandas as pd
 
-def generate_molecule_overview(df, molecule_name):
+from tool_functions.AtcTree import get_class_metrics
+from tool_functions.MarketPivot import market_totals
+
+def generate_molecule_overview(df, molecule_name, atc_tree=None, market_pivot=None):
     """
     Returns a clean, formatted vertical summary DataFrame for a given molecule.
+    Pass `atc_tree` (build_atc_tree) to read the ATC3 / ATC4 context from the rollup,
+    and `market_pivot` (build_market_pivot) to read the private / total split from it.
     """
     m = molecule_name.strip().upper()
     mol_df = df[df["Molecule Combination"].str.upper() == m]
@@ -21,8 +26,23 @@ def generate_molecule_overview(df, molecule_name):
     # ATC info
     atc3 = mol_df["ATC3"].mode()[0] if not mol_df["ATC3"].isna().all() else "N/A"
     atc4 = mol_df["ATC4"].mode()[0] if not mol_df["ATC4"].isna().all() else "N/A"
-    atc4_df = df[df["ATC4"] == atc4]
-    atc3_df = df[df["ATC3"] == atc3]
+    if atc_tree is None:
+        atc4_df = df[df["ATC4"] == atc4]
+        atc3_df = df[df["ATC3"] == atc3]
+        atc4_value = atc4_df["2024 LC Value"].sum()
+        atc3_value = atc3_df["2024 LC Value"].sum()
+        atc4_combos = atc4_df["Molecule Combination"].nunique()
+        atc4_cagr = cagr(atc4_df["2021 LC Value"].sum(), atc4_value)
+        atc3_cagr = cagr(atc3_df["2021 LC Value"].sum(), atc3_value)
+    else:
+        empty = {"value_2024": 0, "value_cagr": 0, "combinations": 0}
+        atc4_m = (get_class_metrics(atc_tree, "ATC4", atc4) if atc4 != "N/A" else None) or empty
+        atc3_m = (get_class_metrics(atc_tree, "ATC3", atc3) if atc3 != "N/A" else None) or empty
+        atc4_value = atc4_m["value_2024"]
+        atc3_value = atc3_m["value_2024"]
+        atc4_combos = atc4_m["combinations"]
+        atc4_cagr = atc4_m["value_cagr"]
+        atc3_cagr = atc3_m["value_cagr"]
 
     # Yearly values
     years = ["2021", "2022", "2023", "2024"]
@@ -32,11 +52,9 @@ def generate_molecule_overview(df, molecule_name):
     # CAGR calculations
     units_cagr = cagr(units[0], units[-1])
     value_cagr = cagr(values[0], values[-1])
-    atc4_cagr = cagr(atc4_df["2021 LC Value"].sum(), atc4_df["2024 LC Value"].sum())
-    atc3_cagr = cagr(atc3_df["2021 LC Value"].sum(), atc3_df["2024 LC Value"].sum())
 
     # Market stats
-    competitors = atc4_df["Molecule Combination"].nunique() - 1
+    competitors = atc4_combos - 1
     manuf_df = mol_df.groupby("Manufacturer")["2024 Units"].sum().reset_index(name="units_2024")
     manuf_total = manuf_df["Manufacturer"].nunique()
     manuf_df["share"] = manuf_df["units_2024"] / (units[-1] or 1) * 100
@@ -46,10 +64,15 @@ def generate_molecule_overview(df, molecule_name):
     launch_year = int(mol_df["Launch Year"].min()) if not mol_df["Launch Year"].isna().all() else "N/A"
 
     # Private market shift
-    private_2021 = mol_df[mol_df["Market"] == "PRIVATE MARKET"]["2021 Units"].sum()
-    private_2024 = mol_df[mol_df["Market"] == "PRIVATE MARKET"]["2024 Units"].sum()
-    private_pct_21 = private_2021 / (units[0] or 1) * 100
-    private_pct_24 = private_2024 / (units[-1] or 1) * 100
+    if market_pivot is not None:
+        markets = market_totals(market_pivot, m)
+        private_pct_21 = markets.loc["PRIVATE MARKET", "2021 Units"] / (markets.loc["TOTAL", "2021 Units"] or 1) * 100
+        private_pct_24 = markets.loc["PRIVATE MARKET", "2024 Units"] / (markets.loc["TOTAL", "2024 Units"] or 1) * 100
+    else:
+        private_2021 = mol_df[mol_df["Market"] == "PRIVATE MARKET"]["2021 Units"].sum()
+        private_2024 = mol_df[mol_df["Market"] == "PRIVATE MARKET"]["2024 Units"].sum()
+        private_pct_21 = private_2021 / (units[0] or 1) * 100
+        private_pct_24 = private_2024 / (units[-1] or 1) * 100
     private_delta = private_pct_24 - private_pct_21
 
     # Final summary dictionary
@@ -64,9 +87,9 @@ def generate_molecule_overview(df, molecule_name):
         "First Launch Year": launch_year,
         "Private Market Share 2024 (%)": private_pct_24,
         "Private Market Shift (21→24) (%)": private_delta,
-        "ATC4 Value 2024 (AED)": atc4_df["2024 LC Value"].sum(),
+        "ATC4 Value 2024 (AED)": atc4_value,
         "ATC4 Value CAGR (%)": atc4_cagr,
-        "ATC3 Value 2024 (AED)": atc3_df["2024 LC Value"].sum(),
+        "ATC3 Value 2024 (AED)": atc3_value,
         "ATC3 Value CAGR (%)": atc3_cagr,
     }
 